@@ -0,0 +1,14 @@
+# config/gunicorn_asgi.py
+"""
+ASGI deployment profile: gunicorn managing uvicorn workers, with the dashboard
+and clock views served asynchronously. To deploy it, change the Procfile line to
+
+    web: gunicorn config.asgi:application -c config/gunicorn_asgi.py
+"""
+import os
+
+# Read by settings.py in each worker
+os.environ.setdefault('ASYNC_CLOCK_VIEWS', 'True')
+
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
@@ -0,0 +1,10 @@
+# config/gunicorn_wsgi.py
+"""
+The default WSGI profile with an explicit worker count, so it can be compared
+with config/gunicorn_asgi.py at the same WEB_CONCURRENCY:
+
+    web: gunicorn config.wsgi -c config/gunicorn_wsgi.py
+"""
+import os
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
@@ -39,9 +39,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    # WhiteNoise must be listed directly after SecurityMiddleware
+    # First, so the timings include every other middleware (sessions, auth, ...)
+    'time_tracker.middleware.PerformanceMetricsMiddleware',
+    # WhiteNoise (async-capable subclass) must be listed directly after SecurityMiddleware
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'time_tracker.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -63,6 +65,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'time_tracker.context_processors.pending_requests',
             ],
         },
     },
@@ -73,11 +76,41 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # --- Database ---
 
+# Production profile knobs (PostgreSQL):
+# DB_POOL='pgbouncer' connects through a server-side pooler in transaction mode (Heroku's
+# connection pooling attaches DATABASE_CONNECTION_POOL_URL, used when set), so server-side
+# cursors and connection startup options are off; statement timeouts are then only set
+# per view (time_tracker.routers.statement_timeout), with SET LOCAL.
+DB_POOL = os.environ.get('DB_POOL', '')
+# Default for every query on a direct connection, in milliseconds (0 = none)
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+# Tighter limit for the report and review pages (see time_tracker.routers.statement_timeout)
+REPORT_STATEMENT_TIMEOUT_MS = int(os.environ.get('REPORT_STATEMENT_TIMEOUT_MS', 10000))
+
 if 'DATABASE_URL' in os.environ:
     # Use Heroku's DATABASE_URL for production
+    # Persistent connections leak under ASGI (each request runs in its own thread), so the async profile disables them
+    def production_database(url):
+        database = dj_database_url.parse(
+            url,
+            conn_max_age=0 if os.environ.get('ASYNC_CLOCK_VIEWS') == 'True' else 600,
+            # A persistent connection that died between requests is replaced instead of failing one
+            conn_health_checks=True,
+            disable_server_side_cursors=DB_POOL == 'pgbouncer',
+            ssl_require=True
+        )
+        if DB_POOL != 'pgbouncer' and DB_STATEMENT_TIMEOUT_MS:
+            database.setdefault('OPTIONS', {})['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+        return database
+
+    primary_url = os.environ['DATABASE_URL']
+    if DB_POOL == 'pgbouncer':
+        primary_url = os.environ.get('DATABASE_CONNECTION_POOL_URL', primary_url)
     DATABASES = {
-        'default': dj_database_url.config(conn_max_age=600, ssl_require=True)
+        'default': production_database(primary_url)
     }
+    if os.environ.get('DATABASE_REPLICA_URL'):
+        DATABASES['replica'] = production_database(os.environ['DATABASE_REPLICA_URL'])
 else:
     # Use SQLite for local development
     DATABASES = {
@@ -86,6 +119,17 @@ else:
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+    # e.g. DATABASE_REPLICA_URL=sqlite:///db.sqlite3 to try replica routing locally
+    if os.environ.get('DATABASE_REPLICA_URL'):
+        DATABASES['replica'] = dj_database_url.parse(os.environ['DATABASE_REPLICA_URL'])
+
+if 'replica' in DATABASES:
+    # Tests read the replica through the test copy of the primary
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# Writes go to 'default'; views marked @replica_reads (reports, admin lists) read from
+# 'replica' when it is configured
+DATABASE_ROUTERS = ['time_tracker.routers.PrimaryReplicaRouter']
 
 
 # --- Password Validation ---
@@ -144,4 +188,92 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
 
+
+# --- Sessions & Authentication ---
+
+# Where sessions live: 'db' (one query per request), 'cached_db' (read from the
+# 'default' cache, written through to the database; needs a cache shared by every
+# worker, e.g. REDIS_URL) or 'signed_cookies' (no server-side storage at all)
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+
+if os.environ.get('REDIS_URL'):
+    # Requires the redis package
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
+# CachedModelBackend serves each request's user from a per-process cache for this
+# many seconds (0 = off). Every hit is checked against a stamp in the 'default'
+# cache that saving the user replaces, so with a cache shared by the workers
+# (REDIS_URL) a staff toggle or deactivation reaches all of them on the next
+# request; with the per-process default, other workers see it within this time.
+# ModelBackend stays listed for sessions created before the switch.
+USER_CACHE_SECONDS = float(os.environ.get('USER_CACHE_SECONDS', 0))
+AUTHENTICATION_BACKENDS = [
+    'time_tracker.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
+# --- Performance Instrumentation ---
+
+# Per-view request histograms, served to staff at /metrics/
+PERF_METRICS_ENABLED = os.environ.get('PERF_METRICS_ENABLED', 'True') == 'True'
+
+# Log requests slower than this many milliseconds (with their SQL); unset to disable
+PERF_SLOW_REQUEST_MS = int(os.environ['PERF_SLOW_REQUEST_MS']) if os.environ.get('PERF_SLOW_REQUEST_MS') else None
+
+# Cache for report/dashboard period totals, keyed on the user's data version.
+# For a cache shared by all workers use 'time_tracker.cache.DjangoCacheBackend'
+# with OPTIONS {'alias': 'default', 'timeout': 86400} and a Redis/Memcached CACHES entry.
+TOTALS_CACHE = {
+    'BACKEND': os.environ.get('TOTALS_CACHE_BACKEND', 'time_tracker.cache.LocalLRUCache'),
+    'OPTIONS': {'max_entries': int(os.environ.get('TOTALS_CACHE_MAX_ENTRIES', 1024))},
+}
+
+# How derived tables (daily summaries, shifts) follow entry writes: 'immediate'
+# recomputes the touched days in the write's transaction; 'deferred' only marks
+# them dirty and they are rebuilt on read or by `manage.py refresh_dirty_days --loop`
+DERIVED_REFRESH_MODE = os.environ.get('DERIVED_REFRESH_MODE', 'immediate')
+
+# Where period work/break totals (reports, payroll) are computed: 'python' replays
+# the entries in the app; 'sql' runs the same state machine as window functions in
+# the database (PostgreSQL or SQLite), falling back to Python for archived days
+TIME_TOTALS_ENGINE = os.environ.get('TIME_TOTALS_ENGINE', 'python')
+
+# How long a process may reuse a Counter row it read (e.g. the staff nav badge's
+# pending request count) before reading it again
+COUNTER_CACHE_SECONDS = float(os.environ.get('COUNTER_CACHE_SECONDS', 10))
+
+# --- Archival ---
+
+# Age in days after which punches may be archived. `manage.py archive_entries`
+# moves them out of the hot TimeEntry table in whole calendar months: everything
+# before the first day of the month this many days ago. Reports, exports and
+# rebuilds read them back. Entry writes only look in the archive for days before
+# this horizon, so lowering it is always safe but raising it after archiving is not.
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 730))
+
+# --- Clock Terminal Ingestion ---
+
+# Bearer tokens accepted by the batch punch upload endpoint (comma separated)
+CLOCK_TERMINAL_TOKENS = [token for token in os.environ.get('CLOCK_TERMINAL_TOKENS', '').split(',') if token]
+
+# Largest batch accepted in a single upload
+CLOCK_INGEST_MAX_EVENTS = int(os.environ.get('CLOCK_INGEST_MAX_EVENTS', 100000))
+CLOCK_INGEST_MAX_BYTES = int(os.environ.get('CLOCK_INGEST_MAX_BYTES', 32 * 1024 * 1024))
+
+# --- ASGI Profile ---
+
+# Serve the dashboard and clock views as async views (set by config/gunicorn_asgi.py)
+ASYNC_CLOCK_VIEWS = os.environ.get('ASYNC_CLOCK_VIEWS', 'False') == 'True'
+
 # EOL
\ No newline at end of file
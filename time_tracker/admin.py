@@ -1,12 +1,20 @@
 from django.contrib import admin
-from .models import TimeEntry, TimeEditRequest
+from django.db import transaction
+from .models import ArchivedDay, Job, Shift, TimeEntry, TimeEditRequest, UserStatus
 from django.utils.html import format_html 
+from .routers import replica_reads
 
 
 #Added these classes to make sure my table views were clearer in the admin section
 
-class TimeEntryAdmin(admin.ModelAdmin):
+class ReplicaChangelistMixin:
+    """The (read-only) changelist page reads from the replica; actions posted to it don't."""
+    def changelist_view(self, request, extra_context=None):
+        return replica_reads(super().changelist_view)(request, extra_context)
+
+class TimeEntryAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'timestamp', 'action_display', 'date_only')
+    list_select_related = ('user',)
     list_filter = ('user', 'action_type', 'date_only')
     search_fields = ('user__username', 'action_type')
     def action_display(self, obj):
@@ -15,9 +23,20 @@ class TimeEntryAdmin(admin.ModelAdmin):
                            color, obj.get_action_type_display())
     action_display.short_description = 'Action'
 
-class TimeEditRequestAdmin(admin.ModelAdmin):
+    def delete_queryset(self, request, queryset):
+        # Bulk deletes skip TimeEntry.delete(), so refresh the derived tables here
+        user_days = {}
+        for user_id, day in queryset.values_list('user_id', 'date_only').distinct():
+            user_days.setdefault(user_id, set()).add(day)
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+            TimeEntry.refresh_derived(user_days)
+
+class TimeEditRequestAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
 
     list_display = ('id', 'original_entry', 'requested_timestamp', 'status', 'admin_reviewer', 'reviewed_at')
+
+    list_select_related = ('original_entry__user', 'admin_reviewer')
     
     list_filter = ('status', 'admin_reviewer', 'reviewed_at')
 
@@ -25,5 +44,69 @@ class TimeEditRequestAdmin(admin.ModelAdmin):
 
     readonly_fields = ['original_entry', 'requested_timestamp', 'request_reason']
 
+class UserStatusAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
+
+    list_display = ('user', 'state', 'last_action', 'last_timestamp', 'shift_start', 'break_start')
+
+    list_select_related = ('user',)
+
+    list_filter = ('state',)
+
+    search_fields = ('user__username',)
+
+    readonly_fields = ['user', 'state', 'last_action', 'last_timestamp', 'shift_start', 'break_start', 'data_version']
+
+class ShiftAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
+
+    list_display = ('user', 'started_at', 'ended_at', 'end_action', 'duration', 'break_duration')
+
+    list_select_related = ('user',)
+
+    list_filter = ('end_action', 'started_at')
+
+    search_fields = ('user__username',)
+
+    readonly_fields = ['user', 'started_at', 'ended_at', 'end_action', 'duration', 'break_duration']
+
+class JobAdmin(admin.ModelAdmin):
+
+    list_display = ('id', 'kind', 'owner', 'status', 'progress', 'attempts', 'created_at', 'finished_at')
+
+    list_select_related = ('owner',)
+
+    list_filter = ('status', 'kind')
+
+    search_fields = ('owner__username',)
+
+    # The result can be megabytes; it is downloaded from the job page, never loaded here
+    exclude = ['result']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('result')
+
+    readonly_fields = ['kind', 'params', 'owner', 'status', 'progress', 'attempts', 'worker', 'result_name',
+                       'content_type', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']
+
+class ArchivedDayAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
+
+    list_display = ('user', 'day', 'entry_count', 'archived_at')
+
+    list_select_related = ('user',)
+
+    list_filter = ('day',)
+
+    search_fields = ('user__username',)
+
+    exclude = ['payload']
+
+    readonly_fields = ['user', 'day', 'entry_count', 'archived_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('payload')
+
 admin.site.register(TimeEntry, TimeEntryAdmin) 
-admin.site.register(TimeEditRequest, TimeEditRequestAdmin)
\ No newline at end of file
+admin.site.register(TimeEditRequest, TimeEditRequestAdmin)
+admin.site.register(UserStatus, UserStatusAdmin)
+admin.site.register(Shift, ShiftAdmin)
+admin.site.register(Job, JobAdmin)
+admin.site.register(ArchivedDay, ArchivedDayAdmin)
\ No newline at end of file
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TimeTrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'time_tracker'
+
+    def ready(self):
+        from .metrics import instrument_connections
+
+        # Before any request, so connections opened ahead of the first one are covered too
+        if getattr(settings, 'PERF_METRICS_ENABLED', True):
+            instrument_connections()
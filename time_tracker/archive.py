@@ -0,0 +1,124 @@
+# time_tracker/archive.py
+import json
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import ArchivedDay, TimeEditRequest, TimeEntry, UserStatus
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Same attribute names as the hot-table rows it is merged with
+ArchivedEntry = namedtuple('ArchivedEntry', ['id', 'user_id', 'user__username', 'date_only', 'timestamp', 'action_type'])
+
+
+def archive_horizon():
+    """Days before this may be archived; derived-data rebuilds only look in the archive for them."""
+    return timezone.localdate() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+
+
+def archive_cutoff():
+    """archive_entries works in whole months: the first day of the horizon's month."""
+    return archive_horizon().replace(day=1)
+
+
+def encode_entries(entries):
+    """zlib-compressed JSON of [id, epoch microseconds, action] per entry."""
+    rows = [[entry.id, (entry.timestamp - EPOCH) // ONE_MICROSECOND, entry.action_type] for entry in entries]
+    return zlib.compress(json.dumps(rows, separators=(',', ':')).encode(), 9)
+
+
+def decode_entries(payload, day, user_id=None, username=None):
+    return [
+        ArchivedEntry(entry_id, user_id, username, day, EPOCH + timedelta(microseconds=stamp), action_type)
+        for entry_id, stamp, action_type in json.loads(zlib.decompress(payload))
+    ]
+
+
+def iter_archived_entries(start_date, end_date, user_ids=None):
+    """Archived entries in the date range, ordered by user then timestamp like the hot-table queries."""
+    days = ArchivedDay.objects.filter(day__range=(start_date, end_date))
+    if user_ids is not None:
+        days = days.filter(user_id__in=user_ids)
+    rows = days.order_by('user_id', 'day').values_list('user_id', 'user__username', 'day', 'payload')
+    for user_id, username, day, payload in rows.iterator(chunk_size=500):
+        yield from decode_entries(payload, day, user_id, username)
+
+
+def archived_entries_for(user_id, days=None, since_day=None):
+    """One user's archived entries on the given days (or from since_day on, or all), in timestamp order."""
+    archived = ArchivedDay.objects.filter(user_id=user_id)
+    if days is not None:
+        archived = archived.filter(day__in=days)
+    if since_day is not None:
+        archived = archived.filter(day__gte=since_day)
+    entries = []
+    for day, payload in archived.order_by('day').values_list('day', 'payload'):
+        entries += decode_entries(payload, day, user_id)
+    return entries
+
+
+def archive_closed_days(before, user_ids=None):
+    """
+    Moves entries dated before `before` into ArchivedDay rows and deletes them
+    from TimeEntry. Each user is only archived up to their last day that ends
+    with a clock out, so no shift is split between the archive and the hot
+    table. Entries with edit requests stay hot so the request history survives.
+    Returns (users, days, entries) archived.
+    """
+    candidates = TimeEntry.objects.filter(date_only__lt=before)
+    if user_ids is not None:
+        candidates = candidates.filter(user_id__in=user_ids)
+    users = candidates.order_by('user_id').values_list('user_id', flat=True).distinct()
+
+    totals = [0, 0, 0]
+    for user_id in list(users):
+        with transaction.atomic():
+            # The lock every entry write takes, so no punch lands while the user is archived
+            list(UserStatus.objects.select_for_update().filter(user_id=user_id))
+            entries = list(
+                TimeEntry.objects.filter(user_id=user_id, date_only__lt=before)
+                .annotate(has_requests=Exists(TimeEditRequest.objects.filter(original_entry=OuterRef('pk'))))
+                .order_by('date_only', 'timestamp', 'id')
+                .values_list('id', 'date_only', 'timestamp', 'action_type', 'has_requests', named=True)
+            )
+
+            closed_through = None
+            for entry, next_entry in zip(entries, entries[1:] + [None]):
+                if entry.action_type == 'OUT' and (next_entry is None or next_entry.date_only != entry.date_only):
+                    closed_through = entry.date_only
+
+            by_day = {}
+            for entry in entries:
+                if closed_through and entry.date_only <= closed_through and not entry.has_requests:
+                    by_day.setdefault(entry.date_only, []).append(entry)
+            if not by_day:
+                continue
+            moved_ids = [entry.id for day_entries in by_day.values() for entry in day_entries]
+
+            # A day archived earlier (and back-dated into since) gets the new entries merged in
+            for day, payload in ArchivedDay.objects.filter(user_id=user_id, day__in=by_day).values_list('day', 'payload'):
+                by_day[day] = sorted(by_day[day] + decode_entries(payload, day),
+                                     key=lambda entry: (entry.timestamp, entry.id))
+
+            ArchivedDay.objects.bulk_create(
+                [ArchivedDay(user_id=user_id, day=day, entry_count=len(day_entries), payload=encode_entries(day_entries))
+                 for day, day_entries in by_day.items()],
+                batch_size=500, update_conflicts=True, unique_fields=['user', 'day'],
+                update_fields=['entry_count', 'payload', 'archived_at'],
+            )
+            for start in range(0, len(moved_ids), 500):
+                TimeEntry.objects.filter(id__in=moved_ids[start:start + 500]).delete()
+            # Totals are unchanged, but pages listing the entries are not
+            UserStatus.bump_version(user_id)
+
+            totals[0] += 1
+            totals[1] += len(by_day)
+            totals[2] += len(moved_ids)
+    return tuple(totals)
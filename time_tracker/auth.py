@@ -0,0 +1,88 @@
+# time_tracker/auth.py
+import copy
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import LocalLRUCache
+
+User = get_user_model()
+
+# str(user id), as stored in the session -> (User, monotonic expiry time, stamp)
+_users = LocalLRUCache(max_entries=4096)
+
+
+def stamp_key(user_id):
+    return f'user_stamp:{user_id}'
+
+
+def restamp_user(user_id):
+    """
+    Gives the user a new stamp in the shared cache (CACHES 'default'), which
+    every process checks its cached copy against: with a cache shared by the
+    workers (REDIS_URL), a change reaches all of them on their next request.
+    """
+    cache.set(stamp_key(user_id), uuid.uuid4().hex, None)
+
+
+def forget_user(user_id):
+    """Drops a user from this process's cache and invalidates the other processes' copies."""
+    _users.set(str(user_id), None)
+    restamp_user(user_id)
+
+
+@receiver(setting_changed)
+def reset_user_cache(setting=None, **kwargs):
+    if setting in (None, 'USER_CACHE_SECONDS'):
+        _users.clear()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Staff toggles, deactivations and password changes take effect on the next request
+    forget_user(instance.pk)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose per-request user lookup (AuthenticationMiddleware's
+    second query, after the session) is served from a per-process cache for
+    USER_CACHE_SECONDS. Each hit is checked against the user's stamp in the
+    shared cache, which saving or deleting the user replaces, so no process
+    keeps serving a changed user. 0 seconds turns the cache off.
+    """
+
+    def cached_user(self, user_id, stamp):
+        hit = _users.get(str(user_id))
+        if hit and time.monotonic() < hit[1] and hit[2] == stamp:
+            # A copy, so one request's changes to the object never leak into another's
+            return copy.copy(hit[0])
+        return None
+
+    def remember(self, user, stamp):
+        if user is not None and settings.USER_CACHE_SECONDS > 0:
+            _users.set(str(user.pk), (copy.copy(user), time.monotonic() + settings.USER_CACHE_SECONDS, stamp))
+        return user
+
+    def get_user(self, user_id):
+        if settings.USER_CACHE_SECONDS <= 0:
+            return super().get_user(user_id)
+        # Read (or start) the stamp before the row: a change in between leaves the copy already stale
+        stamp = cache.get_or_set(stamp_key(user_id), uuid.uuid4().hex, None)
+        user = self.cached_user(user_id, stamp)
+        return user if user is not None else self.remember(super().get_user(user_id), stamp)
+
+    async def aget_user(self, user_id):
+        if settings.USER_CACHE_SECONDS <= 0:
+            return await super().aget_user(user_id)
+        stamp = await cache.aget_or_set(stamp_key(user_id), uuid.uuid4().hex, None)
+        user = self.cached_user(user_id, stamp)
+        return user if user is not None else self.remember(await super().aget_user(user_id), stamp)
@@ -0,0 +1,192 @@
+# time_tracker/benchmarks.py
+import statistics
+from datetime import timedelta
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from time_tracker.models import TimeEditRequest, TimeEntry
+from time_tracker.payroll import calculate_payroll
+from time_tracker.utils import calculate_time_period, get_period_totals
+from time_tracker.views import get_user_status
+from time_tracker.workload import generate_workload
+
+User = get_user_model()
+
+# name -> setup function; each setup takes a BenchmarkContext and returns the callable to time
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class BenchmarkContext:
+    """Synthetic data plus logged-in clients for one data size."""
+
+    def __init__(self, users, months, pending):
+        self.users = generate_workload(users=users, months=months, pending_requests=pending,
+                                       username_prefix='benchmark_user')
+        self.user = self.users[0]
+        self.date_to = timezone.localdate()
+        self.date_from = self.date_to - timedelta(days=30 * months)
+
+        self.staff = User.objects.create_user('benchmark_staff', is_staff=True, is_superuser=True)
+        self.client = Client(HTTP_HOST='127.0.0.1')
+        self.client.force_login(self.user)
+        self.staff_client = Client(HTTP_HOST='127.0.0.1')
+        self.staff_client.force_login(self.staff)
+
+    def get(self, client, url):
+        def request():
+            response = client.get(url)
+            assert response.status_code == 200, f"{url} returned {response.status_code}"
+        return request
+
+    def poll(self, client, url):
+        """A browser re-polling an unchanged page with the ETag it already has."""
+        etag = client.get(url)['ETag']
+
+        def request():
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304, f"{url} returned {response.status_code}"
+        return request
+
+
+def run_benchmark(setup, context, repeat):
+    """Times `repeat` calls of the benchmark and counts the queries of one call."""
+    action = setup(context)
+    action()  # Warm up caches and connections
+    timings = []
+    for _ in range(repeat):
+        started = perf_counter()
+        action()
+        timings.append((perf_counter() - started) * 1000)
+    with CaptureQueriesContext(connection) as queries:
+        action()
+    return {
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': len(queries),
+    }
+
+
+# --- Core calculations ---
+
+@benchmark('calculate_time_period')
+def bench_calculate_time_period(ctx):
+    return lambda: calculate_time_period(ctx.user, ctx.date_from, ctx.date_to)
+
+
+@benchmark('get_period_totals')
+def bench_get_period_totals(ctx):
+    return lambda: get_period_totals(ctx.user, ctx.date_from, ctx.date_to)
+
+
+@benchmark('get_user_status')
+def bench_get_user_status(ctx):
+    return lambda: get_user_status(ctx.user)
+
+
+@benchmark('calculate_payroll')
+def bench_calculate_payroll(ctx):
+    return lambda: calculate_payroll(ctx.date_from, ctx.date_to)
+
+
+# --- Views through the test client ---
+
+@benchmark('view:dashboard')
+def bench_dashboard(ctx):
+    return ctx.get(ctx.client, reverse('dashboard'))
+
+
+@benchmark('view:dashboard_poll')
+def bench_dashboard_poll(ctx):
+    return ctx.poll(ctx.client, reverse('dashboard'))
+
+
+@benchmark('view:reports')
+def bench_reports(ctx):
+    return ctx.get(ctx.client, f"{reverse('reports')}?date_from={ctx.date_from}&date_to={ctx.date_to}")
+
+
+@benchmark('view:reports_poll')
+def bench_reports_poll(ctx):
+    return ctx.poll(ctx.client, f"{reverse('reports')}?date_from={ctx.date_from}&date_to={ctx.date_to}")
+
+
+@benchmark('view:clock_action')
+def bench_clock_action(ctx):
+    actions = iter(['IN', 'OUT'] * 100000)
+
+    def clock():
+        response = ctx.client.post(reverse('clock_action'), {'action': next(actions)})
+        assert response.status_code == 302
+    return clock
+
+
+@benchmark('view:admin_user_management')
+def bench_admin_user_management(ctx):
+    return ctx.get(ctx.staff_client, f"{reverse('admin_user_management')}?user_id={ctx.user.id}")
+
+
+@benchmark('view:admin_review_requests')
+def bench_admin_review_requests(ctx):
+    return ctx.get(ctx.staff_client, reverse('admin_review_requests'))
+
+
+@benchmark('view:attendance_board')
+def bench_attendance_board(ctx):
+    return ctx.get(ctx.staff_client, reverse('attendance_board'))
+
+
+@benchmark('view:metrics')
+def bench_metrics(ctx):
+    return ctx.get(ctx.staff_client, reverse('metrics'))
+
+
+@benchmark('view:export_csv')
+def bench_export_csv(ctx):
+    url = f"{reverse('export_timesheets')}?date_from={ctx.date_from}&date_to={ctx.date_to}"
+
+    def export():
+        response = ctx.staff_client.get(url)
+        assert response.status_code == 200
+        for _ in response.streaming_content:
+            pass
+    return export
+
+
+# --- Admin bulk operations ---
+
+@benchmark('admin:delete_selected_entries')
+def bench_admin_bulk_delete(ctx):
+    """Deletes 50 entries through the Django admin changelist action."""
+    url = reverse('admin:time_tracker_timeentry_changelist')
+    victims = iter(TimeEntry.objects.order_by('id').values_list('id', flat=True))
+
+    def delete():
+        ids = [next(victims) for _ in range(50)]
+        response = ctx.staff_client.post(url, {'action': 'delete_selected', '_selected_action': ids, 'post': 'yes'})
+        assert response.status_code == 302
+    return delete
+
+
+@benchmark('admin:accept_edit_request')
+def bench_accept_edit_request(ctx):
+    pending = iter(TimeEditRequest.objects.filter(status='PENDING').order_by('id').values_list('id', flat=True))
+
+    def accept():
+        request_id = next(pending, None)
+        if request_id is not None:
+            ctx.staff_client.post(reverse('admin_process_request', args=[request_id]), {'action': 'accept'})
+    return accept
@@ -0,0 +1,115 @@
+# time_tracker/cache.py
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .metrics import registry
+
+
+class LocalLRUCache:
+    """Per-process cache holding at most max_entries items, evicting the least recently used."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    # In-memory, so the async API needs no thread hop
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value):
+        self.set(key, value)
+
+
+class DjangoCacheBackend:
+    """Shared cache through one of the project's CACHES aliases (e.g. Redis or Memcached)."""
+
+    def __init__(self, alias='default', timeout=24 * 60 * 60):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+    async def aget(self, key):
+        return await self.cache.aget(key)
+
+    async def aset(self, key, value):
+        await self.cache.aset(key, value, self.timeout)
+
+
+_backend = None
+
+
+def get_totals_cache():
+    """The backend configured in settings.TOTALS_CACHE, built once per process."""
+    global _backend
+    if _backend is None:
+        config = getattr(settings, 'TOTALS_CACHE', {})
+        backend_class = import_string(config.get('BACKEND', 'time_tracker.cache.LocalLRUCache'))
+        _backend = backend_class(**config.get('OPTIONS', {}))
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_totals_cache(setting=None, **kwargs):
+    """Drops the backend so the next call rebuilds it (and empties a local cache)."""
+    global _backend
+    if setting in (None, 'TOTALS_CACHE'):
+        _backend = None
+
+
+def cached(key, compute):
+    """Returns the cached value for key, or computes, stores and returns it."""
+    cache = get_totals_cache()
+    value = cache.get(key)
+    if value is not None:
+        registry.increment('timetracker_totals_cache_hits_total')
+        return value
+    registry.increment('timetracker_totals_cache_misses_total')
+    value = compute()
+    cache.set(key, value)
+    return value
+
+
+async def acached(key, compute):
+    """cached() for async views; compute is a coroutine function."""
+    cache = get_totals_cache()
+    value = await cache.aget(key)
+    if value is not None:
+        registry.increment('timetracker_totals_cache_hits_total')
+        return value
+    registry.increment('timetracker_totals_cache_misses_total')
+    value = await compute()
+    await cache.aset(key, value)
+    return value
@@ -0,0 +1,15 @@
+# time_tracker/context_processors.py
+from functools import partial
+
+from .models import Counter
+
+
+def pending_requests(request):
+    """
+    The staff nav badge's pending edit request count. It is passed as a callable,
+    so it is only read (from Counter's per-process cache) if a template shows it.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_staff:
+        return {}
+    return {'pending_request_count': partial(Counter.cached, 'pending_requests')}
@@ -0,0 +1,105 @@
+# time_tracker/exports.py
+import csv
+import heapq
+from itertools import groupby
+
+from time_tracker.archive import iter_archived_entries
+from time_tracker.models import TimeEntry
+from time_tracker.utils import replay_steps
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+EXPORT_COLUMNS = [
+    'user_id', 'username', 'date', 'timestamp', 'action_type', 'work_seconds', 'break_seconds',
+]
+EXPORT_CHUNK_SIZE = 5000
+
+
+def parquet_available():
+    return pyarrow is not None
+
+
+def iter_export_rows(start_date, end_date, user_ids=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields one row per TimeEntry in the date range, in EXPORT_COLUMNS order. The
+    work/break columns hold the time each punch adds under the clocking state
+    machine, so a user's column sums equal calculate_time_period for the range.
+    Entries are read through a server-side cursor so memory use does not grow
+    with the size of the export. Archived days are merged back in.
+    """
+    entries = TimeEntry.objects.filter(date_only__range=(start_date, end_date))
+    if user_ids:
+        entries = entries.filter(user_id__in=user_ids)
+    entries = entries.order_by('user_id', 'timestamp', 'id').values_list(
+        'id', 'user_id', 'user__username', 'date_only', 'timestamp', 'action_type', named=True
+    ).iterator(chunk_size=chunk_size)
+    entries = heapq.merge(entries, iter_archived_entries(start_date, end_date, user_ids or None),
+                          key=lambda entry: (entry.user_id, entry.timestamp, entry.id))
+
+    for _, user_entries in groupby(entries, key=lambda entry: entry.user_id):
+        for entry, work_delta, break_delta, _ in replay_steps(user_entries):
+            yield [
+                entry.user_id,
+                entry.user__username,
+                entry.date_only.isoformat(),
+                entry.timestamp.isoformat(),
+                entry.action_type,
+                work_delta.total_seconds(),
+                break_delta.total_seconds(),
+            ]
+
+
+class Echo:
+    """A file-like object that hands back what is written, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """Yields the CSV text for the header and each row, one line at a time."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_parquet(rows, destination, batch_size=EXPORT_CHUNK_SIZE):
+    """
+    Writes rows to a Parquet file one row group per batch, so memory stays
+    bounded by batch_size. Requires pyarrow.
+    """
+    if pyarrow is None:
+        raise RuntimeError("Parquet export requires the pyarrow package.")
+
+    schema = pyarrow.schema([
+        ('user_id', pyarrow.int64()),
+        ('username', pyarrow.string()),
+        ('date', pyarrow.string()),
+        ('timestamp', pyarrow.string()),
+        ('action_type', pyarrow.string()),
+        ('work_seconds', pyarrow.float64()),
+        ('break_seconds', pyarrow.float64()),
+    ])
+
+    with pyarrow.parquet.ParquetWriter(destination, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_batch(_record_batch(batch, schema))
+                batch = []
+        if batch:
+            writer.write_batch(_record_batch(batch, schema))
+
+
+def _record_batch(rows, schema):
+    columns = list(zip(*rows))
+    return pyarrow.RecordBatch.from_arrays(
+        [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
@@ -1,9 +1,58 @@
 from django import forms
+from django.urls import reverse_lazy
 from .models import TimeEntry
 from .models import TimeEntry, TimeEditRequest
 from django.utils import timezone
 
 
+# --- Lazy choice lookups ---
+def entry_choice_label(entry):
+    """How a time entry is shown in pickers (and the entry lookup's JSON)."""
+    return f"{timezone.localtime(entry.timestamp):%a %d %b %Y %H:%M} - {entry.get_action_type_display()}"
+
+
+def user_choice_label(user):
+    """How a user is shown in pickers (and the user lookup's JSON)."""
+    label = user.username
+    if user.first_name:
+        label += f" ({user.first_name} {user.last_name})".rstrip()
+    if user.is_staff:
+        label += " (STAFF)"
+    return label
+
+
+class LookupSelect(forms.Select):
+    """
+    A select that only renders the selected option, so the page stays the same
+    size however many rows the queryset has. scripts.js fills in the rest
+    as the user types, from the JSON view at `lookup_url`.
+    """
+
+    def __init__(self, lookup_url, attrs=None):
+        super().__init__(attrs)
+        self.lookup_url = lookup_url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-lookup-url'] = str(self.lookup_url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        selected = [pk for pk in value if str(pk).isdigit()]
+        options = []
+        if not selected and field.empty_label is not None:
+            options.append(self.create_option(name, '', field.empty_label, True, 0))
+        for index, obj in enumerate(field.queryset.filter(pk__in=selected), len(options)):
+            options.append(self.create_option(name, obj.pk, field.label_from_instance(obj), True, index))
+        return [(None, options, 0)]
+
+
+class EntryChoiceField(forms.ModelChoiceField):
+    def label_from_instance(self, obj):
+        return entry_choice_label(obj)
+
+
 # --- 1. Admin Time Entry Form (Used for Manual Submission) ---
 class AdminTimeEntryForm(forms.Form):
     date = forms.DateField(
@@ -22,9 +71,9 @@ class AdminTimeEntryForm(forms.Form):
 
 
 class UserEditRequestForm(forms.ModelForm):
-    original_entry = forms.ModelChoiceField(
-        queryset=TimeEntry.objects.all(),
-        widget=forms.Select(attrs={'class': 'form-control'}),
+    original_entry = EntryChoiceField(
+        queryset=TimeEntry.objects.none(),
+        widget=LookupSelect(reverse_lazy('lookup_entries'), attrs={'class': 'form-control'}),
         label='Select Entry to Modify'
     )
     requested_timestamp = forms.DateTimeField(
@@ -39,4 +88,10 @@ class UserEditRequestForm(forms.ModelForm):
         fields = ['original_entry', 'requested_timestamp', 'request_reason']
         widgets = {
             'request_reason': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'})
-        }
\ No newline at end of file
+        }
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the requester's own entries can be picked (or submitted)
+        if user is not None:
+            self.fields['original_entry'].queryset = TimeEntry.objects.filter(user=user)
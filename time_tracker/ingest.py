@@ -0,0 +1,154 @@
+# time_tracker/ingest.py
+from datetime import timedelta
+from itertools import groupby
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import DailySummary, DirtyUserDay, Shift, TimeEntry, UserStatus, deferred_refresh
+from .utils import CLOCK_TRANSITIONS
+
+User = get_user_model()
+
+INGEST_CHUNK_SIZE = 2000
+# Terminal clocks drift; punches further ahead of the server clock than this are refused
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def parse_event(event, now):
+    """Returns (user_id, timestamp, action) for one uploaded event, or raises ValueError."""
+    if not isinstance(event, dict):
+        raise ValueError("Event must be an object.")
+    try:
+        user_id = int(event['user_id'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Missing or invalid user_id.")
+
+    action = event.get('action')
+    if action not in CLOCK_TRANSITIONS:
+        raise ValueError(f"Unknown action '{action}'.")
+
+    timestamp = parse_datetime(event['timestamp']) if isinstance(event.get('timestamp'), str) else None
+    if timestamp is None:
+        raise ValueError("Missing or invalid ISO 8601 timestamp.")
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    if timestamp > now + MAX_CLOCK_SKEW:
+        raise ValueError("Timestamp is in the future.")
+    return user_id, timestamp, action
+
+
+def ingest_clock_events(events):
+    """
+    Validates a batch of offline punches and stores the accepted ones.
+
+    Each user's events are replayed in timestamp order against the IN/OUT/BREAK
+    state machine, starting from their (locked) status row. An event older than
+    the user's last punch is rejected, unless it is already stored, in which case
+    it is reported as a duplicate so terminals can safely re-upload. Accepted
+    events are bulk-inserted in chunks and the derived tables are refreshed once
+    per user/day.
+
+    Returns one result per event, in input order:
+    {'index', 'event_id', 'status': 'accepted'|'duplicate'|'rejected', 'error'}.
+    """
+    now = timezone.now()
+    results = [None] * len(events)
+
+    def result(index, status, error=''):
+        event = events[index]
+        event_id = event.get('event_id') if isinstance(event, dict) else None
+        results[index] = {'index': index, 'event_id': event_id, 'status': status, 'error': error}
+
+    # --- PARSING ---
+    parsed = []
+    for index, event in enumerate(events):
+        try:
+            user_id, timestamp, action = parse_event(event, now)
+        except ValueError as error:
+            result(index, 'rejected', str(error))
+            continue
+        parsed.append((user_id, timestamp, index, action))
+
+    known_users = set()
+    user_ids = sorted({user_id for user_id, *_ in parsed})
+    for start in range(0, len(user_ids), 500):
+        known_users.update(User.objects.filter(id__in=user_ids[start:start + 500]).values_list('id', flat=True))
+
+    # Sorting by (user, timestamp, upload position) gives each user's replay order
+    parsed.sort()
+
+    with transaction.atomic():
+        UserStatus.objects.bulk_create(
+            [UserStatus(user_id=user_id) for user_id in sorted(known_users)],
+            batch_size=500, ignore_conflicts=True,
+        )
+        statuses = UserStatus.objects.select_for_update().in_bulk(sorted(known_users))
+
+        # --- STATE MACHINE REPLAY ---
+        new_entries, stale, user_days, first_new = [], [], {}, {}
+        for user_id, user_events in groupby(parsed, key=lambda item: item[0]):
+            if user_id not in known_users:
+                for _, _, index, _ in user_events:
+                    result(index, 'rejected', f"Unknown user {user_id}.")
+                continue
+
+            status = statuses[user_id]
+            state = {field: getattr(status, field)
+                     for field in ('state', 'last_action', 'last_timestamp', 'shift_start', 'break_start')}
+            for _, timestamp, index, action in user_events:
+                if state['last_timestamp'] and timestamp <= state['last_timestamp']:
+                    if timestamp == state['last_timestamp'] and action == state['last_action']:
+                        result(index, 'duplicate')
+                    elif timestamp < state['last_timestamp']:
+                        stale.append((user_id, timestamp, index, action))
+                    else:
+                        result(index, 'rejected', "Another punch has the same timestamp.")
+                    continue
+                if state['state'] not in CLOCK_TRANSITIONS[action]:
+                    result(index, 'rejected', f"Cannot {action} while {state['state']}.")
+                    continue
+
+                state.update(UserStatus.transition_fields(action, timestamp))
+                new_entries.append(TimeEntry(user_id=user_id, timestamp=timestamp, action_type=action,
+                                             date_only=timestamp.date()))
+                user_days.setdefault(user_id, set()).add(timestamp.date())
+                first_new.setdefault(user_id, timestamp)
+                result(index, 'accepted')
+
+            if user_id in user_days:
+                for field, value in state.items():
+                    setattr(status, field, value)
+                status.data_version += 1
+
+        # Older than the last punch: only acceptable as a re-upload of a stored entry
+        for user_id, user_stale in groupby(stale, key=lambda item: item[0]):
+            user_stale = list(user_stale)
+            stored = set(TimeEntry.objects.filter(
+                user_id=user_id,
+                timestamp__range=(user_stale[0][1], user_stale[-1][1]),
+            ).values_list('timestamp', 'action_type'))
+            for _, timestamp, index, action in user_stale:
+                if (timestamp, action) in stored:
+                    result(index, 'duplicate')
+                else:
+                    result(index, 'rejected', "Older than the user's last punch.")
+
+        # --- WRITES ---
+        TimeEntry.objects.bulk_create(new_entries, batch_size=INGEST_CHUNK_SIZE)
+        # An upsert on the (locked) status rows is far cheaper than bulk_update's CASE WHEN
+        UserStatus.objects.bulk_create(
+            [statuses[user_id] for user_id in user_days], batch_size=500,
+            update_conflicts=True, unique_fields=['user'],
+            update_fields=['state', 'last_action', 'last_timestamp', 'shift_start', 'break_start', 'data_version'],
+        )
+        if deferred_refresh():
+            DirtyUserDay.mark_many(user_days)
+        else:
+            DailySummary.recompute_many(user_days)
+            for user_id, since in first_new.items():
+                Shift.rebuild_from(user_id, since)
+
+    return results
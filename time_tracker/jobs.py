@@ -0,0 +1,155 @@
+# time_tracker/jobs.py
+import csv
+import io
+import tempfile
+import time
+import traceback
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from .exports import iter_csv, iter_export_rows, parquet_available, write_parquet
+from .models import ArchivedDay, Job, TimeEntry
+from .payroll import calculate_payroll
+
+User = get_user_model()
+
+# kind -> handler; each handler takes (params, progress) and returns (content bytes, filename, content type)
+JOB_HANDLERS = {}
+
+# Running jobs whose heartbeat is older than this are assumed lost and requeued
+JOB_STALE_AFTER = timedelta(minutes=10)
+JOB_MAX_ATTEMPTS = 3
+# A running job's heartbeat is refreshed at least this often while it reports progress
+JOB_HEARTBEAT_EVERY = timedelta(seconds=30)
+
+
+def job_handler(kind):
+    def register(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+def submit_job(owner, kind, params):
+    """Queues a job for the run_jobs worker."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'.")
+    return Job.objects.create(owner=owner, kind=kind, params=params)
+
+
+class ProgressReporter:
+    """
+    Writes a job's progress percentage when it changes, and its heartbeat at least
+    every JOB_HEARTBEAT_EVERY, so a long job is not requeued as stale. Nothing is
+    written once another worker owns the job.
+    """
+
+    def __init__(self, job_id, worker):
+        self.job_id = job_id
+        self.worker = worker
+        self.percent = 0
+        self.beat_at = time.monotonic()
+
+    def __call__(self, done, total):
+        percent = min(99, int(done * 100 / total)) if total else 0
+        now = time.monotonic()
+        if percent != self.percent or now - self.beat_at >= JOB_HEARTBEAT_EVERY.total_seconds():
+            self.percent = percent
+            self.beat_at = now
+            owned_job(self.job_id, self.worker).update(progress=percent, heartbeat_at=timezone.now())
+
+
+def owned_job(job_id, worker):
+    """The job's row while it is still RUNNING for this worker (not requeued and claimed by another)."""
+    return Job.objects.filter(id=job_id, worker=worker, status='RUNNING')
+
+
+def run_job(job_id, worker):
+    """
+    Runs one job claimed by worker and stores its result or the traceback.
+    Returns (job_id, final status); 'LOST' if the job was requeued meanwhile,
+    in which case nothing is written.
+    """
+    try:
+        job = Job.objects.defer('result').get(id=job_id)
+        content, filename, content_type = JOB_HANDLERS[job.kind](job.params, ProgressReporter(job_id, worker))
+    except Exception:
+        failed = owned_job(job_id, worker).update(status='FAILED', error=traceback.format_exc(),
+                                                  finished_at=timezone.now())
+        return job_id, 'FAILED' if failed else 'LOST'
+
+    done = owned_job(job_id, worker).update(
+        status='DONE', progress=100, result=content, result_name=filename,
+        content_type=content_type, finished_at=timezone.now(),
+    )
+    return job_id, 'DONE' if done else 'LOST'
+
+
+def run_pooled_job(job_id, worker):
+    """run_job for the worker's pool processes, which outlive many jobs (like a request cycle)."""
+    close_old_connections()
+    try:
+        return run_job(job_id, worker)
+    finally:
+        close_old_connections()
+
+
+# --- HANDLERS ---
+
+def _counting(rows, total, progress, every=5000):
+    for done, row in enumerate(rows, 1):
+        if done % every == 0:
+            progress(done, total)
+        yield row
+
+
+@job_handler('timesheet_export')
+def export_timesheets_job(params, progress):
+    """
+    The export_timesheets view's output, built in the background.
+    params: date_from, date_to, user_ids (None for everyone), format ('csv' or 'parquet').
+    """
+    date_from, date_to = date.fromisoformat(params['date_from']), date.fromisoformat(params['date_to'])
+    user_ids = params.get('user_ids')
+
+    entries = TimeEntry.objects.filter(date_only__range=(date_from, date_to))
+    archived = ArchivedDay.objects.filter(day__range=(date_from, date_to))
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        archived = archived.filter(user_id__in=user_ids)
+    total = entries.count() + (archived.aggregate(total=Sum('entry_count'))['total'] or 0)
+    rows = _counting(iter_export_rows(date_from, date_to, user_ids), total, progress)
+    filename = f"timesheets_{date_from.isoformat()}_{date_to.isoformat()}"
+
+    if params.get('format') == 'parquet':
+        if not parquet_available():
+            raise RuntimeError("Parquet export requires the pyarrow package.")
+        with tempfile.TemporaryFile() as output:
+            write_parquet(rows, output)
+            output.seek(0)
+            return output.read(), f"{filename}.parquet", 'application/vnd.apache.parquet'
+
+    output = io.StringIO()
+    output.writelines(iter_csv(rows))
+    return output.getvalue().encode(), f"{filename}.csv", 'text/csv'
+
+
+@job_handler('payroll_report')
+def payroll_report_job(params, progress):
+    """Work and break hours for every user over a date range, as CSV. params: date_from, date_to."""
+    date_from, date_to = date.fromisoformat(params['date_from']), date.fromisoformat(params['date_to'])
+    totals = calculate_payroll(date_from, date_to)
+    progress(1, 2)
+    usernames = dict(User.objects.filter(id__in=totals).values_list('id', 'username'))
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['user_id', 'username', 'work_hours', 'break_hours'])
+    for user_id in sorted(totals, key=lambda user_id: usernames[user_id]):
+        writer.writerow([user_id, usernames[user_id], totals[user_id]['work_duration'],
+                         totals[user_id]['break_duration']])
+    return output.getvalue().encode(), f"payroll_{date_from.isoformat()}_{date_to.isoformat()}.csv", 'text/csv'
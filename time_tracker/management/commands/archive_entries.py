@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from time_tracker.archive import archive_closed_days, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves time entries older than ARCHIVE_AFTER_DAYS (whole months) from the hot "
+        "TimeEntry table into compressed ArchivedDay rows. Daily summaries stay, so totals "
+        "are unchanged; exports, payroll and rebuilds read the archive back. Safe to run "
+        "repeatedly, e.g. from a nightly scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat,
+                            help="Archive days before this date (YYYY-MM-DD). Defaults to the archive cutoff; "
+                                 "later dates are refused.")
+        parser.add_argument('--user', type=int, nargs='+', dest='user_ids', help="Only these user ids.")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff()
+        before = options['before'] or cutoff
+        if before > cutoff:
+            raise CommandError(f"Only days before {cutoff} (ARCHIVE_AFTER_DAYS) may be archived.")
+
+        users, days, entries = archive_closed_days(before, options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {entries} entries ({days} user-days) for {users} users, before {before}."))
@@ -0,0 +1,76 @@
+import json
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from time_tracker.models import DailySummary, TimeEntry
+from time_tracker.workload import workday_punches
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Uploads one large batch of terminal punches through the ingestion endpoint, "
+        "then the same batch again (all duplicates), and reports throughput. The data "
+        "is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic(), override_settings(CLOCK_TERMINAL_TOKENS=['benchmark-terminal'],
+                                                     CLOCK_INGEST_MAX_EVENTS=options['events']):
+            users = User.objects.bulk_create(
+                [User(username=f'ingest_bench_{n}') for n in range(options['users'])])
+            events = self.build_events(rng, users, options['events'])
+            body = json.dumps({'events': events})
+
+            client = Client(HTTP_HOST='127.0.0.1', HTTP_AUTHORIZATION='Bearer benchmark-terminal')
+            for label in ('First upload', 'Re-upload'):
+                started = time.perf_counter()
+                response = client.post(reverse('clock_events_api'), body, content_type='application/json')
+                seconds = time.perf_counter() - started
+                payload = response.json()
+                self.stdout.write(
+                    f"{label}: {seconds:.2f}s ({len(events) / seconds:,.0f} events/s) - "
+                    f"{payload['accepted']} accepted, {payload['duplicate']} duplicate, "
+                    f"{payload['rejected']} rejected"
+                )
+
+            stored = TimeEntry.objects.filter(user__in=users).count()
+            summaries = DailySummary.objects.filter(user__in=users).count()
+            self.stdout.write(f"Stored {stored} entries and {summaries} daily summaries.")
+            transaction.set_rollback(True)
+
+    def build_events(self, rng, users, count):
+        """Valid weekday punch sequences spread over the users, in shuffled upload order."""
+        per_user = -(-count // len(users))
+        days_back = per_user // 3 + 2
+        events = []
+        for user in users:
+            day = timezone.localdate() - timedelta(days=days_back)
+            user_events = []
+            while len(user_events) < per_user:
+                user_events += [
+                    {'user_id': user.id, 'action': action, 'timestamp': when.isoformat(),
+                     'event_id': f'{user.id}-{when.timestamp():.0f}'}
+                    for action, when in workday_punches(rng, day)
+                ]
+                day += timedelta(days=1)
+            events += user_events[:per_user]
+        events = events[:count]
+        rng.shuffle(events)
+        return events
@@ -0,0 +1,64 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from time_tracker.models import TimeEntry
+from time_tracker.payroll import calculate_payroll
+from time_tracker.sql_totals import EPOCH_MICROSECONDS, sql_period_totals
+from time_tracker.utils import calculate_time_period, to_hours
+from time_tracker.workload import generate_workload
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares calculate_time_period (one call per user) with the batch payroll "
+        "engine and, where the database supports it, the SQL window-function engine on "
+        "synthetic data. The data is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--months', type=int, default=1)
+
+    def handle(self, *args, **options):
+        end_date = date(2025, 2, 1)
+        start_date = end_date - timedelta(days=30 * options['months'])
+
+        with transaction.atomic():
+            users = generate_workload(users=options['users'], months=options['months'], end_date=end_date,
+                                      username_prefix='payroll_bench', with_derived=False)
+
+            started = time.perf_counter()
+            per_user = {user.id: calculate_time_period(user, start_date, end_date) for user in users}
+            loop_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            batch = calculate_payroll(start_date, end_date)
+            batch_seconds = time.perf_counter() - started
+
+            sql_seconds = None
+            if connections[TimeEntry.objects.db].vendor in EPOCH_MICROSECONDS:
+                started = time.perf_counter()
+                sql = sql_period_totals(start_date, end_date)
+                sql_seconds = time.perf_counter() - started
+
+            mismatches = [
+                user_id for user_id, totals in per_user.items()
+                if (totals['work_duration'], totals['break_duration'])
+                != (batch[user_id]['work_duration'], batch[user_id]['break_duration'])
+                or (sql_seconds is not None and (totals['work_duration'], totals['break_duration'])
+                    != tuple(to_hours(us / 1_000_000) for us in sql[user_id]))
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Per-user loop: {loop_seconds:.2f}s")
+        self.stdout.write(f"Batch engine:  {batch_seconds:.2f}s")
+        self.stdout.write(f"Speedup:       {loop_seconds / batch_seconds:.1f}x")
+        if sql_seconds is not None:
+            self.stdout.write(f"SQL engine:    {sql_seconds:.2f}s ({loop_seconds / sql_seconds:.1f}x)")
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{len(mismatches)} users differ, e.g. {mismatches[:5]}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Results identical for {len(per_user)} users."))
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from time_tracker.exports import iter_csv, iter_export_rows, parquet_available, write_parquet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Streams time entries and per-punch durations for a date range to CSV or Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('date_from', type=date.fromisoformat, help="First day (YYYY-MM-DD).")
+        parser.add_argument('date_to', type=date.fromisoformat, help="Last day (YYYY-MM-DD).")
+        parser.add_argument('--user', action='append', dest='usernames', default=[],
+                            help="Only export this username (repeatable). Defaults to all users.")
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+        parser.add_argument('--output', help="File to write. CSV defaults to stdout.")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(User.objects.filter(username__in=options['usernames']).values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError("One or more usernames do not exist.")
+
+        rows = iter_export_rows(options['date_from'], options['date_to'], user_ids, options['chunk_size'])
+
+        if options['format'] == 'parquet':
+            if not parquet_available():
+                raise CommandError("Parquet export requires the pyarrow package.")
+            if not options['output']:
+                raise CommandError("--output is required for Parquet export.")
+            write_parquet(rows, options['output'], batch_size=options['chunk_size'])
+            return
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(iter_csv(rows))
+        else:
+            for line in iter_csv(rows):
+                self.stdout.write(line, ending='')
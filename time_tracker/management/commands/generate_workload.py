@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from time_tracker.workload import WORKLOAD_PASSWORD, generate_workload
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the database with synthetic users, months of valid IN/BREAK/OUT "
+        "sequences and pending edit requests, for benchmarking and load tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--months', type=int, default=3)
+        parser.add_argument('--pending', type=int, default=20, help="Pending edit requests to create.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='loadtest_user', help="Username prefix for created users.")
+
+    def handle(self, *args, **options):
+        users = generate_workload(
+            users=options['users'],
+            months=options['months'],
+            pending_requests=options['pending'],
+            seed=options['seed'],
+            username_prefix=options['prefix'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(users)} users ({options['prefix']}_0 ...) with password '{WORKLOAD_PASSWORD}'."
+        ))
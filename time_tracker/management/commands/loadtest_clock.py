@@ -0,0 +1,149 @@
+import http.cookiejar
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from time_tracker.workload import WORKLOAD_PASSWORD, generate_workload
+
+User = get_user_model()
+
+SERVERS = {
+    'wsgi': ['config.wsgi', '-c', 'config/gunicorn_wsgi.py'],
+    'asgi': ['config.asgi:application', '-c', 'config/gunicorn_asgi.py'],
+}
+USERNAME_PREFIX = 'loadtest_clock'
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Time the clock POST on its own instead of following its redirect to the dashboard."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Shift-change load test: starts gunicorn with the WSGI and/or ASGI profile at the "
+        "same worker count, has --concurrency logged-in users alternate clock POSTs and "
+        "dashboard loads for --duration seconds, and reports p50/p99 latency and requests "
+        "per second. Run it against the database the servers will use (ideally PostgreSQL); "
+        "the load-test users are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+        parser.add_argument('--workers', type=int, default=2, help="Worker processes for every profile.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Simultaneous users.")
+        parser.add_argument('--duration', type=float, default=20, help="Seconds of load per server.")
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        users = generate_workload(users=options['concurrency'], months=1, username_prefix=USERNAME_PREFIX)
+        try:
+            for server in options['servers']:
+                process = self.start_server(server, options['workers'], options['port'])
+                try:
+                    self.report(server, self.run_load(options['port'], users, options['duration']))
+                finally:
+                    process.terminate()
+                    process.wait()
+        finally:
+            User.objects.filter(username__startswith=f'{USERNAME_PREFIX}_').delete()
+
+    def start_server(self, server, workers, port):
+        env = {**os.environ, 'WEB_CONCURRENCY': str(workers)}
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', *SERVERS[server], '--bind', f'127.0.0.1:{port}'],
+            cwd=Path(settings.BASE_DIR), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/accounts/login/', timeout=1)
+                return process
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+        process.terminate()
+        raise RuntimeError(f"The {server} server did not start on port {port}.")
+
+    def run_load(self, port, users, duration):
+        base = f'http://127.0.0.1:{port}'
+        timings = {'clock_action': [], 'dashboard': []}
+        errors = []
+        lock = threading.Lock()
+        stop_at = []
+        # Everyone logs in first; the measured window starts when the last user is ready
+        start_barrier = threading.Barrier(len(users), action=lambda: stop_at.append(time.monotonic() + duration))
+
+        def worker(user):
+            cookies = http.cookiejar.CookieJar()
+            opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies), NoRedirect)
+
+            def csrf_token():
+                return next(cookie.value for cookie in cookies if cookie.name == 'csrftoken')
+
+            def post(path, data):
+                body = urllib.parse.urlencode({**data, 'csrfmiddlewaretoken': csrf_token()}).encode()
+                try:
+                    return opener.open(base + path, body).status
+                except urllib.error.HTTPError as error:
+                    return error.code
+
+            opener.open(base + '/accounts/login/').read()
+            post('/accounts/login/', {'username': user.username, 'password': WORKLOAD_PASSWORD})
+
+            start_barrier.wait()
+            actions = ['IN', 'OUT']
+            n = 0
+            while time.monotonic() < stop_at[0]:
+                for name, call in (
+                    ('clock_action', lambda: post('/clock/', {'action': actions[n % 2]})),
+                    ('dashboard', lambda: opener.open(base + '/').read() and 200),
+                ):
+                    started = time.perf_counter()
+                    try:
+                        status = call()
+                    except (urllib.error.URLError, ConnectionError) as error:
+                        status = str(error)
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        timings[name].append(elapsed)
+                        if status not in (200, 302):
+                            errors.append(status)
+                n += 1
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, errors, duration
+
+    def report(self, server, result):
+        timings, errors, duration = result
+        total = sum(len(values) for values in timings.values())
+        self.stdout.write(f"{server.upper()}: {total / duration:,.1f} requests/s, {len(errors)} errors")
+        for name, values in timings.items():
+            if values:
+                self.stdout.write(
+                    f"  {name:<13} n={len(values):<6} p50={statistics.median(values) * 1000:7.1f}ms "
+                    f"p99={percentile(values, 0.99) * 1000:7.1f}ms"
+                )
+        if errors:
+            self.stdout.write(f"  first errors: {errors[:5]}")
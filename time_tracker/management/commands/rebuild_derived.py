@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from time_tracker.models import ArchivedDay, Counter, DailySummary, DirtyUserDay, Shift, TimeEntry, UserStatus
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the tables derived from time entries (user status, daily summaries, "
+        "shifts and breaks) from scratch, for every user or the given ones, and recounts "
+        "the pending request counter. Use after imports or manual SQL that bypassed "
+        "TimeEntry.save() or TimeEditRequest.save()."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, nargs='+', dest='user_ids', help="Only these user ids.")
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids'] or list(User.objects.order_by('id').values_list('id', flat=True))
+
+        for user_id in user_ids:
+            with transaction.atomic():
+                days = set(TimeEntry.objects.filter(user_id=user_id).values_list('date_only', flat=True))
+                days |= set(ArchivedDay.objects.filter(user_id=user_id).values_list('day', flat=True))
+                DailySummary.objects.filter(user_id=user_id).exclude(day__in=days).delete()
+                DailySummary.recompute_many({user_id: days})
+                UserStatus.rebuild_for(user_id)
+                Shift.rebuild_from(user_id)
+                DirtyUserDay.objects.filter(user_id=user_id).delete()
+                UserStatus.bump_version(user_id)
+        Counter.recount('pending_requests')
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt derived data for {len(user_ids)} users."))
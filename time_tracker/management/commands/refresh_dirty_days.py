@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from time_tracker.models import DirtyUserDay
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the daily summaries and shifts of user-days marked dirty by entry "
+        "writes (DERIVED_REFRESH_MODE = 'deferred'), oldest marks first. With --loop it "
+        "keeps running as a background worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new dirty days.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to sleep when idle (with --loop).")
+        parser.add_argument('--batch', type=int, default=100, help="Users refreshed per pass.")
+
+    def handle(self, *args, **options):
+        while True:
+            refreshed = DirtyUserDay.refresh(limit=options['batch'])
+            if refreshed:
+                self.stdout.write(f"Refreshed {refreshed} user-days.")
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['interval'])
@@ -0,0 +1,93 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from time_tracker.benchmarks import BENCHMARKS, BenchmarkContext, run_benchmark
+
+
+def parse_size(value):
+    """'50x3' -> (50 users, 3 months)."""
+    try:
+        users, months = value.lower().split('x')
+        return int(users), int(months)
+    except ValueError:
+        raise CommandError(f"Invalid size '{value}', expected USERSxMONTHS such as 50x3.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the core calculations, every view and admin bulk operations at several "
+        "data sizes and writes the results as JSON. Each size is generated inside a "
+        "transaction that is rolled back, so the database is left unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', default=['10x1', '50x3', '200x6'],
+                            help="Data sizes as USERSxMONTHS.")
+        parser.add_argument('--pending', type=int, default=100, help="Pending edit requests per size.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="Run only these benchmarks.")
+        parser.add_argument('--output', help="Write results to this JSON file (default: stdout).")
+        parser.add_argument('--compare', help="Previous results file to compare against.")
+        parser.add_argument('--threshold', type=float, default=1.25,
+                            help="Median slowdown ratio that counts as a regression.")
+
+    def handle(self, *args, **options):
+        names = options['only'] or list(BENCHMARKS)
+        results = []
+
+        for size in options['sizes']:
+            users, months = parse_size(size)
+            with transaction.atomic():
+                context = BenchmarkContext(users, months, options['pending'])
+                for name in names:
+                    result = run_benchmark(BENCHMARKS[name], context, options['repeat'])
+                    results.append({'size': size, 'name': name, **result})
+                    self.stderr.write(f"{size:>8} {name:<32} {result['median_ms']:>10.2f}ms "
+                                      f"{result['queries']:>5} queries")
+                transaction.set_rollback(True)
+
+        report = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'repeat': options['repeat'],
+            },
+            'results': results,
+        }
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(payload)
+        else:
+            self.stdout.write(payload)
+
+        if options['compare']:
+            self.compare(options['compare'], results, options['threshold'])
+
+    def compare(self, path, results, threshold):
+        with open(path) as previous_file:
+            previous = {(row['size'], row['name']): row for row in json.load(previous_file)['results']}
+
+        regressions = []
+        for row in results:
+            before = previous.get((row['size'], row['name']))
+            if not before:
+                continue
+            ratio = row['median_ms'] / before['median_ms'] if before['median_ms'] else 1
+            if ratio > threshold or row['queries'] > before['queries']:
+                regressions.append(
+                    f"{row['size']} {row['name']}: {before['median_ms']:.2f}ms -> {row['median_ms']:.2f}ms "
+                    f"({ratio:.2f}x), queries {before['queries']} -> {row['queries']}"
+                )
+
+        if regressions:
+            # CommandError exits with status 1 from the command line (failing a CI step)
+            raise CommandError("Regressions:\n  " + "\n  ".join(regressions))
+        self.stderr.write(self.style.SUCCESS("No regressions."))
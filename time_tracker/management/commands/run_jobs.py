@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from time_tracker.jobs import JOB_MAX_ATTEMPTS, JOB_STALE_AFTER, run_job, run_pooled_job
+from time_tracker.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued background jobs (exports, payroll reports) in a pool of worker "
+        "processes. Jobs are claimed from the database, so several workers can run side "
+        "by side. With --loop it keeps polling, e.g. as a Procfile worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2,
+                            help="Pool size. 0 runs jobs one at a time in this process.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new jobs.")
+        parser.add_argument('--interval', type=float, default=2, help="Seconds between queue polls.")
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        if options['processes'] == 0:
+            self.run_inline(worker, options)
+        else:
+            self.run_pool(worker, options)
+
+    def run_inline(self, worker, options):
+        while True:
+            Job.requeue_stale(JOB_STALE_AFTER, JOB_MAX_ATTEMPTS)
+            job_id = Job.claim_next(worker)
+            if job_id is not None:
+                self.report(*run_job(job_id, worker))
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['interval'])
+
+    def run_pool(self, worker, options):
+        size = options['processes']
+        # Spawned (not forked) processes never share this process's database connections;
+        # they inherit DJANGO_SETTINGS_MODULE and only need django.setup()
+        pool = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=django.setup)
+        running = {}
+        try:
+            while True:
+                Job.requeue_stale(JOB_STALE_AFTER, JOB_MAX_ATTEMPTS)
+                while len(running) < size:
+                    job_id = Job.claim_next(worker)
+                    if job_id is None:
+                        break
+                    running[pool.submit(run_pooled_job, job_id, worker)] = job_id
+
+                if not running:
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        self.report(*future.result())
+                    except Exception as error:
+                        # The pool process died mid-job (e.g. killed for memory)
+                        Job.objects.filter(id=job_id, worker=worker, status='RUNNING').update(
+                            status='FAILED', error=repr(error), finished_at=timezone.now())
+                        self.report(job_id, 'FAILED')
+                # The jobs still running are alive; keep them from being requeued as stale
+                Job.objects.filter(id__in=running.values(), worker=worker, status='RUNNING').update(
+                    heartbeat_at=timezone.now())
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def report(self, job_id, status):
+        self.stdout.write(f"Job {job_id}: {status}")
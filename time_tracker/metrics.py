@@ -0,0 +1,179 @@
+# time_tracker/metrics.py
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+# Bucket upper bounds per metric (Prometheus "le" labels)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+
+METRICS = {
+    'timetracker_request_duration_seconds': ('Wall time spent handling the request.', SECONDS_BUCKETS),
+    'timetracker_request_db_seconds': ('Time spent executing database queries.', SECONDS_BUCKETS),
+    'timetracker_request_queries': ('Number of database queries executed.', QUERY_BUCKETS),
+    'timetracker_request_template_seconds': ('Time spent rendering templates.', SECONDS_BUCKETS),
+    'timetracker_response_size_bytes': ('Size of the response body (0 for streamed responses).', SIZE_BUCKETS),
+}
+
+# Process-wide counters (Prometheus "counter" type)
+COUNTERS = {
+    'timetracker_totals_cache_hits_total': 'Period totals served from the totals cache.',
+    'timetracker_totals_cache_misses_total': 'Period totals computed because the totals cache had no current entry.',
+}
+
+# The recorder for the request being handled on this thread/task, if any
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+class Histogram:
+    """A fixed-bucket histogram in the Prometheus sense (counts are non-cumulative here)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """In-process histograms keyed by metric name and view name, plus plain counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = dict.fromkeys(COUNTERS, 0)
+
+    def observe(self, view, **values):
+        """Records one value per metric for a view, e.g. observe('dashboard', timetracker_request_queries=4)."""
+        with self._lock:
+            for metric, value in values.items():
+                histogram = self._histograms.get((metric, view))
+                if histogram is None:
+                    histogram = self._histograms[(metric, view)] = Histogram(METRICS[metric][1])
+                histogram.observe(value)
+
+    def increment(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def counter(self, counter):
+        return self._counters[counter]
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters = dict.fromkeys(COUNTERS, 0)
+
+    def render_prometheus(self):
+        """Returns every histogram and counter in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for metric, (help_text, buckets) in METRICS.items():
+                series = sorted((view, histogram) for (name, view), histogram in self._histograms.items()
+                                if name == metric)
+                if not series:
+                    continue
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for view, histogram in series:
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{view="{view}"}} {histogram.sum}')
+                    lines.append(f'{metric}_count{{view="{view}"}} {histogram.count}')
+            for counter, help_text in COUNTERS.items():
+                lines.append(f'# HELP {counter} {help_text}')
+                lines.append(f'# TYPE {counter} counter')
+                lines.append(f'{counter} {self._counters[counter]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class RequestRecorder:
+    """Collects DB and template timings for one request."""
+
+    def __init__(self, capture_sql=False):
+        self.db_seconds = 0.0
+        self.query_count = 0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.capture_sql = capture_sql
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook that times every query."""
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - started
+            self.db_seconds += elapsed
+            self.query_count += 1
+            if self.capture_sql:
+                self.queries.append((elapsed, sql))
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper on every connection: times the query for the request being handled, if any."""
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_connections():
+    """
+    Installs record_query on every database connection as it is opened, in
+    whichever thread opens it: connections are per thread, and async views run
+    their ORM calls in sync_to_async worker threads, not the event loop's.
+    The recorder follows the request there through current_recorder.
+    """
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(install_query_recorder, dispatch_uid='time_tracker.metrics.record_query')
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection=connection)
+
+
+def instrument_template_rendering():
+    """
+    Wraps django.template.base.Template.render once so that the outermost render
+    of each request is timed (includes and extends are counted inside it).
+    """
+    from django.template.base import Template
+
+    if getattr(Template.render, 'is_instrumented', False):
+        return
+    original_render = Template.render
+
+    def render(self, context):
+        recorder = current_recorder.get()
+        if recorder is None:
+            return original_render(self, context)
+        recorder.template_depth += 1
+        started = perf_counter()
+        try:
+            return original_render(self, context)
+        finally:
+            recorder.template_depth -= 1
+            if recorder.template_depth == 0:
+                recorder.template_seconds += perf_counter() - started
+
+    render.is_instrumented = True
+    Template.render = render
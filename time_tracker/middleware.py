@@ -0,0 +1,123 @@
+# time_tracker/middleware.py
+import logging
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .metrics import RequestRecorder, current_recorder, instrument_connections, instrument_template_rendering, registry
+
+logger = logging.getLogger('time_tracker.performance')
+
+
+class PerformanceMetricsMiddleware:
+    """
+    Records wall time, DB time, query count, template render time and response
+    size for every request, labelled with the resolved URL name, into the
+    in-process histograms served by the metrics view.
+
+    Settings:
+        PERF_METRICS_ENABLED -- turn recording on or off (default True).
+        PERF_SLOW_REQUEST_MS -- if set, requests slower than this are logged
+            to 'time_tracker.performance' together with their SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PERF_METRICS_ENABLED', True)
+        self.slow_request_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', None)
+        if self.enabled:
+            instrument_connections()
+            instrument_template_rendering()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = RequestRecorder(capture_sql=self.slow_request_ms is not None)
+        token = current_recorder.set(recorder)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.record(request, response, recorder, perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        recorder = RequestRecorder(capture_sql=self.slow_request_ms is not None)
+        token = current_recorder.set(recorder)
+        started = perf_counter()
+        try:
+            # Queries are recorded by the hook on each connection, including those of the
+            # sync_to_async worker threads, which the context (and so the recorder) follows into
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.record(request, response, recorder, perf_counter() - started)
+        return response
+
+    def record(self, request, response, recorder, wall_seconds):
+        match = request.resolver_match
+        view = match.url_name or match.view_name if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+
+        registry.observe(
+            view,
+            timetracker_request_duration_seconds=wall_seconds,
+            timetracker_request_db_seconds=recorder.db_seconds,
+            timetracker_request_queries=recorder.query_count,
+            timetracker_request_template_seconds=recorder.template_seconds,
+            timetracker_response_size_bytes=size,
+        )
+
+        if self.slow_request_ms is not None and wall_seconds * 1000 >= self.slow_request_ms:
+            self.log_slow_request(request, view, wall_seconds, recorder)
+
+    def log_slow_request(self, request, view, wall_seconds, recorder):
+        statements = '\n'.join(f'  [{elapsed * 1000:.1f}ms] {sql}' for elapsed, sql in recorder.queries)
+        logger.warning(
+            "Slow request %s %s (view=%s): %.1fms total, %.1fms in %d queries, %.1fms rendering\n%s",
+            request.method, request.path, view, wall_seconds * 1000, recorder.db_seconds * 1000,
+            recorder.query_count, recorder.template_seconds * 1000, statements,
+        )
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can sit in an async middleware chain. The stock middleware is
+    sync-only, which under ASGI would push every request through a thread hop.
+    Static lookups are in-memory, so the async path does the same work inline.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_user_status(apps, schema_editor):
+    """Create a status row for every user that already has time entries."""
+    TimeEntry = apps.get_model('time_tracker', 'TimeEntry')
+    UserStatus = apps.get_model('time_tracker', 'UserStatus')
+
+    user_ids = TimeEntry.objects.values_list('user_id', flat=True).distinct()
+    for user_id in user_ids:
+        entries = TimeEntry.objects.filter(user_id=user_id).order_by('-timestamp', '-id')
+        last_entry = entries.first()
+        state = 'IN' if last_entry.action_type == 'BREAK_END' else last_entry.action_type
+        shift_start = None
+        if state != 'OUT':
+            shift_start = entries.filter(action_type='IN').values_list('timestamp', flat=True).first()
+        UserStatus.objects.update_or_create(user_id=user_id, defaults={
+            'state': state,
+            'last_action': last_entry.action_type,
+            'last_timestamp': last_entry.timestamp,
+            'shift_start': shift_start,
+            'break_start': last_entry.timestamp if state == 'BREAK_START' else None,
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('time_tracker', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatus',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='clock_status', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('state', models.CharField(choices=[('OUT', 'Clocked Out'), ('IN', 'Clocked In'), ('BREAK_START', 'On Break')], default='OUT', max_length=12)),
+                ('last_action', models.CharField(blank=True, choices=[('IN', 'Clock In'), ('OUT', 'Clock Out'), ('BREAK_START', 'Start Break'), ('BREAK_END', 'End Break')], max_length=12)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('shift_start', models.DateTimeField(blank=True, null=True)),
+                ('break_start', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'User Statuses',
+            },
+        ),
+        migrations.RunPython(backfill_user_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracker', '0002_userstatus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstatus',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Key of the last accepted clock action, so client retries are no-ops.', max_length=64),
+        ),
+    ]
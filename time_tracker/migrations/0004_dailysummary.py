@@ -0,0 +1,83 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:28
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def replay_entries(entries):
+    """
+    The clocking state machine as utils.replay_entries had it when this
+    migration was written, frozen here so later changes to the app don't
+    change what the migration does.
+    """
+    work_time, break_time = timedelta(), timedelta()
+    clock_in_time = break_start_time = None
+    shift_count = 0
+    for entry in entries:
+        if entry.action_type == 'IN':
+            clock_in_time = entry.timestamp
+            shift_count += 1
+        elif entry.action_type == 'OUT' and clock_in_time:
+            work_time += entry.timestamp - clock_in_time
+            clock_in_time = None
+        elif entry.action_type == 'BREAK_START' and clock_in_time:
+            work_time -= entry.timestamp - clock_in_time
+            break_start_time = entry.timestamp
+        elif entry.action_type == 'BREAK_END' and break_start_time:
+            break_time += entry.timestamp - break_start_time
+            break_start_time = None
+            clock_in_time = entry.timestamp
+    return {
+        'work_time': work_time,
+        'break_time': break_time,
+        'shift_count': shift_count,
+        'has_open_shift': clock_in_time is not None or break_start_time is not None,
+    }
+
+
+def backfill_daily_summaries(apps, schema_editor):
+    """Replay every existing user-day once to seed the summary table."""
+    TimeEntry = apps.get_model('time_tracker', 'TimeEntry')
+    DailySummary = apps.get_model('time_tracker', 'DailySummary')
+
+    user_days = TimeEntry.objects.values_list('user_id', 'date_only').distinct()
+    for user_id, day in user_days:
+        entries = TimeEntry.objects.filter(user_id=user_id, date_only=day).order_by('timestamp', 'id')
+        totals = replay_entries(entries)
+        DailySummary.objects.update_or_create(user_id=user_id, day=day, defaults={
+            'work_seconds': totals['work_time'].total_seconds(),
+            'break_seconds': totals['break_time'].total_seconds(),
+            'shift_count': totals['shift_count'],
+            'has_open_shift': totals['has_open_shift'],
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracker', '0003_userstatus_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('work_seconds', models.FloatField(default=0)),
+                ('break_seconds', models.FloatField(default=0)),
+                ('shift_count', models.PositiveIntegerField(default=0)),
+                ('has_open_shift', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Summaries',
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='unique_daily_summary_per_user_day')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_summaries, migrations.RunPython.noop),
+    ]
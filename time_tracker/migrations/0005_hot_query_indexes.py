@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracker', '0004_dailysummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timeeditrequest',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['requested_timestamp', 'id'], name='editrequest_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='timeentry_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['user', 'date_only', 'timestamp', 'id'], name='timeentry_user_day_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracker', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstatus',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0, help_text="Bumped on every change to the user's entries; part of every cached totals key."),
+        ),
+    ]
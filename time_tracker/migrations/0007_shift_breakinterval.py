@@ -0,0 +1,116 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:07
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def derive_shifts(entries):
+    """
+    utils.derive_shifts as it was when this migration was written, frozen here
+    so later changes to the app don't change what the migration does.
+    """
+    shifts = []
+    current = None
+
+    def close(shift, timestamp, action):
+        shift['ended_at'], shift['end_action'] = timestamp, action
+        if shift['breaks'] and shift['breaks'][-1][1] is None:
+            shift['breaks'][-1][1] = timestamp
+
+    for entry in entries:
+        action, timestamp = entry.action_type, entry.timestamp
+        if action == 'IN':
+            if current:
+                close(current, timestamp, 'IN')
+            current = {'started_at': timestamp, 'ended_at': None, 'end_action': '', 'breaks': []}
+            shifts.append(current)
+        elif current is None:
+            continue
+        elif action == 'OUT':
+            close(current, timestamp, 'OUT')
+            current = None
+        elif action == 'BREAK_START' and not (current['breaks'] and current['breaks'][-1][1] is None):
+            current['breaks'].append([timestamp, None])
+        elif action == 'BREAK_END' and current['breaks'] and current['breaks'][-1][1] is None:
+            current['breaks'][-1][1] = timestamp
+
+    return shifts
+
+
+def backfill_shifts(apps, schema_editor):
+    """Derive every existing user's shifts and breaks from their full punch history."""
+    TimeEntry = apps.get_model('time_tracker', 'TimeEntry')
+    Shift = apps.get_model('time_tracker', 'Shift')
+    BreakInterval = apps.get_model('time_tracker', 'BreakInterval')
+
+    for user_id in TimeEntry.objects.values_list('user_id', flat=True).distinct():
+        entries = TimeEntry.objects.filter(user_id=user_id).order_by('timestamp', 'id')
+        for item in derive_shifts(entries):
+            shift = Shift.objects.create(
+                user_id=user_id, started_at=item['started_at'], ended_at=item['ended_at'],
+                end_action=item['end_action'],
+                duration=item['ended_at'] - item['started_at'] if item['ended_at'] else None,
+                break_duration=sum((end - start for start, end in item['breaks'] if end), timedelta()),
+            )
+            for start, end in item['breaks']:
+                BreakInterval.objects.create(shift=shift, user_id=user_id, started_at=start, ended_at=end,
+                                             duration=end - start if end else None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracker', '0006_userstatus_data_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Shift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, help_text='Empty while the shift is open.', null=True)),
+                ('end_action', models.CharField(blank=True, choices=[('OUT', 'Clocked Out'), ('IN', 'Superseded by a later clock in')], max_length=3)),
+                ('duration', models.DurationField(blank=True, help_text='ended_at - started_at, breaks included.', null=True)),
+                ('break_duration', models.DurationField(default=datetime.timedelta)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shifts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BreakInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.DurationField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='break_intervals', to=settings.AUTH_USER_MODEL)),
+                ('shift', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='breaks', to='time_tracker.shift')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['started_at', 'ended_at'], name='shift_start_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['user', 'started_at'], name='shift_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(condition=models.Q(('ended_at__isnull', True)), fields=['user'], name='shift_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='breakinterval',
+            index=models.Index(fields=['started_at', 'ended_at'], name='break_start_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='breakinterval',
+            index=models.Index(fields=['user', 'started_at'], name='break_user_start_idx'),
+        ),
+        migrations.RunPython(backfill_shifts, migrations.RunPython.noop),
+    ]
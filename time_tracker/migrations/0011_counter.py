@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:46
+
+from django.db import migrations, models
+
+
+def seed_pending_requests(apps, schema_editor):
+    """Start the pending request counter from the current count."""
+    TimeEditRequest = apps.get_model('time_tracker', 'TimeEditRequest')
+    Counter = apps.get_model('time_tracker', 'Counter')
+    Counter.objects.create(name='pending_requests', value=TimeEditRequest.objects.filter(status='PENDING').count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracker', '0010_archivedday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_pending_requests, migrations.RunPython.noop),
+    ]
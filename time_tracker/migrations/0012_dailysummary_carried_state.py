@@ -0,0 +1,103 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:12
+
+import json
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import migrations, models
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def replay_day(entries, clock_in_time=None, break_start_time=None):
+    """
+    The clocking state machine (utils.replay_entries) as it was when this
+    migration was written: ((work, break), shift count, end state) for one day's
+    (timestamp, action) pairs, starting from the given open clock in / break.
+    """
+    work_time, break_time = timedelta(), timedelta()
+    shift_count = 0
+    for timestamp, action in entries:
+        if action == 'IN':
+            clock_in_time = timestamp
+            shift_count += 1
+        elif action == 'OUT' and clock_in_time:
+            work_time += timestamp - clock_in_time
+            clock_in_time = None
+        elif action == 'BREAK_START' and clock_in_time:
+            work_time -= timestamp - clock_in_time
+            break_start_time = timestamp
+        elif action == 'BREAK_END' and break_start_time:
+            break_time += timestamp - break_start_time
+            break_start_time = None
+            clock_in_time = timestamp
+    return (work_time, break_time), shift_count, (clock_in_time, break_start_time)
+
+
+def carry_open_shifts(apps, schema_editor):
+    """
+    Summaries used to replay each day on its own. Replay every user's days in
+    order, carrying what a day leaves open into the next one.
+    """
+    TimeEntry = apps.get_model('time_tracker', 'TimeEntry')
+    ArchivedDay = apps.get_model('time_tracker', 'ArchivedDay')
+    DailySummary = apps.get_model('time_tracker', 'DailySummary')
+
+    for user_id in DailySummary.objects.values_list('user_id', flat=True).distinct():
+        by_day = {}
+        for day, timestamp, action, entry_id in TimeEntry.objects.filter(user_id=user_id).values_list(
+                'date_only', 'timestamp', 'action_type', 'id'):
+            by_day.setdefault(day, []).append((timestamp, entry_id, action))
+        for day, payload in ArchivedDay.objects.filter(user_id=user_id).values_list('day', 'payload'):
+            for entry_id, stamp, action in json.loads(zlib.decompress(payload)):
+                by_day.setdefault(day, []).append((EPOCH + timedelta(microseconds=stamp), entry_id, action))
+
+        rows = []
+        carried = (None, None)
+        for summary in DailySummary.objects.filter(user_id=user_id).order_by('day'):
+            entries = [(timestamp, action) for timestamp, _, action in sorted(by_day.get(summary.day, []))]
+            totals, shift_count, end_state = replay_day(entries, *carried)
+            fresh, _, _ = replay_day(entries)
+            summary.work_seconds, summary.break_seconds = (value.total_seconds() for value in totals)
+            summary.carried_work_seconds, summary.carried_break_seconds = (
+                (value - start).total_seconds() for value, start in zip(totals, fresh))
+            summary.shift_count = shift_count
+            summary.open_clock_in, summary.open_break_start = end_state
+            summary.has_open_shift = end_state != (None, None)
+            rows.append(summary)
+            carried = end_state
+        DailySummary.objects.bulk_update(rows, [
+            'work_seconds', 'break_seconds', 'shift_count', 'has_open_shift', 'open_clock_in',
+            'open_break_start', 'carried_work_seconds', 'carried_break_seconds',
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracker', '0011_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysummary',
+            name='carried_break_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailysummary',
+            name='carried_work_seconds',
+            field=models.FloatField(default=0, help_text='The part of work_seconds that closes a shift or break carried in from an earlier day.'),
+        ),
+        migrations.AddField(
+            model_name='dailysummary',
+            name='open_break_start',
+            field=models.DateTimeField(blank=True, help_text='Break still open at the end of the day.', null=True),
+        ),
+        migrations.AddField(
+            model_name='dailysummary',
+            name='open_clock_in',
+            field=models.DateTimeField(blank=True, help_text='Clock in still open at the end of the day.', null=True),
+        ),
+        migrations.RunPython(carry_open_shifts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:29
+
+import json
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import migrations, models
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def fresh_end_state(entries):
+    """
+    The (clock in, break start) that the clocking state machine (utils.replay_entries
+    as it was when this migration was written) leaves open after one day's
+    (timestamp, action) pairs, starting with nothing open.
+    """
+    clock_in_time = break_start_time = None
+    for timestamp, action in entries:
+        if action == 'IN':
+            clock_in_time = timestamp
+        elif action == 'OUT' and clock_in_time:
+            clock_in_time = None
+        elif action == 'BREAK_START' and clock_in_time:
+            break_start_time = timestamp
+        elif action == 'BREAK_END' and break_start_time:
+            break_start_time = None
+            clock_in_time = timestamp
+    return clock_in_time, break_start_time
+
+
+def flag_persisting_carries(apps, schema_editor):
+    """
+    Only a day that something was carried into can end differently when replayed
+    on its own: replay those days and compare with the stored end state.
+    """
+    TimeEntry = apps.get_model('time_tracker', 'TimeEntry')
+    ArchivedDay = apps.get_model('time_tracker', 'ArchivedDay')
+    DailySummary = apps.get_model('time_tracker', 'DailySummary')
+
+    rows = []
+    previous = None
+    for summary in DailySummary.objects.order_by('user_id', 'day').iterator():
+        carried_in = (previous is not None and previous.user_id == summary.user_id
+                      and (previous.open_clock_in, previous.open_break_start) != (None, None))
+        previous = summary
+        if not carried_in:
+            continue
+        entries = [
+            (timestamp, entry_id, action) for timestamp, entry_id, action in TimeEntry.objects.filter(
+                user_id=summary.user_id, date_only=summary.day).values_list('timestamp', 'id', 'action_type')
+        ]
+        for payload in ArchivedDay.objects.filter(user_id=summary.user_id, day=summary.day).values_list('payload', flat=True):
+            entries += [(EPOCH + timedelta(microseconds=stamp), entry_id, action)
+                        for entry_id, stamp, action in json.loads(zlib.decompress(payload))]
+        end_state = fresh_end_state((timestamp, action) for timestamp, _, action in sorted(entries))
+        if end_state != (summary.open_clock_in, summary.open_break_start):
+            summary.carry_persists = True
+            rows.append(summary)
+    DailySummary.objects.bulk_update(rows, ['carry_persists'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracker', '0012_dailysummary_carried_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysummary',
+            name='carry_persists',
+            field=models.BooleanField(default=False, help_text='Replayed on its own, the day leaves a different shift or break open, so the carried-in time also changes the days after it.'),
+        ),
+        migrations.RunPython(flag_persisting_carries, migrations.RunPython.noop),
+    ]
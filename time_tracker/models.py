@@ -1,8 +1,34 @@
-from django.db import models
+import heapq
+import time
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Min, Q
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .routers import primary_reads
 
 User = get_user_model() 
 
+
+def day_start(day):
+    """
+    A moment no later than any punch whose date_only is `day`. date_only is the
+    date in the timezone the timestamp was saved with, so allow a day of slack.
+    """
+    return datetime.combine(day - timedelta(days=1), datetime.min.time(), tzinfo=timezone.get_fixed_timezone(0))
+
+
+def deferred_refresh():
+    """True when writes only mark days dirty (DERIVED_REFRESH_MODE = 'deferred'), see DirtyUserDay."""
+    return getattr(settings, 'DERIVED_REFRESH_MODE', 'immediate') == 'deferred'
+
+
 class TimeEntry(models.Model):
     ACTION_CHOICES = [
         ('IN', 'Clock In'),
@@ -18,17 +44,82 @@ class TimeEntry(models.Model):
     
     date_only = models.DateField(db_index=True)
 
-    def save(self, *args, **kwargs):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored day so an edit that moves the entry can refresh both days
+        instance._loaded_date_only = instance.__dict__.get('date_only')
+        instance._loaded_timestamp = instance.__dict__.get('timestamp')
+        return instance
+
+    def save(self, *args, sync_status=True, **kwargs):
         
         if self.timestamp:
             self.date_only = self.timestamp.date()
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        touched_days = {self.date_only, getattr(self, '_loaded_date_only', None)} - {None}
+        touched_times = {self.timestamp, getattr(self, '_loaded_timestamp', None)} - {None}
+        # Keep the user's status row and daily summaries in step with this write
+        # (same transaction). sync_status=False is for callers that have already
+        # claimed the status row.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if sync_status:
+                UserStatus.sync_after_save(self, adding)
+            TimeEntry.update_derived(self.user_id, touched_days, min(touched_times))
+            UserStatus.bump_version(self.user_id)
+        self._loaded_date_only = self.date_only
+        self._loaded_timestamp = self.timestamp
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            UserStatus.rebuild_for(self.user_id)
+            TimeEntry.update_derived(self.user_id, [self.date_only], self.timestamp)
+            UserStatus.bump_version(self.user_id)
+        return result
+
+    @staticmethod
+    @primary_reads
+    def update_derived(user_id, days, since):
+        """
+        Brings the daily summaries of the touched days and the shifts from `since`
+        up to date, or in deferred mode only records the days as dirty.
+        """
+        if deferred_refresh():
+            DirtyUserDay.mark_many({user_id: days})
+        else:
+            DailySummary.recompute(user_id, days)
+            Shift.rebuild_from(user_id, since)
+
+    @staticmethod
+    @primary_reads
+    def refresh_derived(user_days):
+        """
+        Rebuilds the status row, daily summaries, shifts and data version for
+        {user_id: days} after writes that bypass save()/delete() (bulk deletes).
+        """
+        for user_id in user_days:
+            UserStatus.rebuild_for(user_id)
+            UserStatus.bump_version(user_id)
+        if deferred_refresh():
+            DirtyUserDay.mark_many(user_days)
+            return
+        for user_id, days in user_days.items():
+            Shift.rebuild_from(user_id, day_start(min(days)))
+        DailySummary.recompute_many(user_days)
 
     def __str__(self):
         return f"{self.user.username} - {self.action_type} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
     
     class Meta:
         verbose_name_plural = "Time Entries"
+        indexes = [
+            # Latest entries for a user (status rebuilds, admin entry list)
+            models.Index(fields=['user', 'timestamp', 'id'], name='timeentry_user_ts_idx'),
+            # A user's entries for a day or date range (reports, dashboard, daily summaries)
+            models.Index(fields=['user', 'date_only', 'timestamp', 'id'], name='timeentry_user_day_ts_idx'),
+        ]
 
 class TimeEditRequest(models.Model):
     STATUS_CHOICES = [
@@ -57,6 +148,625 @@ class TimeEditRequest(models.Model):
         related_name='reviewed_edits'
     )
     reviewed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The review queue only ever reads pending requests, oldest first
+            models.Index(
+                fields=['requested_timestamp', 'id'],
+                name='editrequest_pending_idx',
+                condition=models.Q(status='PENDING'),
+            ),
+        ]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Keep the pending counter in step with this write (same transaction)
+        delta = (self.status == 'PENDING') - (getattr(self, '_loaded_status', None) == 'PENDING')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Counter.add('pending_requests', delta)
+        self._loaded_status = self.status
+
+    def __str__(self):
+        return f"Edit request for {self.original_entry_id} - Status: {self.status}"
+
+
+@receiver(post_delete, sender=TimeEditRequest)
+def count_deleted_request(sender, instance, **kwargs):
+    # Also runs for cascades (deleting an entry or a user), which skip delete()
+    if instance.status == 'PENDING':
+        Counter.add('pending_requests', -1)
+
+
+class Counter(models.Model):
+    """
+    A named count kept up to date, in the same transaction, by the writes that
+    change it, so pages read one row instead of counting. 'pending_requests'
+    is the number of PENDING TimeEditRequests (the staff nav badge).
+
+    Reads go through a short per-process cache (COUNTER_CACHE_SECONDS), so
+    most requests cost no query; a process sees its own changes at once and
+    other processes' changes within that time.
+    """
+    RECOUNTS = {
+        'pending_requests': lambda: TimeEditRequest.objects.filter(status='PENDING').count(),
+    }
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    # name -> (value, monotonic expiry time)
+    _local = {}
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+    @classmethod
+    def add(cls, name, delta):
+        """Call after the write that changed the count, inside its transaction."""
+        cls._local.pop(name, None)
+        if delta and not cls.objects.filter(name=name).update(value=F('value') + delta):
+            # No row yet (e.g. a flushed table): the write is already visible to a recount
+            cls.recount(name)
+
+    @classmethod
+    @primary_reads
+    def recount(cls, name):
+        """Sets the counter from a full count, for a missing or drifted row."""
+        value = cls.RECOUNTS[name]()
+        cls.objects.update_or_create(name=name, defaults={'value': value})
+        cls._local.pop(name, None)
+        return value
+
+    @classmethod
+    def cached(cls, name):
+        value, expires = cls._local.get(name, (None, 0))
+        if time.monotonic() < expires:
+            return value
+        value = cls.objects.filter(name=name).values_list('value', flat=True).first()
+        if value is None:
+            value = cls.recount(name)
+        cls._local[name] = (value, time.monotonic() + settings.COUNTER_CACHE_SECONDS)
+        return value
+
+    @classmethod
+    async def acached(cls, name):
+        """cached() for async views."""
+        value, expires = cls._local.get(name, (None, 0))
+        if time.monotonic() < expires:
+            return value
+        value = await cls.objects.filter(name=name).values_list('value', flat=True).afirst()
+        if value is None:
+            return await sync_to_async(cls.cached)(name)
+        cls._local[name] = (value, time.monotonic() + settings.COUNTER_CACHE_SECONDS)
+        return value
+
+
+class UserStatus(models.Model):
+    """
+    Denormalized "current state" of a user's clock, one row per user.
+    Maintained alongside every TimeEntry write so that reading a user's status
+    is a single primary-key lookup instead of a scan of their history.
+    """
+    STATE_CHOICES = [
+        ('OUT', 'Clocked Out'),
+        ('IN', 'Clocked In'),
+        ('BREAK_START', 'On Break'),
+    ]
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='clock_status'
+    )
+    state = models.CharField(max_length=12, choices=STATE_CHOICES, default='OUT')
+    last_action = models.CharField(max_length=12, choices=TimeEntry.ACTION_CHOICES, blank=True)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    shift_start = models.DateTimeField(null=True, blank=True)
+    break_start = models.DateTimeField(null=True, blank=True)
+    idempotency_key = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="Key of the last accepted clock action, so client retries are no-ops."
+    )
+    data_version = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Bumped on every change to the user's entries; part of every cached totals key."
+    )
+
+    class Meta:
+        verbose_name_plural = "User Statuses"
+
+    def __str__(self):
+        return f"{self.user_id} - {self.state}"
+
+    @staticmethod
+    def transition_fields(action_type, timestamp):
+        """Field values the status row takes after the given punch."""
+        fields = {'last_action': action_type, 'last_timestamp': timestamp}
+        if action_type == 'IN':
+            fields.update(state='IN', shift_start=timestamp, break_start=None)
+        elif action_type == 'OUT':
+            fields.update(state='OUT', shift_start=None, break_start=None)
+        elif action_type == 'BREAK_START':
+            fields.update(state='BREAK_START', break_start=timestamp)
+        elif action_type == 'BREAK_END':
+            fields.update(state='IN', break_start=None)
+        return fields
+
+    @classmethod
+    def sync_after_save(cls, entry, adding):
+        """
+        Apply a saved entry to the status row. A new punch at or after the last
+        one is applied incrementally; back-dated inserts and edits trigger a rebuild.
+        """
+        status, _ = cls.objects.select_for_update().get_or_create(user_id=entry.user_id)
+        if adding and (status.last_timestamp is None or entry.timestamp >= status.last_timestamp):
+            for field, value in cls.transition_fields(entry.action_type, entry.timestamp).items():
+                setattr(status, field, value)
+            status.save()
+        else:
+            cls.rebuild_for(entry.user_id)
+
+    @classmethod
+    def bump_version(cls, user_id):
+        """Invalidates every cached total for the user (old keys are simply never read again)."""
+        cls.objects.filter(user_id=user_id).update(data_version=F('data_version') + 1)
+
+    @classmethod
+    @primary_reads
+    def rebuild_for(cls, user_id):
+        """Recompute the status row for a user from their most recent entries."""
+        entries = TimeEntry.objects.filter(user_id=user_id).order_by('-timestamp', '-id')
+        last_entry = entries.first()
+
+        fields = {
+            'state': 'OUT', 'last_action': '', 'last_timestamp': None,
+            'shift_start': None, 'break_start': None,
+        }
+        if last_entry:
+            fields.update(cls.transition_fields(last_entry.action_type, last_entry.timestamp))
+            if fields['state'] != 'OUT':
+                # The open shift started at the most recent clock in
+                last_in = entries.filter(action_type='IN').values_list('timestamp', flat=True).first()
+                fields['shift_start'] = last_in
+            if fields['state'] != 'BREAK_START':
+                fields['break_start'] = None
+
+        cls.objects.update_or_create(user_id=user_id, defaults=fields)
+
+
+
+class DailySummary(models.Model):
+    """
+    Pre-aggregated work and break time for one user on one day, recomputed
+    whenever a TimeEntry on that day is written so that range totals are a SUM
+    over at most one row per day. A shift or break still open at the end of a
+    day is carried into the next summarized day, so an interval across
+    midnight counts on the day it closes.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_summaries')
+    day = models.DateField()
+    work_seconds = models.FloatField(default=0)
+    break_seconds = models.FloatField(default=0)
+    shift_count = models.PositiveIntegerField(default=0)
+    has_open_shift = models.BooleanField(default=False)
+    open_clock_in = models.DateTimeField(null=True, blank=True, help_text="Clock in still open at the end of the day.")
+    open_break_start = models.DateTimeField(null=True, blank=True, help_text="Break still open at the end of the day.")
+    carried_work_seconds = models.FloatField(
+        default=0,
+        help_text="The part of work_seconds that closes a shift or break carried in from an earlier day."
+    )
+    carried_break_seconds = models.FloatField(default=0)
+    carry_persists = models.BooleanField(
+        default=False,
+        help_text="Replayed on its own, the day leaves a different shift or break open, so the "
+                  "carried-in time also changes the days after it."
+    )
+
+    class Meta:
+        verbose_name_plural = "Daily Summaries"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_daily_summary_per_user_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.day}"
+
+    @classmethod
+    def recompute(cls, user_id, days):
+        """Replays the entries of each given day and stores the totals (or drops empty days)."""
+        cls.recompute_many({user_id: days})
+
+    @staticmethod
+    def entries_by_day(user_id, days):
+        """One user's entries (archived ones included) on the given days: {day: entries in timestamp order}."""
+        from .archive import archive_horizon, archived_entries_for
+
+        entries = TimeEntry.objects.filter(
+            user_id=user_id, date_only__range=(min(days), max(days))
+        ).order_by('date_only', 'timestamp', 'id').values_list('id', 'date_only', 'timestamp', 'action_type', named=True)
+        horizon = archive_horizon()
+        if min(days) < horizon:
+            # Old days may be (partly) archived: replay the archived punches too
+            archived = archived_entries_for(user_id, days=[day for day in days if day < horizon])
+            entries = heapq.merge(entries, archived, key=lambda entry: (entry.date_only, entry.timestamp, entry.id))
+
+        by_day = {}
+        for entry in entries:
+            if entry.date_only in days:
+                by_day.setdefault(entry.date_only, []).append(entry)
+        return by_day
+
+    @classmethod
+    @primary_reads
+    def recompute_many(cls, user_days):
+        """
+        recompute() for {user_id: days}: one summary and one entry query per user,
+        then a single upsert of the changed rows and a delete of the days left
+        empty. Each day's replay starts from what the summarized day before it
+        left open; when a day now leaves something different open, the following
+        days are replayed too, until one ends as it did before.
+        """
+        from .utils import replay_entries
+
+        rows = []
+        for user_id, days in user_days.items():
+            days = set(days)
+            if not days:
+                continue
+            # The rows in the range plus the one before it (there are at most span + 1 in the range)
+            stored = {}
+            carried = (None, None)
+            for day, clock_in, break_start in (
+                cls.objects.filter(user_id=user_id, day__lte=max(days)).order_by('-day')
+                .values_list('day', 'open_clock_in', 'open_break_start')[:(max(days) - min(days)).days + 2]
+            ):
+                if day < min(days):
+                    carried = (clock_in, break_start)
+                    break
+                stored[day] = (clock_in, break_start)
+
+            by_day = cls.entries_by_day(user_id, days)
+            timeline = sorted(days | stored.keys())
+            empty_days = []
+            previous_end = carried  # What the timeline as stored carried into the current day
+            changed = False
+            while timeline:
+                day = timeline.pop(0)
+                old_end = stored.get(day, previous_end)
+                previous_end = old_end
+                if day not in days and not changed:
+                    carried = old_end
+                    continue
+
+                if day not in days:
+                    by_day.update(cls.entries_by_day(user_id, {day}))
+                day_entries = by_day.get(day)
+                if day_entries:
+                    totals = replay_entries(day_entries, *carried)
+                    fresh = replay_entries(day_entries)
+                    rows.append(cls(
+                        user_id=user_id, day=day,
+                        work_seconds=totals['work_time'].total_seconds(),
+                        break_seconds=totals['break_time'].total_seconds(),
+                        shift_count=totals['shift_count'],
+                        has_open_shift=totals['has_open_shift'],
+                        open_clock_in=totals['clock_in_time'],
+                        open_break_start=totals['break_start_time'],
+                        carried_work_seconds=(totals['work_time'] - fresh['work_time']).total_seconds(),
+                        carried_break_seconds=(totals['break_time'] - fresh['break_time']).total_seconds(),
+                        carry_persists=(totals['clock_in_time'], totals['break_start_time'])
+                        != (fresh['clock_in_time'], fresh['break_start_time']),
+                    ))
+                    carried = (totals['clock_in_time'], totals['break_start_time'])
+                else:
+                    empty_days.append(day)
+                changed = carried != old_end
+                if changed and not timeline:
+                    # Follow the change into the next summarized day
+                    following = cls.objects.filter(user_id=user_id, day__gt=day).order_by('day').values_list(
+                        'day', 'open_clock_in', 'open_break_start').first()
+                    if following:
+                        stored[following[0]] = following[1:]
+                        timeline.append(following[0])
+            if empty_days:
+                cls.objects.filter(user_id=user_id, day__in=empty_days).delete()
+
+        cls.objects.bulk_create(
+            rows, batch_size=500, update_conflicts=True, unique_fields=['user', 'day'],
+            update_fields=['work_seconds', 'break_seconds', 'shift_count', 'has_open_shift', 'open_clock_in',
+                           'open_break_start', 'carried_work_seconds', 'carried_break_seconds', 'carry_persists'],
+        )
+
+    @classmethod
+    def carried_into(cls, user_id, start_date, end_date):
+        """
+        What the summaries from start_date to end_date count only because of a
+        shift or break carried in from before the range, as (work, break) seconds.
+        The range is replayed from nothing open, one batch of days at a time, until
+        a day ends in the state the stored summaries carry out of it.
+        """
+        from .utils import replay_entries
+
+        rows = cls.objects.filter(user_id=user_id, day__range=(start_date, end_date)).order_by('day').values_list(
+            'day', 'work_seconds', 'break_seconds', 'open_clock_in', 'open_break_start')
+        carried_work = carried_break = 0.0
+        state = (None, None)
+        start, size = 0, 7
+        while batch := list(rows[start:start + size]):
+            by_day = cls.entries_by_day(user_id, {row[0] for row in batch})
+            for day, work_seconds, break_seconds, *stored_end in batch:
+                totals = replay_entries(by_day.get(day, []), *state)
+                carried_work += work_seconds - totals['work_time'].total_seconds()
+                carried_break += break_seconds - totals['break_time'].total_seconds()
+                state = (totals['clock_in_time'], totals['break_start_time'])
+                if state == tuple(stored_end):
+                    return carried_work, carried_break
+            start, size = start + size, size * 2
+        return carried_work, carried_break
+
+
+class Shift(models.Model):
+    """
+    One clock-in to clock-out interval derived from a user's punches (see
+    utils.derive_shifts), so interval questions are indexed range queries:
+    who was on shift at a moment, shifts longer than N hours in a month.
+    Maintained with every TimeEntry write; rebuild_derived recreates it.
+    """
+    END_ACTION_CHOICES = [
+        ('OUT', 'Clocked Out'),
+        ('IN', 'Superseded by a later clock in'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='shifts')
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField(null=True, blank=True, help_text="Empty while the shift is open.")
+    end_action = models.CharField(max_length=3, choices=END_ACTION_CHOICES, blank=True)
+    duration = models.DurationField(null=True, blank=True, help_text="ended_at - started_at, breaks included.")
+    break_duration = models.DurationField(default=timedelta)
+
+    class Meta:
+        indexes = [
+            # Shifts overlapping a moment or period, across all users
+            models.Index(fields=['started_at', 'ended_at'], name='shift_start_end_idx'),
+            # A user's shifts in order (incremental rebuilds, per-user reports)
+            models.Index(fields=['user', 'started_at'], name='shift_user_start_idx'),
+            # Who is on shift right now
+            models.Index(fields=['user'], name='shift_open_idx', condition=Q(ended_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.started_at:%Y-%m-%d %H:%M} to {self.ended_at or 'open'}"
+
+    @classmethod
+    def active_at(cls, moment):
+        """Shifts in progress at the given moment."""
+        return cls.objects.filter(Q(ended_at__gt=moment) | Q(ended_at__isnull=True), started_at__lte=moment)
+
+    @classmethod
+    @primary_reads
+    def rebuild_from(cls, user_id, since=None):
+        """
+        Re-derives the user's shifts affected by punches at or after `since`
+        (all of them if None). Shifts don't overlap, so everything ending before
+        `since` is untouched and the replay starts with no shift open at the
+        earlier of `since` and the first affected shift's start.
+        """
+        from .archive import archive_horizon, archived_entries_for
+        from .utils import derive_shifts
+
+        affected = cls.objects.filter(user_id=user_id)
+        replay_from = since
+        if since is not None:
+            affected = affected.filter(Q(ended_at__gte=since) | Q(ended_at__isnull=True))
+            first_start = affected.aggregate(first=Min('started_at'))['first']
+            if first_start is not None and first_start < since:
+                replay_from = first_start
+        affected.delete()
+
+        entries = TimeEntry.objects.filter(user_id=user_id).order_by('timestamp', 'id')
+        if replay_from is not None:
+            entries = entries.filter(timestamp__gte=replay_from)
+        entries = entries.only('timestamp', 'action_type')
+        if replay_from is None or replay_from.date() < archive_horizon():
+            since_day = replay_from.date() - timedelta(days=1) if replay_from else None
+            archived = [entry for entry in archived_entries_for(user_id, since_day=since_day)
+                        if replay_from is None or entry.timestamp >= replay_from]
+            entries = heapq.merge(entries, archived, key=lambda entry: (entry.timestamp, entry.id))
+        cls.create_all(user_id, derive_shifts(entries))
+
+    @classmethod
+    def create_all(cls, user_id, derived):
+        """Bulk-inserts derive_shifts() output for one user, breaks included."""
+        shifts = cls.objects.bulk_create([
+            cls(
+                user_id=user_id, started_at=item['started_at'], ended_at=item['ended_at'],
+                end_action=item['end_action'],
+                duration=item['ended_at'] - item['started_at'] if item['ended_at'] else None,
+                break_duration=sum((end - start for start, end in item['breaks'] if end), timedelta()),
+            )
+            for item in derived
+        ])
+        BreakInterval.objects.bulk_create([
+            BreakInterval(shift=shift, user_id=user_id, started_at=start, ended_at=end,
+                          duration=end - start if end else None)
+            for shift, item in zip(shifts, derived)
+            for start, end in item['breaks']
+        ])
+
+
+class BreakInterval(models.Model):
+    """One break inside a Shift, derived alongside it."""
+    shift = models.ForeignKey(Shift, on_delete=models.CASCADE, related_name='breaks')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='break_intervals')
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField(null=True, blank=True)
+    duration = models.DurationField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['started_at', 'ended_at'], name='break_start_end_idx'),
+            models.Index(fields=['user', 'started_at'], name='break_user_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - break at {self.started_at:%Y-%m-%d %H:%M}"
+
+
+class DirtyUserDay(models.Model):
+    """
+    A user-day whose daily summary and shifts are stale. Only used when
+    DERIVED_REFRESH_MODE is 'deferred': writes just record the days they touch,
+    and the derived rows are rebuilt later, by readers that need the day (see
+    utils.get_period_totals) or by the refresh_dirty_days worker.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='dirty_days')
+    day = models.DateField()
+    marked_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_dirty_user_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.day}"
+
+    @classmethod
+    def mark_many(cls, user_days):
+        """Records {user_id: days} as stale (days already marked stay as they are)."""
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, day=day) for user_id, days in user_days.items() for day in days],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    @primary_reads
+    def refresh(cls, user_ids=None, limit=None):
+        """
+        Rebuilds every dirty day of the given users (or of the `limit` users with
+        the oldest marks) and clears the marks. Returns the number of days refreshed.
+        """
+        if user_ids is None:
+            oldest_first = (cls.objects.values('user_id').annotate(first_marked=Min('marked_at'))
+                            .order_by('first_marked').values_list('user_id', flat=True))
+            user_ids = list(oldest_first[:limit] if limit else oldest_first)
+
+        refreshed = 0
+        for user_id in user_ids:
+            with transaction.atomic():
+                # Every write bumps the status row's version, so holding its lock means no
+                # write to this user is in flight and none can mark a day we then clear
+                list(UserStatus.objects.select_for_update().filter(user_id=user_id))
+                dirty = cls.objects.filter(user_id=user_id)
+                days = set(dirty.values_list('day', flat=True))
+                if not days:
+                    continue
+                DailySummary.recompute_many({user_id: days})
+                Shift.rebuild_from(user_id, day_start(min(days)))
+                dirty.delete()
+                refreshed += len(days)
+        return refreshed
+
+
+class Job(models.Model):
+    """
+    Heavy work (exports, payroll reports) queued by a web request and run by the
+    run_jobs worker, so it is not bound by the request timeout. There is no
+    broker: workers claim queued rows with a conditional UPDATE. The result is
+    kept in the row because web and worker processes may not share a filesystem.
+    """
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    progress = models.PositiveSmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    result = models.BinaryField(null=True, blank=True)
+    result_name = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's "oldest queued job" scan
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} - {self.status}"
+
+    @classmethod
+    def claim_next(cls, worker):
+        """
+        Marks the oldest queued job as RUNNING for this worker and returns its id
+        (None if the queue is empty). The UPDATE only matches while the row is
+        still QUEUED, so two workers can never claim the same job.
+        """
+        queued = cls.objects.filter(status='QUEUED').order_by('created_at', 'id').values_list('id', flat=True)
+        for job_id in queued[:10]:
+            now = timezone.now()
+            claimed = cls.objects.filter(id=job_id, status='QUEUED').update(
+                status='RUNNING', worker=worker, attempts=F('attempts') + 1,
+                started_at=now, heartbeat_at=now,
+            )
+            if claimed:
+                return job_id
+        return None
+
+    @classmethod
+    def requeue_stale(cls, older_than, max_attempts):
+        """
+        Jobs whose worker stopped sending heartbeats (the process died) go back on
+        the queue, or fail once they have used up max_attempts.
+        """
+        stale = cls.objects.filter(status='RUNNING', heartbeat_at__lt=timezone.now() - older_than)
+        stale.filter(attempts__gte=max_attempts).update(
+            status='FAILED', error="The worker running this job stopped responding.", finished_at=timezone.now())
+        return stale.update(status='QUEUED', worker='', progress=0)
+
+
+class ArchivedDay(models.Model):
+    """
+    One user-day of punches moved out of the hot TimeEntry table by
+    archive_entries, stored as compressed JSON (see archive.py). The day's
+    DailySummary rollup stays where it is, so totals never need the payload;
+    exports, payroll and rebuilds merge it back in.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_days')
+    day = models.DateField()
+    entry_count = models.PositiveIntegerField()
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_archived_day'),
+        ]
+        indexes = [
+            # Exports and payroll over a date range, across all users
+            models.Index(fields=['day', 'user'], name='archived_day_user_idx'),
+        ]
+
     def __str__(self):
-        return f"Edit request for {self.original_entry.id} - Status: {self.status}"
\ No newline at end of file
+        return f"{self.user_id} - {self.day} ({self.entry_count} entries)"
@@ -0,0 +1,124 @@
+# time_tracker/pagination.py
+import base64
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator; iterates like a Django Page."""
+
+    def __init__(self, object_list, has_next, has_previous, paginator):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.paginator = paginator
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        return self.paginator.encode_cursor(self.object_list[-1]) if self._has_next else ''
+
+    @property
+    def previous_cursor(self):
+        return self.paginator.encode_cursor(self.object_list[0]) if self._has_previous else ''
+
+
+class KeysetPaginator:
+    """
+    Cursor-based pagination over a unique ordering such as ('-timestamp', '-id').
+    Each page is a single indexed range query of per_page + 1 rows: there is no
+    COUNT(*) and no OFFSET, so deep pages cost the same as the first one.
+    Pages are requested with ?after=<cursor> (next) or ?before=<cursor> (previous).
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-timestamp', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+        self.model = queryset.model
+
+    def get_page(self, after=None, before=None):
+        """Returns the page after/before the given cursor, or the first page."""
+        queryset, backwards, values = self._page_queryset(after, before)
+        return self._make_page(list(queryset), backwards, values)
+
+    async def aget_page(self, after=None, before=None):
+        """get_page for async views, fetching the rows with the async ORM."""
+        queryset, backwards, values = self._page_queryset(after, before)
+        return self._make_page([row async for row in queryset], backwards, values)
+
+    def _page_queryset(self, after, before):
+        """The (unevaluated) query for one page plus one extra row to detect a further page."""
+        if before:
+            values = self.decode_cursor(before)
+            if values is not None:
+                queryset = (self.queryset.filter(self._beyond(values, backwards=True))
+                            .order_by(*self._reversed_ordering())[:self.per_page + 1])
+                return queryset, True, values
+
+        queryset = self.queryset
+        values = self.decode_cursor(after) if after else None
+        if values is not None:
+            queryset = queryset.filter(self._beyond(values, backwards=False))
+        return queryset.order_by(*self.ordering)[:self.per_page + 1], False, values
+
+    def _make_page(self, rows, backwards, values):
+        if backwards:
+            has_previous = len(rows) > self.per_page
+            return KeysetPage(rows[:self.per_page][::-1], True, has_previous, self)
+        return KeysetPage(rows[:self.per_page], len(rows) > self.per_page, values is not None, self)
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def _beyond(self, values, backwards):
+        """Rows strictly after (or before) the cursor in the paginator's ordering."""
+        conditions = []
+        equal_so_far = Q()
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            conditions.append(equal_so_far & Q(**{f'{name}__{lookup}': value}))
+            equal_so_far &= Q(**{name: value})
+        return reduce(operator.or_, conditions)
+
+    def encode_cursor(self, obj):
+        values = [str(getattr(obj, name)) for name, _ in self._fields()]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """Parses a cursor back into field values, or returns None if it is malformed."""
+        try:
+            raw_values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            fields = self._fields()
+            if len(raw_values) != len(fields):
+                return None
+            return [
+                self.model._meta.get_field(name).to_python(raw)
+                for (name, _), raw in zip(fields, raw_values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            return None
@@ -0,0 +1,167 @@
+# time_tracker/payroll.py
+import heapq
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+
+from time_tracker.archive import iter_archived_entries
+from time_tracker.models import TimeEntry
+from time_tracker.sql_totals import sql_engine_applies, sql_period_totals
+from time_tracker.utils import to_hours
+
+# Integer codes for action_type in the columnar arrays
+ACTION_CODES = {'IN': 0, 'OUT': 1, 'BREAK_START': 2, 'BREAK_END': 3}
+IN, OUT, BREAK_START, BREAK_END = 0, 1, 2, 3
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+STREAM_CHUNK_SIZE = 20000
+
+
+def load_entry_columns(start_date, end_date, user_ids=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Streams every entry in the date range (one query, server-side cursor, with
+    archived days merged in) into three columns ordered by user then timestamp:
+    user ids, timestamps in epoch microseconds and action codes.
+    """
+    entries = TimeEntry.objects.filter(date_only__range=(start_date, end_date))
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+    rows = entries.order_by('user_id', 'timestamp', 'id').values_list(
+        'user_id', 'timestamp', 'id', 'action_type'
+    ).iterator(chunk_size=chunk_size)
+    archived = (
+        (entry.user_id, entry.timestamp, entry.id, entry.action_type)
+        for entry in iter_archived_entries(start_date, end_date, user_ids)
+    )
+
+    users, stamps, actions = [], [], []
+    for user_id, timestamp, _, action_type in heapq.merge(rows, archived):
+        users.append(user_id)
+        stamps.append((timestamp - EPOCH) // ONE_MICROSECOND)
+        actions.append(ACTION_CODES[action_type])
+
+    return (
+        np.array(users, dtype=np.int64),
+        np.array(stamps, dtype=np.int64),
+        np.array(actions, dtype=np.int8),
+    )
+
+
+def _last_index_before(mask):
+    """For every row, the index of the last earlier row where mask is set (-1 if none)."""
+    positions = np.where(mask, np.arange(mask.size), -1)
+    filled = np.maximum.accumulate(positions) if mask.size else positions
+    return np.concatenate(([-1], filled[:-1])) if mask.size else filled
+
+
+def pair_columns(users, stamps, actions):
+    """
+    Replays the clocking state machine of utils.replay_entries for every user at
+    once and returns (user_ids, work_microseconds, break_microseconds).
+
+    The sequential state (clock-in time, break-start time) is rebuilt with array
+    scans. Rows are cut into segments that end at each BREAK_END. Inside a segment
+    the clock-in flag is set by the last IN/OUT, or else carried in from the
+    previous segment. Each segment either forces that carried flag to a constant or
+    passes it through, so a forward fill over segments recovers it exactly,
+    including for malformed sequences.
+    """
+    n = users.size
+    if n == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+
+    index = np.arange(n)
+    is_in, is_out = actions == IN, actions == OUT
+    is_break_start, is_break_end = actions == BREAK_START, actions == BREAK_END
+    is_io = is_in | is_out
+
+    # --- 1. Segments: a new one starts at each user change and after each BREAK_END ---
+    new_user = np.concatenate(([True], users[1:] != users[:-1]))
+    new_segment = new_user | np.concatenate(([True], is_break_end[:-1]))
+    segment = np.cumsum(new_segment) - 1
+    segment_start = np.flatnonzero(new_segment)
+    segment_count = segment_start.size
+
+    # --- 2. Last IN/OUT before each row, within its segment ---
+    prev_io = _last_index_before(is_io)
+    has_prev_io = prev_io >= segment_start[segment]
+    prev_io_is_in = has_prev_io & is_in[np.maximum(prev_io, 0)]
+
+    # --- 3. How each segment transforms the carried clock-in flag ---
+    # A: a break started after an IN in the segment (the closing BREAK_END clocks back in)
+    # B: a break started before any IN/OUT in the segment (effective only if carried in)
+    # L: the last IN/OUT of the segment
+    seg_a = np.bincount(segment[is_break_start & prev_io_is_in], minlength=segment_count) > 0
+    seg_b = np.bincount(segment[is_break_start & ~has_prev_io], minlength=segment_count) > 0
+    last_io = np.full(segment_count, -1)
+    np.maximum.at(last_io, segment[is_io], index[is_io])
+    seg_last_in = (last_io >= 0) & is_in[np.maximum(last_io, 0)]
+    seg_last_out = (last_io >= 0) & is_out[np.maximum(last_io, 0)]
+
+    # Each segment maps the flag to constant 1, constant 0, or passes it through (-1)
+    transform = np.full(segment_count, -1, dtype=np.int8)
+    transform[seg_last_out & ~seg_b] = 0
+    transform[seg_a | seg_last_in] = 1
+
+    # --- 4. Carried-in flag per segment: the last constant segment before it, same user ---
+    segment_user_start = np.maximum.accumulate(np.where(new_user[segment_start], np.arange(segment_count), 0))
+    prev_const = _last_index_before(transform >= 0)
+    carried = np.where(
+        prev_const >= segment_user_start,
+        transform[np.maximum(prev_const, 0)] == 1,
+        False,
+    )
+
+    # --- 5. Per-row state and the timestamps it refers to ---
+    clocked_in = np.where(has_prev_io, prev_io_is_in, carried[segment])
+    effective_break_start = is_break_start & clocked_in
+    segment_on_break = np.bincount(segment[effective_break_start], minlength=segment_count) > 0
+    effective_break_end = is_break_end & segment_on_break[segment]
+
+    clock_in_row = _last_index_before(is_in | effective_break_end)
+    break_start_row = _last_index_before(effective_break_start)
+    clock_in_time = stamps[np.maximum(clock_in_row, 0)]
+    break_start_time = stamps[np.maximum(break_start_row, 0)]
+
+    # --- 6. Signed contributions, summed per user ---
+    work = np.zeros(n, dtype=np.int64)
+    closes_shift = is_out & clocked_in
+    opens_break = effective_break_start
+    work[closes_shift] = stamps[closes_shift] - clock_in_time[closes_shift]
+    work[opens_break] = -(stamps[opens_break] - clock_in_time[opens_break])
+    breaks = np.zeros(n, dtype=np.int64)
+    breaks[effective_break_end] = stamps[effective_break_end] - break_start_time[effective_break_end]
+
+    user_start = np.flatnonzero(new_user)
+    return users[user_start], np.add.reduceat(work, user_start), np.add.reduceat(breaks, user_start)
+
+
+def calculate_payroll(start_date, end_date, user_ids=None):
+    """
+    Batch version of utils.calculate_time_period for every user (or the given
+    users) over a date range: one streamed query and one vectorized pass instead
+    of a query and a Python loop per employee. Returns {user_id: totals}, with
+    totals in the same decimal-hour format as calculate_time_period. Users with no
+    entries in the range are omitted.
+    """
+    if sql_engine_applies(start_date, user_ids):
+        return {
+            user_id: {
+                'work_duration': to_hours(work / 1_000_000),
+                'break_duration': to_hours(breaks / 1_000_000),
+            }
+            for user_id, (work, breaks) in sql_period_totals(start_date, end_date, user_ids).items()
+        }
+
+    user_column, work_us, break_us = pair_columns(*load_entry_columns(start_date, end_date, user_ids))
+
+    return {
+        int(user_id): {
+            'work_duration': to_hours(work / 1_000_000),
+            'break_duration': to_hours(breaks / 1_000_000),
+        }
+        for user_id, work, breaks in zip(user_column, work_us.tolist(), break_us.tolist())
+    }
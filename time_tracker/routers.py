@@ -0,0 +1,113 @@
+# time_tracker/routers.py
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from django.db import connections, transaction
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+
+# Set while a @replica_reads view runs; contextvars follow the request into sync_to_async threads
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+def read_alias():
+    """The alias reads go to right now: the replica inside replica_reads, if one is configured."""
+    return REPLICA if _replica_reads.get() and REPLICA in connections.settings else PRIMARY
+
+
+@contextmanager
+def reading_from_replica():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def reading_from_primary():
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_reads(func):
+    """
+    Sends every read of `func` to the primary, even inside replica_reads. For
+    code that writes what it read (derived-data refreshes, counter recounts):
+    rows read from a lagging replica would be written back stale, and a hot
+    standby refuses SELECT ... FOR UPDATE.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with reading_from_primary():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def render_now(response):
+    # TemplateResponses (e.g. the admin's) render after the view returns; their queries count too
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    return response
+
+
+def replica_reads(view):
+    """
+    Sends a read-only page's queries to the replica. Only GET and HEAD
+    requests are routed; a POST to the same view reads from the primary, so
+    it never acts on stale rows. The replica can lag the primary slightly.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        with reading_from_replica():
+            return render_now(view(request, *args, **kwargs))
+    return wrapper
+
+
+def statement_timeout(milliseconds):
+    """
+    Cancels any query of the decorated view that runs longer than
+    `milliseconds` on PostgreSQL (no-op elsewhere). The view runs in a
+    transaction on the alias it reads from, with SET LOCAL, so the setting
+    never outlives the request, even behind a transaction-mode pooler.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            alias = read_alias()
+            if connections[alias].vendor != 'postgresql':
+                return view(request, *args, **kwargs)
+            with transaction.atomic(using=alias):
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SET LOCAL statement_timeout = %s', [int(milliseconds)])
+                return render_now(view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes always go to the primary. Reads go to the primary too, except
+    inside replica_reads when a 'replica' alias is configured. Both aliases
+    hold the same data, and only the primary is migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        # Explicit, so rows read from the replica don't pull their relations from it later
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
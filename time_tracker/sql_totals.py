@@ -0,0 +1,151 @@
+# time_tracker/sql_totals.py
+from datetime import date
+
+from django.conf import settings
+from django.db import connections
+
+from .archive import archive_horizon
+from .models import ArchivedDay, TimeEntry
+
+# A punch's timestamp as integer epoch microseconds, per database vendor
+EPOCH_MICROSECONDS = {
+    'postgresql': "CAST(EXTRACT(EPOCH FROM {column}) * 1000000 AS BIGINT)",
+    # SQLite stores 'YYYY-MM-DD HH:MM:SS[.ffffff]' in UTC; strftime would round the
+    # fraction to milliseconds (.9999 becomes the next second), so it only sees whole seconds
+    'sqlite': "CAST(strftime('%%s', substr({column}, 1, 19)) AS INTEGER) * 1000000 + CAST(substr({column}, 21, 6) AS INTEGER)",
+}
+
+# The state machine of utils.replay_steps, for every user at once. Pairing each
+# punch with its neighbour (LAG/LEAD) isn't enough for malformed sequences, so the
+# state comes from "last earlier row matching X" windows: a running MAX over
+# ROWS ... 1 PRECEDING, i.e. LAG ... IGNORE NULLS. Rows are cut into segments
+# ending at each BREAK_END; inside one, only IN/OUT change the clock-in flag, and
+# what a segment leaves behind is carried to the next (see payroll.pair_columns).
+TOTALS_SQL = """
+WITH entries AS (
+    SELECT {user} AS user_id, {day} AS day, {action} AS action, {epoch_us} AS us,
+           ROW_NUMBER() OVER (PARTITION BY {user} ORDER BY {timestamp}, {id}) AS n
+    FROM {table}
+    WHERE {day} BETWEEN %s AND %s {user_filter}
+),
+segmented AS (
+    SELECT entries.*,
+           COALESCE(SUM(CASE WHEN action = 'BREAK_END' THEN 1 ELSE 0 END) OVER (
+               PARTITION BY user_id ORDER BY n ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) AS seg
+    FROM entries
+),
+with_prev_io AS (
+    -- The last IN or OUT before the row in its segment, as n * 2 + 1 for IN and n * 2 for OUT
+    SELECT segmented.*,
+           MAX(CASE WHEN action = 'IN' THEN n * 2 + 1 WHEN action = 'OUT' THEN n * 2 END) OVER (
+               PARTITION BY user_id, seg ORDER BY n ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS prev_io
+    FROM segmented
+),
+segments AS (
+    -- What the row's segment leaves behind, on every row: 1 or 0 if it always leaves the
+    -- clock-in flag at that value, NULL if it passes the incoming one on
+    SELECT with_prev_io.*,
+           CASE
+               WHEN MAX(CASE WHEN action = 'BREAK_START' AND prev_io % 2 = 1 THEN 1 ELSE 0 END)
+                        OVER (PARTITION BY user_id, seg) = 1
+                    OR MAX(CASE WHEN action = 'IN' THEN n * 2 + 1 WHEN action = 'OUT' THEN n * 2 END)
+                        OVER (PARTITION BY user_id, seg) % 2 = 1 THEN 1
+               WHEN MAX(CASE WHEN action = 'IN' THEN n * 2 + 1 WHEN action = 'OUT' THEN n * 2 END)
+                        OVER (PARTITION BY user_id, seg) % 2 = 0
+                    AND MAX(CASE WHEN action = 'BREAK_START' AND prev_io IS NULL THEN 1 ELSE 0 END)
+                        OVER (PARTITION BY user_id, seg) = 0 THEN 0
+           END AS leaves
+    FROM with_prev_io
+),
+states AS (
+    -- A segment ends at its BREAK_END, so the earlier BREAK_END rows carry the flag into it
+    SELECT segments.*,
+           COALESCE(prev_io % 2, MAX(CASE WHEN action = 'BREAK_END' AND leaves IS NOT NULL THEN seg * 2 + leaves END) OVER (
+               PARTITION BY user_id ORDER BY n ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) % 2, 0) AS clocked_in
+    FROM segments
+),
+effective AS (
+    SELECT states.*,
+           CASE WHEN action = 'BREAK_START' AND clocked_in = 1 THEN 1 ELSE 0 END AS opens_break
+    FROM states
+),
+breaks AS (
+    SELECT effective.*,
+           MAX(opens_break) OVER (PARTITION BY user_id, seg) AS on_break
+    FROM effective
+),
+timed AS (
+    SELECT breaks.*,
+           MAX(CASE WHEN action = 'IN' OR (action = 'BREAK_END' AND on_break = 1) THEN us END) OVER (
+               PARTITION BY user_id ORDER BY n ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS clock_in_us,
+           MAX(CASE WHEN opens_break = 1 THEN us END) OVER (
+               PARTITION BY user_id ORDER BY n ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS break_start_us
+    FROM breaks
+)
+SELECT user_id, {group_day}
+       SUM(CASE WHEN action = 'OUT' AND clocked_in = 1 THEN us - clock_in_us
+                WHEN opens_break = 1 THEN clock_in_us - us
+                ELSE 0 END) AS work_us,
+       SUM(CASE WHEN action = 'BREAK_END' AND on_break = 1 THEN us - break_start_us ELSE 0 END) AS break_us
+FROM timed
+GROUP BY user_id {group_by_day}
+"""
+
+
+def sql_engine_applies(start_date, user_ids=None):
+    """
+    True when TIME_TOTALS_ENGINE is 'sql', the database can run it and the
+    range has no archived days (their entries only exist as compressed payloads).
+    """
+    if settings.TIME_TOTALS_ENGINE != 'sql':
+        return False
+    if connections[TimeEntry.objects.db].vendor not in EPOCH_MICROSECONDS:
+        return False
+    if start_date < archive_horizon():
+        archived = ArchivedDay.objects.filter(day__gte=start_date)
+        if user_ids is not None:
+            archived = archived.filter(user_id__in=user_ids)
+        return not archived.exists()
+    return True
+
+
+def sql_period_totals(start_date, end_date, user_ids=None, by_day=False):
+    """
+    Work and break totals in integer microseconds, computed in the database:
+    {user_id: (work, break)}, or {(user_id, day): (work, break)} with by_day
+    (a punch counts on the day of the punch that closes the interval). Each
+    user's punches in the range are replayed as one sequence, like
+    utils.calculate_time_period, so by_day values sum to the range totals.
+    """
+    alias = TimeEntry.objects.db
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    meta = TimeEntry._meta
+    column = {name: quote(meta.get_field(name).column) for name in ('user', 'timestamp', 'action_type', 'date_only', 'id')}
+
+    params = [start_date, end_date]
+    user_filter = ''
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        user_filter = f"AND {column['user']} IN ({', '.join(['%s'] * len(user_ids))})"
+        params += user_ids
+
+    sql = TOTALS_SQL.format(
+        table=quote(meta.db_table), user=column['user'], timestamp=column['timestamp'], id=column['id'],
+        action=column['action_type'], day=column['date_only'],
+        epoch_us=EPOCH_MICROSECONDS[connection.vendor].format(column=column['timestamp']),
+        user_filter=user_filter,
+        group_day='day,' if by_day else '', group_by_day=', day' if by_day else '',
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    if by_day:
+        return {
+            (user_id, day if isinstance(day, date) else date.fromisoformat(day)): (int(work), int(breaks))
+            for user_id, day, work, breaks in rows
+        }
+    return {user_id: (int(work), int(breaks)) for user_id, work, breaks in rows}
@@ -18,4 +18,126 @@ document.addEventListener('DOMContentLoaded', function() {
         link.addEventListener('mousedown', saveScrollPosition);
         window.addEventListener('beforeunload', saveScrollPosition); 
     });
-});
\ No newline at end of file
+});
+
+// Background job page: poll the job's status until it finishes
+document.addEventListener('DOMContentLoaded', function() {
+    const panel = document.getElementById('job-status');
+    if (!panel) {
+        return;
+    }
+    const label = document.getElementById('job-status-label');
+    const bar = document.getElementById('job-progress-bar');
+    const error = document.getElementById('job-error');
+    const download = document.getElementById('job-download');
+
+    function poll() {
+        fetch(panel.dataset.jobStatusUrl, {headers: {'Accept': 'application/json'}})
+            .then(response => response.json())
+            .then(job => {
+                label.textContent = job.status.charAt(0) + job.status.slice(1).toLowerCase();
+                bar.style.width = job.progress + '%';
+                bar.textContent = job.progress + '%';
+                if (job.status === 'DONE') {
+                    download.href = job.download_url;
+                    download.classList.remove('d-none');
+                } else if (job.status === 'FAILED') {
+                    error.textContent = job.error;
+                    error.classList.remove('d-none');
+                } else {
+                    setTimeout(poll, 2000);
+                }
+            })
+            .catch(() => setTimeout(poll, 5000));
+    }
+    poll();
+});
+
+
+// Attendance board: show time since each punch, and re-fetch the board only when its ETag changes
+document.addEventListener('DOMContentLoaded', function() {
+    const board = document.getElementById('attendance-board');
+    if (!board) {
+        return;
+    }
+
+    function showElapsed() {
+        const now = Date.now();
+        board.querySelectorAll('[data-since]').forEach(cell => {
+            if (!cell.dataset.since) {
+                return;
+            }
+            const minutes = Math.max(0, Math.floor((now - Number(cell.dataset.since)) / 60000));
+            const hours = Math.floor(minutes / 60);
+            cell.textContent = hours ? `${hours}h ${minutes % 60}m ago` : `${minutes}m ago`;
+        });
+    }
+
+    function refresh() {
+        fetch(window.location.href, {headers: {'If-None-Match': board.dataset.etag}, cache: 'no-store'})
+            .then(response => {
+                if (response.status !== 200) {
+                    return;  // 304: nothing changed
+                }
+                return response.text().then(html => {
+                    const page = new DOMParser().parseFromString(html, 'text/html');
+                    document.getElementById('attendance-summary').innerHTML = page.getElementById('attendance-summary').innerHTML;
+                    board.innerHTML = page.getElementById('attendance-board').innerHTML;
+                    board.dataset.etag = response.headers.get('ETag') || '';
+                });
+            })
+            .catch(() => {})
+            .finally(showElapsed);
+    }
+
+    showElapsed();
+    setInterval(refresh, 30000);
+});
+
+
+// Lookup pickers: the select only renders its selected option; a search box above it
+// loads matching options from data-lookup-url as the user types
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('select[data-lookup-url]').forEach(select => {
+        const search = document.createElement('input');
+        search.type = 'search';
+        search.className = 'form-control custom-input-dark mb-2';
+        search.placeholder = 'Type to search...';
+        search.autocomplete = 'off';
+        select.before(search);
+
+        let timer = null;
+        let latest = 0;
+
+        function load() {
+            const request = ++latest;
+            const url = new URL(select.dataset.lookupUrl, window.location.href);
+            url.searchParams.set('q', search.value.trim());
+            fetch(url, {headers: {'Accept': 'application/json'}})
+                .then(response => response.json())
+                .then(data => {
+                    if (request !== latest) {
+                        return;  // A newer search has been sent
+                    }
+                    // Keep the current choice so the form never loses it
+                    const current = select.selectedOptions[0];
+                    const options = data.results
+                        .filter(result => !current || String(result.id) !== current.value)
+                        .map(result => new Option(result.text, result.id));
+                    if (data.more) {
+                        const hint = new Option('Keep typing to narrow the list...', '');
+                        hint.disabled = true;
+                        options.push(hint);
+                    }
+                    select.replaceChildren(...(current ? [current] : []), ...options);
+                })
+                .catch(() => {});
+        }
+
+        search.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(load, 250);
+        });
+        search.addEventListener('focus', load, {once: true});
+    });
+});
@@ -1,3 +1,1482 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .archive import ONE_MICROSECOND, archive_closed_days
+from .auth import CachedModelBackend, restamp_user
+from .exports import iter_export_rows
+from .jobs import JOB_HEARTBEAT_EVERY, ProgressReporter, run_job, submit_job
+from .cache import DjangoCacheBackend, LocalLRUCache, get_totals_cache, reset_totals_cache
+from .models import ArchivedDay, BreakInterval, Counter, DailySummary, DirtyUserDay, Job, Shift, TimeEntry, TimeEditRequest, UserStatus
+from .metrics import registry as metrics_registry
+from .middleware import PerformanceMetricsMiddleware
+from .pagination import KeysetPaginator
+from .routers import PrimaryReplicaRouter, reading_from_replica
+from .sql_totals import sql_engine_applies, sql_period_totals
+from .payroll import calculate_payroll
+from .utils import aget_period_totals, calculate_time_period, get_cached_period_totals, get_period_totals, record_clock_action, replay_entries, review_edit_requests
+from .views import aget_user_status, async_clock_action, async_dashboard, get_user_status
+from .workload import generate_workload
+
+User = get_user_model()
+
+
+def make_time(day, hour, minute=0):
+    """Aware datetime on the given day offset from 2025-01-06 (a Monday)."""
+    return timezone.make_aware(datetime(2025, 1, 6, hour, minute) + timedelta(days=day))
+
+
+class UserStatusTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+
+    def punch(self, action_type, when):
+        return TimeEntry.objects.create(user=self.user, timestamp=when, action_type=action_type)
+
+    def test_status_defaults_to_out(self):
+        self.assertEqual(get_user_status(self.user), 'OUT')
+
+    def test_status_follows_punches(self):
+        self.punch('IN', make_time(0, 9))
+        self.assertEqual(get_user_status(self.user), 'IN')
+        self.punch('BREAK_START', make_time(0, 12))
+        status = UserStatus.objects.get(user=self.user)
+        self.assertEqual(status.state, 'BREAK_START')
+        self.assertEqual(status.shift_start, make_time(0, 9))
+        self.assertEqual(status.break_start, make_time(0, 12))
+        self.punch('BREAK_END', make_time(0, 12, 30))
+        self.assertEqual(get_user_status(self.user), 'IN')
+        self.punch('OUT', make_time(0, 17))
+        self.assertEqual(get_user_status(self.user), 'OUT')
+
+    def test_back_dated_insert_does_not_change_status(self):
+        self.punch('IN', make_time(0, 9))
+        self.punch('OUT', make_time(-1, 17))
+        self.assertEqual(get_user_status(self.user), 'IN')
+
+    def test_delete_rebuilds_status(self):
+        self.punch('IN', make_time(0, 9))
+        out = self.punch('OUT', make_time(0, 17))
+        out.delete()
+        status = UserStatus.objects.get(user=self.user)
+        self.assertEqual(status.state, 'IN')
+        self.assertEqual(status.last_timestamp, make_time(0, 9))
+
+    def test_accepted_edit_rebuilds_status(self):
+        self.punch('IN', make_time(0, 9))
+        out = self.punch('OUT', make_time(0, 17))
+        staff = User.objects.create_user('manager', password='pass12345', is_staff=True)
+        edit = TimeEditRequest.objects.create(
+            original_entry=out, requested_timestamp=make_time(0, 8), request_reason='Wrong button'
+        )
+        self.client.force_login(staff)
+        self.client.post(f'/manage/requests/{edit.id}/process/', {'action': 'accept'})
+        status = UserStatus.objects.get(user=self.user)
+        self.assertEqual(status.state, 'IN')
+        self.assertEqual(status.last_timestamp, make_time(0, 9))
+
+
+class ClockActionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+        self.client.force_login(self.user)
+
+    def test_invalid_transition_is_ignored(self):
+        self.client.post('/clock/', {'action': 'OUT'})
+        self.assertFalse(TimeEntry.objects.exists())
+
+    def test_double_submit_records_one_entry(self):
+        self.client.post('/clock/', {'action': 'IN', 'idempotency_key': 'abc'})
+        self.client.post('/clock/', {'action': 'IN', 'idempotency_key': 'abc'})
+        self.assertEqual(TimeEntry.objects.filter(action_type='IN').count(), 1)
+
+    def test_retry_with_same_key_is_a_single_read(self):
+        record_clock_action(self.user, 'IN', 'key-1')
+        with self.assertNumQueries(1):
+            self.assertIsNone(record_clock_action(self.user, 'IN', 'key-1'))
+
+    def test_retry_key_does_not_block_next_action(self):
+        record_clock_action(self.user, 'IN', 'key-1')
+        self.assertIsNotNone(record_clock_action(self.user, 'OUT', 'key-2'))
+        self.assertEqual(get_user_status(self.user), 'OUT')
+
+
+class ClockActionConcurrencyTests(TransactionTestCase):
+    THREADS = 200
+
+    def race(self, user, action_type):
+        """Fire THREADS simultaneous punches for one user; return how many won."""
+        barrier = threading.Barrier(self.THREADS)
+        wins = []
+
+        def attempt(n):
+            barrier.wait()
+            try:
+                # Like a retrying client: resend the same key when the database is busy
+                for retry in range(12):
+                    try:
+                        if record_clock_action(user, action_type, f'{action_type}-{n}'):
+                            wins.append(n)
+                        return
+                    except OperationalError:
+                        time.sleep(random.uniform(0, 0.001 * 2 ** retry))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(n,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return len(wins)
+
+    def test_exactly_one_transition_wins(self):
+        user = User.objects.create_user('worker', password='pass12345')
+        UserStatus.objects.create(user=user)
+
+        self.assertEqual(self.race(user, 'IN'), 1)
+        self.assertEqual(self.race(user, 'BREAK_START'), 1)
+        self.assertEqual(self.race(user, 'OUT'), 1)
+
+        actions = list(TimeEntry.objects.filter(user=user).order_by('timestamp')
+                       .values_list('action_type', flat=True))
+        self.assertEqual(actions, ['IN', 'BREAK_START', 'OUT'])
+        self.assertEqual(get_user_status(user), 'OUT')
+
+
+class DailySummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+
+    def punch(self, action_type, when):
+        return TimeEntry.objects.create(user=self.user, timestamp=when, action_type=action_type)
+
+    def work_day(self, day):
+        self.punch('IN', make_time(day, 9))
+        self.punch('BREAK_START', make_time(day, 12))
+        self.punch('BREAK_END', make_time(day, 12, 30))
+        self.punch('OUT', make_time(day, 17))
+
+    def test_summary_matches_replay(self):
+        for day in range(5):
+            self.work_day(day)
+        start, end = make_time(0, 0).date(), make_time(4, 0).date()
+
+        self.assertEqual(DailySummary.objects.filter(user=self.user).count(), 5)
+        totals = get_period_totals(self.user, start, end)
+        expected = calculate_time_period(self.user, start, end)
+        self.assertEqual(totals['work_duration'], expected['work_duration'])
+        self.assertEqual(totals['break_duration'], expected['break_duration'])
+
+    def test_open_shift_is_flagged(self):
+        self.punch('IN', make_time(0, 9))
+        summary = DailySummary.objects.get(user=self.user)
+        self.assertTrue(summary.has_open_shift)
+        self.assertEqual(summary.shift_count, 1)
+
+    def test_edit_across_midnight_refreshes_both_days(self):
+        self.punch('IN', make_time(0, 9))
+        out = self.punch('OUT', make_time(0, 17))
+        out.timestamp = make_time(1, 1)
+        out.save()
+
+        first_day = DailySummary.objects.get(user=self.user, day=make_time(0, 0).date())
+        second_day = DailySummary.objects.get(user=self.user, day=make_time(1, 0).date())
+        self.assertEqual(first_day.work_seconds, 0)
+        self.assertTrue(first_day.has_open_shift)
+        self.assertEqual(second_day.shift_count, 0)
+
+    def test_deleting_last_entry_drops_summary(self):
+        entry = self.punch('IN', make_time(0, 9))
+        entry.delete()
+        self.assertFalse(DailySummary.objects.exists())
+
+    def assertMatchesReplay(self, start, end):
+        expected = calculate_time_period(self.user, start, end)
+        totals = get_period_totals(self.user, start, end)
+        self.assertEqual((totals['work_duration'], totals['break_duration']),
+                         (expected['work_duration'], expected['break_duration']), (start, end))
+        return totals
+
+    def test_overnight_shift_counts_on_the_day_it_closes(self):
+        self.punch('IN', make_time(0, 22))
+        self.punch('OUT', make_time(1, 6))
+        first, second = make_time(0, 0).date(), make_time(1, 0).date()
+
+        self.assertEqual(self.assertMatchesReplay(first, second)['work_duration'], 8.0)
+        # Replaying the second day alone finds no clock in, and neither does its total
+        self.assertEqual(self.assertMatchesReplay(second, second)['work_duration'], 0.0)
+        summary = DailySummary.objects.get(user=self.user, day=second)
+        self.assertEqual((summary.work_seconds, summary.carried_work_seconds), (8 * 3600, 8 * 3600))
+        self.assertFalse(summary.has_open_shift)
+
+    def test_back_dated_change_carries_into_later_days(self):
+        self.punch('IN', make_time(0, 22))
+        self.punch('OUT', make_time(1, 6))
+        self.punch('OUT', make_time(3, 6))
+        # An IN the evening before a later day that had nothing open yet
+        late_in = self.punch('IN', make_time(2, 22))
+        self.assertEqual(DailySummary.objects.get(user=self.user, day=make_time(3, 0).date()).work_seconds, 8 * 3600)
+        self.assertMatchesReplay(make_time(0, 0).date(), make_time(3, 0).date())
+
+        late_in.timestamp = make_time(0, 21)
+        late_in.save()
+        self.assertEqual(DailySummary.objects.get(user=self.user, day=make_time(3, 0).date()).work_seconds, 0)
+        self.assertEqual(self.assertMatchesReplay(make_time(0, 0).date(), make_time(3, 0).date())['work_duration'], 8.0)
+
+    def test_ranges_match_replay_for_shifts_across_midnight(self):
+        rng = random.Random(11)
+        shifts, when = [], make_time(0, 18)
+        for _ in range(12):
+            when += timedelta(hours=rng.randint(4, 30), minutes=rng.randint(0, 59))
+            punches = [('IN', when)]
+            if rng.random() < 0.5:
+                punches += [('BREAK_START', when + timedelta(hours=3)), ('BREAK_END', when + timedelta(hours=4))]
+            when += timedelta(hours=rng.randint(5, 11))
+            shifts.append(punches + [('OUT', when)])
+        # Written out of order, so later days are summarized before the days they follow
+        rng.shuffle(shifts)
+        for punches in shifts:
+            for action_type, timestamp in punches:
+                self.punch(action_type, timestamp)
+
+        days = sorted(DailySummary.objects.filter(user=self.user).values_list('day', flat=True))
+        for start in days:
+            for end in days[days.index(start):]:
+                self.assertMatchesReplay(start, end)
+
+    def test_range_starting_inside_a_shift_with_a_break(self):
+        self.punch('IN', make_time(0, 22))
+        self.punch('BREAK_START', make_time(1, 2))
+        self.punch('BREAK_END', make_time(1, 2, 30))
+        self.punch('OUT', make_time(2, 1))
+        second, third = make_time(1, 0).date(), make_time(2, 0).date()
+
+        # On its own the second day has nothing open, so the OUT on the third closes nothing
+        self.assertTrue(DailySummary.objects.get(user=self.user, day=second).carry_persists)
+        self.assertEqual(self.assertMatchesReplay(second, third)['work_duration'], 0.0)
+        self.assertEqual(async_to_sync(aget_period_totals)(self.user, second, third)['work_duration'], 0.0)
+        self.assertEqual(self.assertMatchesReplay(make_time(0, 0).date(), third)['work_duration'], 18.5)
+
+    def assertEveryRangeMatchesReplay(self):
+        entries = TimeEntry.objects.filter(user=self.user).order_by('timestamp')
+        first, last = entries.first().timestamp, entries.last().timestamp
+        days = [timezone.localdate(first) + timedelta(days=n)
+                for n in range((timezone.localdate(last) - timezone.localdate(first)).days + 1)]
+        for start in days:
+            for end in days[days.index(start):]:
+                self.assertMatchesReplay(start, end)
+
+    def test_ranges_match_replay_for_multi_day_and_malformed_sequences(self):
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                TimeEntry.objects.filter(user=self.user).delete()
+                rng = random.Random(seed)
+                # A shift across two midnights with a break on each day it spans
+                punches = [('IN', make_time(0, 20)), ('BREAK_START', make_time(1, 3)), ('BREAK_END', make_time(1, 4)),
+                           ('BREAK_START', make_time(2, 1)), ('BREAK_END', make_time(2, 2)), ('OUT', make_time(2, 9))]
+                # Then any action in any order: repeated INs, OUTs and BREAK_ENDs with nothing to close
+                when = make_time(3, 8)
+                for _ in range(25):
+                    when += timedelta(hours=rng.randint(1, 40), minutes=rng.randint(0, 59))
+                    punches.append((rng.choice(['IN', 'IN', 'OUT', 'BREAK_START', 'BREAK_END']), when))
+                rng.shuffle(punches)
+                entries = [self.punch(action_type, timestamp) for action_type, timestamp in punches]
+                self.assertEveryRangeMatchesReplay()
+
+                # Back-dated edits and deletes cascade through the carried state
+                for entry in rng.sample(entries, 4):
+                    entry.timestamp -= timedelta(hours=rng.randint(1, 30))
+                    entry.save()
+                for entry in rng.sample(entries, 4):
+                    entry.delete()
+                self.assertEveryRangeMatchesReplay()
+
+
+class PayrollEngineTests(TestCase):
+    def test_batch_matches_per_user_calculation(self):
+        rng = random.Random(42)
+        actions = [code for code, _ in TimeEntry.ACTION_CHOICES]
+        users = [User.objects.create_user(f'worker{n}', password='pass12345') for n in range(8)]
+        for user in users:
+            when = make_time(0, 6)
+            # Random punches, so double INs, missing OUTs and stray breaks all occur
+            for _ in range(rng.randint(0, 40)):
+                when += timedelta(minutes=rng.randint(1, 400), seconds=rng.randint(0, 59))
+                TimeEntry.objects.create(user=user, timestamp=when, action_type=rng.choice(actions))
+
+        start, end = make_time(0, 0).date(), make_time(30, 0).date()
+        batch = calculate_payroll(start, end)
+        for user in users:
+            expected = calculate_time_period(user, start, end)
+            if not expected['raw_entries'].exists():
+                self.assertNotIn(user.id, batch)
+                continue
+            self.assertEqual(batch[user.id]['work_duration'], expected['work_duration'])
+            self.assertEqual(batch[user.id]['break_duration'], expected['break_duration'])
+
+
+class SqlTotalsEngineTests(TestCase):
+    """Differential tests: the window-function engine against the Python state machine."""
+
+    def setUp(self):
+        self.start, self.end = make_time(0, 0).date(), make_time(30, 0).date()
+
+    def add_sequence(self, user, actions, rng=None):
+        when = make_time(0, 6)
+        for action_type in actions:
+            # Same-timestamp ties too, which replay in id order
+            if rng is None or rng.random() > 0.05:
+                when += timedelta(minutes=rng.randint(1, 400) if rng else 60,
+                                  microseconds=rng.randint(0, 999999) if rng else 250)
+            TimeEntry.objects.create(user=user, timestamp=when, action_type=action_type)
+
+    def python_totals(self, user):
+        totals = replay_entries(TimeEntry.objects.filter(
+            user=user, date_only__range=(self.start, self.end)).order_by('timestamp', 'id'))
+        return totals['work_time'] // ONE_MICROSECOND, totals['break_time'] // ONE_MICROSECOND
+
+    def assert_engines_agree(self, users):
+        sql = sql_period_totals(self.start, self.end, [user.pk for user in users])
+        by_day = sql_period_totals(self.start, self.end, [user.pk for user in users], by_day=True)
+        for user in users:
+            expected = self.python_totals(user)
+            self.assertEqual(sql.get(user.pk, (0, 0)), expected, user.username)
+            days = [totals for (user_id, _), totals in by_day.items() if user_id == user.pk]
+            self.assertEqual((sum(work for work, _ in days), sum(breaks for _, breaks in days)), expected)
+
+    def test_randomized_sequences_match_python(self):
+        rng = random.Random(2024)
+        actions = [code for code, _ in TimeEntry.ACTION_CHOICES]
+        users = [User.objects.create_user(f'worker{n}', password='pass12345') for n in range(12)]
+        for user in users:
+            self.add_sequence(user, [rng.choice(actions) for _ in range(rng.randint(0, 60))], rng)
+        self.assert_engines_agree(users)
+
+    def test_malformed_sequences_match_python(self):
+        sequences = {
+            'double_in': ['IN', 'IN', 'OUT'],
+            'missing_out': ['IN', 'BREAK_START', 'BREAK_END', 'IN', 'OUT'],
+            'orphan_break_end': ['BREAK_END', 'IN', 'OUT', 'BREAK_END'],
+            'break_while_out': ['IN', 'OUT', 'BREAK_START', 'BREAK_END', 'OUT'],
+            'double_break_start': ['IN', 'BREAK_START', 'BREAK_START', 'BREAK_END', 'OUT'],
+            'out_on_break': ['IN', 'BREAK_START', 'OUT', 'IN', 'BREAK_END', 'BREAK_END', 'OUT'],
+            'never_out': ['IN', 'BREAK_START', 'BREAK_END'],
+        }
+        users = []
+        for name, actions in sequences.items():
+            users.append(User.objects.create_user(name, password='pass12345'))
+            self.add_sequence(users[-1], actions)
+        self.assert_engines_agree(users)
+
+    def test_setting_switches_period_and_payroll_engines(self):
+        rng = random.Random(5)
+        actions = [code for code, _ in TimeEntry.ACTION_CHOICES]
+        users = [User.objects.create_user(f'worker{n}', password='pass12345') for n in range(4)]
+        for user in users:
+            self.add_sequence(user, [rng.choice(actions) for _ in range(30)], rng)
+
+        with override_settings(TIME_TOTALS_ENGINE='python'):
+            python = [calculate_time_period(user, self.start, self.end) for user in users]
+            python_payroll = calculate_payroll(self.start, self.end)
+        with override_settings(TIME_TOTALS_ENGINE='sql'):
+            self.assertTrue(sql_engine_applies(self.start))
+            sql = [calculate_time_period(user, self.start, self.end) for user in users]
+            sql_payroll = calculate_payroll(self.start, self.end)
+        for before, after in zip(python, sql):
+            self.assertEqual(before['work_duration'], after['work_duration'])
+            self.assertEqual(before['break_duration'], after['break_duration'])
+        self.assertEqual(python_payroll, sql_payroll)
+
+    @override_settings(TIME_TOTALS_ENGINE='sql', ARCHIVE_AFTER_DAYS=0)
+    def test_archived_ranges_fall_back_to_python(self):
+        user = User.objects.create_user('worker', password='pass12345')
+        self.add_sequence(user, ['IN', 'OUT'])
+        self.assertTrue(sql_engine_applies(self.start))
+        archive_closed_days(timezone.localdate())
+        self.assertFalse(sql_engine_applies(self.start))
+        self.assertEqual(calculate_time_period(user, self.start, self.end)['work_duration'], 1.0)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+        self.other = User.objects.create_user('other', password='pass12345')
+        for user in (self.user, self.other):
+            for action_type, hour in (('IN', 9), ('BREAK_START', 12), ('BREAK_END', 13), ('OUT', 17)):
+                TimeEntry.objects.create(user=user, timestamp=make_time(0, hour), action_type=action_type)
+        self.day = make_time(0, 0).date().isoformat()
+
+    def read_csv(self, response):
+        content = b''.join(response.streaming_content).decode()
+        return list(csv.DictReader(io.StringIO(content)))
+
+    def test_csv_totals_match_period_calculation(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/reports/export/', {'date_from': self.day, 'date_to': self.day})
+        rows = self.read_csv(response)
+
+        self.assertEqual(len(rows), 4)
+        expected = calculate_time_period(self.user, make_time(0, 0).date(), make_time(0, 0).date())
+        work_hours = sum(float(row['work_seconds']) for row in rows) / 3600
+        self.assertEqual(round(work_hours, 2), expected['work_duration'])
+
+    def test_non_staff_only_export_their_own_entries(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/reports/export/', {
+            'date_from': self.day, 'date_to': self.day, 'user_id': self.other.id,
+        })
+        self.assertEqual({row['username'] for row in self.read_csv(response)}, {'worker'})
+
+    def test_management_command_writes_csv(self):
+        output = io.StringIO()
+        call_command('export_timesheets', self.day, self.day, '--user', 'other', stdout=output)
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        self.assertEqual({row['username'] for row in rows}, {'other'})
+
+
+class QueryPlanTests(TransactionTestCase):
+    """
+    Captures EXPLAIN output for the hot queries and fails on a full table scan
+    or an explicit sort. Set EXPLAIN_SEED_ROWS=1000000 for the full-size check.
+    """
+    SEED_ROWS = int(os.environ.get('EXPLAIN_SEED_ROWS', 20000))
+    USERS = 50
+
+    def setUp(self):
+        users = User.objects.bulk_create([User(username=f'plan{n}') for n in range(self.USERS)])
+        actions = [code for code, _ in TimeEntry.ACTION_CHOICES]
+        start = make_time(0, 0)
+        entries = []
+        for n in range(self.SEED_ROWS):
+            when = start + timedelta(minutes=7 * (n // self.USERS))
+            entries.append(TimeEntry(user=users[n % self.USERS], timestamp=when,
+                                     action_type=actions[n % 4], date_only=when.date()))
+            if len(entries) == 5000:
+                TimeEntry.objects.bulk_create(entries)
+                entries = []
+        TimeEntry.objects.bulk_create(entries)
+        TimeEditRequest.objects.bulk_create([
+            TimeEditRequest(original_entry_id=entry_id, requested_timestamp=start,
+                            request_reason='seed', status='PENDING' if n % 10 == 0 else 'ACCEPTED')
+            for n, entry_id in enumerate(TimeEntry.objects.values_list('id', flat=True)[:2000])
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.user = users[0]
+
+    def hot_queries(self):
+        day = make_time(3, 0).date()
+        entries = TimeEntry.objects.filter(user=self.user)
+        pending = TimeEditRequest.objects.filter(status='PENDING')
+        return {
+            'status rebuild / admin entry list': entries.order_by('-timestamp', '-id')[:15],
+            'dashboard entries today': entries.filter(date_only=day).order_by('-timestamp', '-id')[:10],
+            'report entries for range': entries.filter(
+                date_only__range=(day, day + timedelta(days=6))).order_by('date_only', 'timestamp', 'id')[:10],
+            'daily summary recompute': entries.filter(date_only=day).order_by('timestamp', 'id'),
+            'pending review queue': pending.order_by('requested_timestamp', 'id')[:15],
+            'pending request count': pending.values('id'),
+        }
+
+    def assertPlanUsesIndexes(self, name, plan):
+        if connection.vendor == 'postgresql':
+            forbidden = ['Seq Scan', 'Sort']
+        else:
+            forbidden = ['USE TEMP B-TREE']
+            # SQLite reports "SCAN <table>" without an index for a full scan
+            for line in plan.splitlines():
+                if 'SCAN ' in line and 'INDEX' not in line:
+                    self.fail(f"{name} scans the table:\n{plan}")
+        for marker in forbidden:
+            self.assertNotIn(marker, plan, f"{name} plan contains {marker!r}:\n{plan}")
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(query=name):
+                self.assertPlanUsesIndexes(name, queryset.explain())
+
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+        # Pairs of entries share a timestamp so the id tiebreak is exercised
+        for n in range(23):
+            TimeEntry.objects.create(user=self.user, timestamp=make_time(n // 6, 8 + (n // 2) % 8),
+                                     action_type='IN')
+        self.entries = TimeEntry.objects.filter(user=self.user)
+
+    def walk(self, ordering):
+        paginator = KeysetPaginator(self.entries, 5, ordering=ordering)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(after=pages[-1].next_cursor))
+        return paginator, pages
+
+    def test_forward_walk_covers_every_row_once(self):
+        for ordering in (('-timestamp', '-id'), ('date_only', 'timestamp', 'id')):
+            with self.subTest(ordering=ordering):
+                _, pages = self.walk(ordering)
+                seen = [entry.id for page in pages for entry in page]
+                expected = list(self.entries.order_by(*ordering).values_list('id', flat=True))
+                self.assertEqual(seen, expected)
+                self.assertFalse(pages[0].has_previous())
+
+    def test_previous_returns_the_same_pages(self):
+        paginator, pages = self.walk(('-timestamp', '-id'))
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = paginator.get_page(before=page.previous_cursor)
+            self.assertEqual([entry.id for entry in page], [entry.id for entry in expected])
+        self.assertFalse(page.has_previous())
+
+    def test_deep_page_is_one_query(self):
+        paginator, pages = self.walk(('-timestamp', '-id'))
+        with self.assertNumQueries(1):
+            len(paginator.get_page(after=pages[-2].next_cursor))
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(self.entries, 5)
+        self.assertEqual(len(paginator.get_page(after='not-a-cursor')), 5)
+
+
+class QueryBudgetTests(TestCase):
+    """Each page must render in a fixed number of queries, however many rows it shows."""
+
+    BUDGETS = {
+        '/': 6,
+        # User pickers only render the selected user, so no user-list query
+        '/reports/?date_from=2025-01-01&date_to=2025-01-31': 5,
+        '/manageusers?user_id={worker}': 4,
+        '/manage/requests/': 4,
+        '/admin/time_tracker/timeentry/': 6,
+        '/admin/time_tracker/timeeditrequest/': 6,
+    }
+
+    def setUp(self):
+        self.staff = User.objects.create_superuser('manager', password='pass12345')
+        self.worker = User.objects.create_user('worker', password='pass12345')
+        self.client.force_login(self.staff)
+
+    def add_rows(self, count):
+        today = timezone.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        for n in range(count):
+            for user, when in ((self.worker, make_time(n % 20, 9, n % 60)), (self.staff, today)):
+                entry = TimeEntry.objects.create(user=user, timestamp=when + timedelta(seconds=n),
+                                                 action_type='IN')
+                TimeEditRequest.objects.create(original_entry=entry, requested_timestamp=when,
+                                               request_reason='Forgot to clock in')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url.format(worker=self.worker.id))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_is_constant_as_rows_grow(self):
+        reset_totals_cache()
+        self.add_rows(3)
+        small = {url: self.count_queries(url) for url in self.BUDGETS}
+        self.add_rows(12)
+        for url, budget in self.BUDGETS.items():
+            with self.subTest(url=url):
+                large = self.count_queries(url)
+                self.assertEqual(large, small[url])
+                self.assertLessEqual(large, budget)
+
+    def test_benchmark_regressions_fail_the_command(self):
+        previous = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'previous.json')
+        options = {'sizes': ['2x1'], 'only': ['get_user_status'], 'repeat': 1, 'stdout': io.StringIO(),
+                   'stderr': io.StringIO()}
+        call_command('run_benchmarks', output=previous, **options)
+        with open(previous) as previous_file:
+            report = json.load(previous_file)
+        report['results'][0]['queries'] = 0
+        with open(previous, 'w') as previous_file:
+            json.dump(report, previous_file)
+
+        with self.assertRaisesMessage(CommandError, 'Regressions:'):
+            call_command('run_benchmarks', compare=previous, **options)
+
+
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        metrics_registry.reset()
+        self.staff = User.objects.create_user('manager', password='pass12345', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_metrics_are_recorded_per_view(self):
+        self.client.get('/')
+        body = self.client.get('/metrics/').content.decode()
+
+        self.assertIn('timetracker_request_duration_seconds_count{view="dashboard"} 1', body)
+        self.assertIn('timetracker_request_queries_bucket{view="dashboard",le="+Inf"} 1', body)
+        self.assertIn('timetracker_request_template_seconds_sum{view="dashboard"}', body)
+        self.assertIn('timetracker_response_size_bytes_count{view="dashboard"} 1', body)
+
+    def test_async_views_record_their_queries(self):
+        staff = self.staff
+
+        async def auser():
+            return staff
+        request = AsyncRequestFactory().get('/')
+        request.auser = auser
+        middleware = PerformanceMetricsMiddleware(async_dashboard)
+
+        # The view's ORM calls run in a sync_to_async thread, not the event loop's
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(middleware)(request)
+        self.assertGreater(len(queries), 0)
+        body = metrics_registry.render_prometheus()
+        self.assertIn(f'timetracker_request_queries_sum{{view="unresolved"}} {float(len(queries))}', body)
+        self.assertNotIn('timetracker_request_db_seconds_sum{view="unresolved"} 0.0\n', body)
+
+    def test_metrics_are_staff_only(self):
+        worker = User.objects.create_user('worker', password='pass12345')
+        self.client.force_login(worker)
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0)
+    def test_slow_request_log_includes_sql(self):
+        with self.assertLogs('time_tracker.performance', level='WARNING') as logs:
+            self.client.get('/')
+        self.assertIn('view=dashboard', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class WorkloadGeneratorTests(TestCase):
+    def test_generated_data_matches_derived_tables(self):
+        users = generate_workload(users=3, months=1, pending_requests=5, end_date=make_time(0, 0).date())
+
+        self.assertEqual(TimeEditRequest.objects.filter(status='PENDING').count(), 5)
+        for user in users:
+            entries = TimeEntry.objects.filter(user=user).order_by('timestamp', 'id')
+            first, last = entries.first().date_only, entries.last().date_only
+            totals = calculate_time_period(user, first, last)
+            self.assertEqual(get_period_totals(user, first, last)['work_duration'], totals['work_duration'])
+            self.assertEqual(get_user_status(user), 'OUT')
+
+
+class TotalsCacheTests(TestCase):
+    def setUp(self):
+        reset_totals_cache()
+        metrics_registry.reset()
+        self.user = User.objects.create_user('worker', password='pass12345')
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 9), action_type='IN')
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 17), action_type='OUT')
+        self.day = make_time(0, 9).date()
+
+    def totals(self):
+        return get_cached_period_totals(self.user, self.day, self.day)
+
+    def test_repeat_reads_are_served_from_cache(self):
+        self.assertEqual(self.totals()['work_duration'], 8.0)
+        with self.assertNumQueries(1):  # Only the data version lookup
+            self.assertEqual(self.totals()['work_duration'], 8.0)
+        self.assertEqual(metrics_registry.counter('timetracker_totals_cache_hits_total'), 1)
+        self.assertEqual(metrics_registry.counter('timetracker_totals_cache_misses_total'), 1)
+
+    def test_writes_and_accepted_edits_invalidate(self):
+        self.totals()
+        entry = TimeEntry.objects.get(user=self.user, action_type='OUT')
+        entry.timestamp = make_time(0, 18)
+        entry.save()
+        self.assertEqual(self.totals()['work_duration'], 9.0)
+
+        edit = TimeEditRequest.objects.create(original_entry=entry, requested_timestamp=make_time(0, 16),
+                                              request_reason='Left early')
+        staff = User.objects.create_user('manager', password='pass12345', is_staff=True)
+        self.client.force_login(staff)
+        self.client.post(f'/manage/requests/{edit.id}/process/', {'action': 'accept'})
+        self.assertEqual(self.totals()['work_duration'], 7.0)
+
+        entry.refresh_from_db()
+        entry.delete()
+        self.assertEqual(self.totals()['work_duration'], 0.0)
+
+    def test_admin_bulk_delete_invalidates(self):
+        self.totals()
+        staff = User.objects.create_superuser('admin', password='pass12345')
+        self.client.force_login(staff)
+        ids = list(TimeEntry.objects.values_list('id', flat=True))
+        self.client.post('/admin/time_tracker/timeentry/', {
+            'action': 'delete_selected', '_selected_action': ids, 'post': 'yes'})
+        self.assertEqual(self.totals()['work_duration'], 0.0)
+        self.assertEqual(get_user_status(self.user), 'OUT')
+        self.assertFalse(DailySummary.objects.filter(user=self.user).exists())
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = LocalLRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        TOTALS_CACHE={'BACKEND': 'time_tracker.cache.DjangoCacheBackend', 'OPTIONS': {'alias': 'default'}},
+    )
+    def test_shared_backend(self):
+        self.totals()
+        self.totals()
+        self.assertIsInstance(get_totals_cache(), DjangoCacheBackend)
+        self.assertEqual(metrics_registry.counter('timetracker_totals_cache_hits_total'), 1)
+
+
+@override_settings(CLOCK_TERMINAL_TOKENS=['terminal-secret'])
+class ClockEventIngestionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+
+    def upload(self, events, token='terminal-secret'):
+        return self.client.post('/api/clock/events/', json.dumps({'events': events}),
+                                content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def event(self, action, day, hour, minute=0, **extra):
+        return {'user_id': self.user.id, 'action': action,
+                'timestamp': make_time(day, hour, minute).isoformat(), **extra}
+
+    def test_rejects_unknown_terminal(self):
+        self.assertEqual(self.upload([], token='wrong').status_code, 401)
+
+    def test_events_are_validated_in_timestamp_order(self):
+        # Uploaded out of order; the replay sorts them per user
+        events = [
+            self.event('OUT', 0, 17, event_id='c'),
+            self.event('IN', 0, 9, event_id='a'),
+            self.event('BREAK_START', 0, 12),
+            self.event('BREAK_END', 0, 12, 30),
+            self.event('BREAK_END', 0, 13),  # Not on break any more
+            {'user_id': self.user.id, 'action': 'NAP', 'timestamp': make_time(0, 14).isoformat()},
+            {'user_id': 999999, 'action': 'IN', 'timestamp': make_time(0, 9).isoformat()},
+        ]
+        body = self.upload(events).json()
+
+        self.assertEqual([r['status'] for r in body['results']],
+                         ['accepted', 'accepted', 'accepted', 'accepted', 'rejected', 'rejected', 'rejected'])
+        self.assertEqual(body['results'][0]['event_id'], 'c')
+        self.assertEqual((body['accepted'], body['rejected']), (4, 3))
+
+        totals = calculate_time_period(self.user, make_time(0, 0).date(), make_time(0, 0).date())
+        self.assertEqual(get_period_totals(self.user, make_time(0, 0).date(), make_time(0, 0).date()),
+                         {'work_duration': totals['work_duration'], 'break_duration': totals['break_duration']})
+        status = UserStatus.objects.get(user=self.user)
+        self.assertEqual((status.state, status.data_version), ('OUT', 1))
+
+    def test_reupload_reports_duplicates_and_rejects_older_punches(self):
+        events = [self.event('IN', 0, 9), self.event('OUT', 0, 17)]
+        self.upload(events)
+        body = self.upload(events + [self.event('IN', 0, 8)]).json()
+
+        self.assertEqual([r['status'] for r in body['results']], ['duplicate', 'duplicate', 'rejected'])
+        self.assertEqual(TimeEntry.objects.filter(user=self.user).count(), 2)
+
+    def test_continues_from_current_status(self):
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 9), action_type='IN')
+        body = self.upload([self.event('IN', 0, 10), self.event('OUT', 0, 17)]).json()
+        self.assertEqual([r['status'] for r in body['results']], ['rejected', 'accepted'])
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+        self.factory = AsyncRequestFactory()
+
+    def request(self, method, path, data=None):
+        request = getattr(self.factory, method)(path, data or {})
+        user = self.user
+
+        async def auser():
+            return user
+        request.auser = auser
+        return request
+
+    async def test_async_clock_action_and_dashboard(self):
+        response = await async_clock_action(self.request('post', '/clock/', {'action': 'IN'}))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(await aget_user_status(self.user), 'IN')
+
+        response = await async_dashboard(self.request('get', '/'))
+        self.assertContains(response, 'Clocked In')
+        self.assertEqual(await TimeEntry.objects.filter(user=self.user).acount(), 1)
+
+    def test_impossible_transition_is_turned_away(self):
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(async_clock_action)(self.request('post', '/clock/', {'action': 'OUT'}))
+        self.assertEqual(len(queries), 1)  # Only the status read
+        self.assertFalse(TimeEntry.objects.filter(user=self.user).exists())
+
+
+class BulkReviewTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('manager', password='pass12345', is_staff=True)
+        self.client.force_login(self.staff)
+        self.workers = [User.objects.create_user(f'worker{n}', password='pass12345') for n in range(3)]
+
+    def make_requests(self, count):
+        """One IN/OUT day per worker per call, with a request moving each OUT an hour later."""
+        edits = []
+        for n in range(count):
+            worker = self.workers[n % len(self.workers)]
+            day = n // len(self.workers)
+            TimeEntry.objects.create(user=worker, timestamp=make_time(day, 9), action_type='IN')
+            out = TimeEntry.objects.create(user=worker, timestamp=make_time(day, 17), action_type='OUT')
+            edits.append(TimeEditRequest.objects.create(original_entry=out, requested_timestamp=make_time(day, 18),
+                                                        request_reason='Stayed late'))
+        return edits
+
+    def post(self, **data):
+        return self.client.post('/manage/requests/bulk/', data)
+
+    def test_accept_selected_updates_entries_and_derived_data(self):
+        edits = self.make_requests(6)
+        self.post(action='accept', request_ids=[edit.id for edit in edits])
+
+        self.assertFalse(TimeEditRequest.objects.filter(status='PENDING').exists())
+        self.assertEqual(set(TimeEditRequest.objects.values_list('admin_reviewer', flat=True)), {self.staff.id})
+        for worker in self.workers:
+            start, end = make_time(0, 0).date(), make_time(1, 0).date()
+            self.assertEqual(get_period_totals(worker, start, end)['work_duration'], 18.0)
+            self.assertEqual(calculate_time_period(worker, start, end)['work_duration'], 18.0)
+
+    def test_conflicting_and_processed_requests_are_reported(self):
+        edit, processed = self.make_requests(2)
+        rival = TimeEditRequest.objects.create(original_entry=edit.original_entry,
+                                               requested_timestamp=make_time(0, 16), request_reason='Left early')
+        processed.status = 'REJECTED'
+        processed.save()
+
+        response = self.post(action='accept', request_ids=[edit.id, rival.id, processed.id])
+        notes = [str(message) for message in response.wsgi_request._messages]
+
+        self.assertIn(f"Entry {edit.original_entry_id} has several selected requests ({edit.id}, {rival.id}); "
+                      "choose one and try again.", notes)
+        self.assertIn("1 request(s) were already processed.", notes)
+        self.assertEqual(TimeEditRequest.objects.filter(status='PENDING').count(), 2)
+        self.assertEqual(TimeEntry.objects.get(id=edit.original_entry_id).timestamp, make_time(0, 17))
+
+    def test_reject_all_matching_filter(self):
+        self.make_requests(6)
+        self.post(action='reject', scope='matching', username='worker0')
+
+        self.assertEqual(TimeEditRequest.objects.filter(status='REJECTED').count(), 2)
+        self.assertEqual(TimeEditRequest.objects.filter(status='PENDING').count(), 4)
+
+    def test_query_count_does_not_grow_per_request(self):
+        small = [edit.id for edit in self.make_requests(3)]
+        with CaptureQueriesContext(connection) as first:
+            self.post(action='reject', request_ids=small)
+        large = [edit.id for edit in self.make_requests(30)]
+        with CaptureQueriesContext(connection) as second:
+            self.post(action='reject', request_ids=large)
+        self.assertEqual(len(first), len(second))
+
+
+class ShiftTableTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+
+    def punch(self, action, day, hour, minute=0):
+        return TimeEntry.objects.create(user=self.user, timestamp=make_time(day, hour, minute), action_type=action)
+
+    def shifts(self):
+        return list(Shift.objects.filter(user=self.user).order_by('started_at').values_list(
+            'started_at', 'ended_at', 'end_action', 'break_duration'))
+
+    def test_shifts_and_breaks_follow_punches(self):
+        self.punch('IN', 0, 9)
+        self.punch('BREAK_START', 0, 12)
+        self.punch('BREAK_END', 0, 12, 30)
+        self.punch('OUT', 0, 17)
+        self.punch('IN', 1, 22)  # Night shift, forgotten clock out
+        self.punch('IN', 2, 22)
+
+        self.assertEqual(self.shifts(), [
+            (make_time(0, 9), make_time(0, 17), 'OUT', timedelta(minutes=30)),
+            (make_time(1, 22), make_time(2, 22), 'IN', timedelta()),
+            (make_time(2, 22), None, '', timedelta()),
+        ])
+        self.assertEqual(BreakInterval.objects.get().duration, timedelta(minutes=30))
+        self.assertEqual(list(Shift.active_at(make_time(2, 10)).values_list('started_at', flat=True)),
+                         [make_time(1, 22)])
+        self.assertEqual(Shift.objects.filter(duration__gt=timedelta(hours=12)).count(), 1)
+
+    def test_incremental_maintenance_matches_full_rebuild(self):
+        rng = random.Random(7)
+        entries = [self.punch(rng.choice(['IN', 'OUT', 'BREAK_START', 'BREAK_END']), n // 6, 6 + n % 6 * 2)
+                   for n in range(60)]
+        for _ in range(25):
+            entry = rng.choice(entries)
+            if rng.random() < 0.3:
+                entries.remove(entry)
+                entry.delete()
+            else:
+                entry.timestamp = make_time(rng.randint(0, 10), rng.randint(0, 23), rng.randint(0, 59))
+                entry.save()
+
+            incremental = self.shifts()
+            Shift.rebuild_from(self.user.id)
+            self.assertEqual(incremental, self.shifts())
+
+    def test_rebuild_command(self):
+        self.punch('IN', 0, 9)
+        self.punch('OUT', 0, 17)
+        Shift.objects.all().delete()
+        call_command('rebuild_derived', stdout=io.StringIO())
+        self.assertEqual(self.shifts(), [(make_time(0, 9), make_time(0, 17), 'OUT', timedelta())])
+
+
+@override_settings(DERIVED_REFRESH_MODE='deferred')
+class DeferredRefreshTests(TestCase):
+    def setUp(self):
+        reset_totals_cache()
+        self.user = User.objects.create_user('worker', password='pass12345')
+        self.day = make_time(0, 0).date()
+
+    def test_writes_only_mark_the_touched_days(self):
+        entry = TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 9), action_type='IN')
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 17), action_type='OUT')
+        self.assertFalse(DailySummary.objects.exists())
+
+        # An edit moving the entry across midnight marks both days
+        entry.timestamp = make_time(1, 9)
+        entry.save()
+        self.assertEqual(set(DirtyUserDay.objects.values_list('day', flat=True)),
+                         {self.day, make_time(1, 0).date()})
+        self.assertEqual(UserStatus.objects.get(user=self.user).state, 'IN')  # Status is never deferred
+
+    def test_readers_refresh_stale_days_on_demand(self):
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 9), action_type='IN')
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 17), action_type='OUT')
+
+        self.assertEqual(get_cached_period_totals(self.user, self.day, self.day)['work_duration'], 8.0)
+        self.assertFalse(DirtyUserDay.objects.exists())
+        self.assertEqual(Shift.objects.get(user=self.user).duration, timedelta(hours=8))
+
+    def test_worker_refreshes_only_dirty_days(self):
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 9), action_type='IN')
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 17), action_type='OUT')
+        call_command('refresh_dirty_days', stdout=io.StringIO())
+        self.assertFalse(DirtyUserDay.objects.exists())
+
+        # Later corrections replay only their own day: a marker on the old day survives
+        DailySummary.objects.filter(user=self.user, day=self.day).update(shift_count=99)
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(3, 9), action_type='IN')
+        self.assertEqual(DirtyUserDay.refresh(), 1)
+        self.assertEqual(DailySummary.objects.get(user=self.user, day=self.day).shift_count, 99)
+        self.assertTrue(DailySummary.objects.get(user=self.user, day=make_time(3, 0).date()).has_open_shift)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+        self.staff = User.objects.create_user('boss', password='pass12345', is_staff=True)
+        for hour, action_type in ((9, 'IN'), (17, 'OUT')):
+            TimeEntry.objects.create(user=self.user, timestamp=make_time(0, hour), action_type=action_type)
+        self.day = make_time(0, 0).date().isoformat()
+
+    def test_export_job_round_trip(self):
+        self.client.force_login(self.user)
+        response = self.client.post(f'/reports/jobs/?date_from={self.day}&date_to={self.day}&user_id={self.staff.id}',
+                                    {'kind': 'timesheet_export'})
+        job = Job.objects.get()
+        self.assertRedirects(response, f'/jobs/{job.id}/')
+        self.assertEqual(job.params['user_ids'], [self.user.id])  # Non-staff only export themselves
+        self.assertEqual(self.client.get(f'/jobs/{job.id}/status/').json()['status'], 'QUEUED')
+
+        call_command('run_jobs', processes=0, stdout=io.StringIO())
+        status = self.client.get(f'/jobs/{job.id}/status/').json()
+        self.assertEqual((status['status'], status['progress']), ('DONE', 100))
+
+        download = self.client.get(status['download_url'])
+        rows = list(csv.reader(io.StringIO(download.content.decode())))
+        self.assertEqual([row[4] for row in rows[1:]], ['IN', 'OUT'])
+        self.assertIn('attachment', download['Content-Disposition'])
+
+    def test_jobs_are_private_and_payroll_is_staff_only(self):
+        job = submit_job(self.staff, 'payroll_report', {'date_from': self.day, 'date_to': self.day})
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(f'/jobs/{job.id}/status/').status_code, 404)
+        self.assertEqual(self.client.post('/reports/jobs/', {'kind': 'payroll_report'}).status_code, 403)
+
+        run_job(Job.claim_next('worker-1'), 'worker-1')
+        self.client.force_login(self.staff)
+        rows = list(csv.reader(io.StringIO(self.client.get(f'/jobs/{job.id}/download/').content.decode())))
+        self.assertEqual(rows[1], [str(self.user.id), 'worker', '8.0', '0.0'])
+
+    def test_claims_are_exclusive_and_failures_are_recorded(self):
+        job = submit_job(self.user, 'timesheet_export', {'date_from': 'not a date', 'date_to': self.day})
+        self.assertEqual(Job.claim_next('a'), job.id)
+        self.assertIsNone(Job.claim_next('b'))
+
+        self.assertEqual(run_job(job.id, 'a'), (job.id, 'FAILED'))
+        job.refresh_from_db()
+        self.assertIn('ValueError', job.error)
+
+    def test_lost_jobs_are_requeued_until_attempts_run_out(self):
+        job = submit_job(self.user, 'timesheet_export', {'date_from': self.day, 'date_to': self.day})
+        Job.claim_next('crashed-worker')
+        Job.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(Job.requeue_stale(timedelta(minutes=10), max_attempts=3), 1)
+        self.assertEqual(Job.claim_next('next-worker'), job.id)
+        Job.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1), attempts=3)
+        Job.requeue_stale(timedelta(minutes=10), max_attempts=3)
+        self.assertEqual(Job.objects.get().status, 'FAILED')
+
+    def test_progress_keeps_a_long_job_alive(self):
+        job = submit_job(self.user, 'timesheet_export', {'date_from': self.day, 'date_to': self.day})
+        Job.claim_next('slow-worker')
+        Job.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        progress = ProgressReporter(job.id, 'slow-worker')
+        progress.beat_at -= JOB_HEARTBEAT_EVERY.total_seconds()
+
+        progress(0, 10)  # Same percentage, but the heartbeat is due
+        self.assertEqual(Job.requeue_stale(timedelta(minutes=10), max_attempts=3), 0)
+
+    def test_a_requeued_job_is_not_finished_by_its_old_worker(self):
+        job = submit_job(self.user, 'timesheet_export', {'date_from': self.day, 'date_to': self.day})
+        Job.claim_next('old-worker')
+        Job.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        Job.requeue_stale(timedelta(minutes=10), max_attempts=3)
+        Job.claim_next('new-worker')
+
+        self.assertEqual(run_job(job.id, 'old-worker'), (job.id, 'LOST'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.result), ('RUNNING', 'new-worker', None))
+        self.assertEqual(run_job(job.id, 'new-worker'), (job.id, 'DONE'))
+
+
+class AttendanceBoardTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('boss', password='pass12345', is_staff=True)
+        self.user = User.objects.create_user('worker', password='pass12345')
+        self.client.force_login(self.staff)
+
+    def test_board_shows_every_user_in_constant_queries(self):
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 9), action_type='IN')
+        response = self.client.get('/manage/attendance/')
+        self.assertContains(response, 'Clocked In', count=1)
+        self.assertContains(response, f'data-since="{int(make_time(0, 9).timestamp() * 1000)}"')
+        self.assertEqual((response.context['on_shift'], response.context['clocked_out']), (1, 1))
+
+        with CaptureQueriesContext(connection) as before:
+            self.client.get('/manage/attendance/')
+        generate_workload(users=5, months=1, username_prefix='board')
+        with CaptureQueriesContext(connection) as after:
+            self.client.get('/manage/attendance/')
+        self.assertEqual(len(before), len(after))
+
+    def test_names_are_escaped(self):
+        User.objects.filter(pk=self.user.pk).update(first_name='<b>Ann</b>')
+        response = self.client.get('/manage/attendance/')
+        self.assertContains(response, '&lt;b&gt;Ann&lt;/b&gt;')
+        self.assertNotContains(response, '<b>Ann</b>')
+
+    def test_unchanged_board_is_not_modified(self):
+        with CaptureQueriesContext(connection) as queries:
+            etag = self.client.get('/manage/attendance/')['ETag']
+        self.assertEqual(len([query for query in queries if 'SUM(' in query['sql']]), 1)
+        self.assertEqual(self.client.get('/manage/attendance/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 9), action_type='IN')
+        self.assertEqual(self.client.get('/manage/attendance/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_new_csrf_secret_gets_a_fresh_board(self):
+        etag = self.client.get('/manage/attendance/')['ETag']
+        self.assertEqual(self.client.get('/manage/attendance/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # As after logging in again: the cached board's logout form would carry a stale token
+        self.client.cookies['csrftoken'] = 'b' * 32
+        self.assertEqual(self.client.get('/manage/attendance/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_staff_only(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/manage/attendance/').status_code, 403)
+
+
+@override_settings(ARCHIVE_AFTER_DAYS=30)
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+        for day, hour, minute, action_type in [
+            (0, 9, 0, 'IN'), (0, 12, 0, 'BREAK_START'), (0, 12, 30, 'BREAK_END'), (0, 17, 0, 'OUT'),
+            (1, 9, 0, 'IN'), (1, 17, 0, 'OUT'),
+            # Night shifts: days 2 and 3 end with a shift open, so they stay hot
+            (2, 22, 0, 'IN'), (3, 6, 0, 'OUT'), (3, 22, 0, 'IN'), (4, 6, 0, 'OUT'),
+        ]:
+            TimeEntry.objects.create(user=self.user, timestamp=make_time(day, hour, minute), action_type=action_type)
+        requested = TimeEntry.objects.get(timestamp=make_time(1, 17))
+        TimeEditRequest.objects.create(original_entry=requested, requested_timestamp=make_time(1, 18),
+                                       request_reason="Stayed late")
+        self.start, self.end = make_time(0, 0).date(), make_time(4, 0).date()
+
+    def snapshot(self):
+        return {
+            'export': list(iter_export_rows(self.start, self.end)),
+            'payroll': calculate_payroll(self.start, self.end),
+            'period': {key: value for key, value in calculate_time_period(self.user, self.start, self.end).items()
+                       if key != 'raw_entries'},
+            'summaries': list(DailySummary.objects.order_by('day').values_list('day', 'work_seconds', 'break_seconds')),
+            'shifts': list(Shift.objects.order_by('started_at').values_list('started_at', 'ended_at', 'break_duration')),
+        }
+
+    def test_archiving_moves_closed_days_and_reads_them_back(self):
+        before = self.snapshot()
+        self.assertEqual(archive_closed_days(make_time(4, 0).date()), (1, 2, 5))
+
+        self.assertEqual(dict(ArchivedDay.objects.values_list('day', 'entry_count')),
+                         {self.start: 4, make_time(1, 0).date(): 1})
+        # The entry with an edit request and the open-shift days stay in the hot table
+        self.assertEqual(TimeEntry.objects.count(), 5)
+        self.assertTrue(TimeEditRequest.objects.exists())
+
+        self.assertEqual(self.snapshot(), before)
+        call_command('rebuild_derived', stdout=io.StringIO())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_back_dated_entries_merge_with_the_archive(self):
+        archive_closed_days(make_time(4, 0).date())
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 18), action_type='IN')
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 19), action_type='OUT')
+        # 1.5h from the archived punches (breaks subtract the work before them) plus the new hour
+        self.assertEqual(DailySummary.objects.get(day=self.start).work_seconds, 2.5 * 3600)
+
+        archive_closed_days(make_time(4, 0).date())
+        self.assertEqual(ArchivedDay.objects.get(day=self.start).entry_count, 6)
+        self.assertEqual(DailySummary.objects.get(day=self.start).work_seconds, 2.5 * 3600)
+
+    def test_reports_show_archived_ranges(self):
+        archive_closed_days(make_time(4, 0).date())
+        self.client.force_login(self.user)
+        response = self.client.get(f'/reports/?date_from={self.start}&date_to={self.start}')
+        self.assertContains(response, '4 archived entries')
+        self.assertEqual(response.context['total_work_time'], 1.5)
+
+    def test_command_refuses_recent_days(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_entries', '--before', timezone.localdate().isoformat(), stdout=io.StringIO())
+        # At the real cutoff the night shift is closed by day 4's clock out, so days 0-4 all go
+        call_command('archive_entries', stdout=io.StringIO())
+        self.assertEqual(ArchivedDay.objects.count(), 5)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        reset_totals_cache()
+        self.user = User.objects.create_user('worker', password='pass12345')
+        self.client.force_login(self.user)
+
+    def revalidate(self, url, etag):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, len(queries)
+
+    def test_unchanged_dashboard_is_not_rebuilt(self):
+        first = self.client.get('/')
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+        self.assertIn('Cookie', first['Vary'])
+
+        response, queries = self.revalidate('/', first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, 3)  # Session, user and status row: no totals, no entries
+
+        # The cached page's form still works, and the punch changes the page
+        self.client.post('/clock/', {'action': 'IN', 'idempotency_key': first.context['idempotency_key']})
+        self.assertEqual(self.revalidate('/', first['ETag'])[0].status_code, 200)
+        self.assertNotEqual(self.client.get('/').context['idempotency_key'], first.context['idempotency_key'])
+
+    def test_flash_messages_are_never_hidden_by_a_304(self):
+        entry = TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 9), action_type='IN')
+        etag = self.client.get('/')['ETag']
+
+        # Submitting an edit request changes no punch, but its confirmation must show
+        self.client.post('/request/edit/', {'original_entry': entry.id, 'requested_timestamp': '2025-01-06 08:30',
+                                            'request_reason': 'Forgot'})
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'submitted successfully')
+        self.assertNotIn('ETag', response)
+        self.assertEqual(self.revalidate('/', etag)[0].status_code, 304)
+
+    def test_reports_revalidate_per_range_and_data(self):
+        url = '/reports/?date_from=2025-01-06&date_to=2025-01-10'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidate(url, etag)[0].status_code, 304)
+        self.assertEqual(self.revalidate(url.replace('10', '11'), etag)[0].status_code, 200)
+
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 9), action_type='IN')
+        self.assertEqual(self.revalidate(url, etag)[0].status_code, 200)
+
+    def test_async_dashboard_revalidates(self):
+        factory = AsyncRequestFactory()
+        user = self.user
+
+        async def auser():
+            return user
+
+        def request(headers=None):
+            request = factory.get('/', headers=headers)
+            request.auser = auser
+            # As CsrfViewMiddleware would from the browser's csrftoken cookie
+            request.META['CSRF_COOKIE'] = 'a' * 32
+            return request
+
+        etag = async_to_sync(async_dashboard)(request())['ETag']
+        self.assertEqual(async_to_sync(async_dashboard)(request({'If-None-Match': etag})).status_code, 304)
+
+
+class LookupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+        self.other = User.objects.create_user('other', password='pass12345')
+        self.staff = User.objects.create_user('boss', password='pass12345', is_staff=True)
+        for day in range(30):
+            TimeEntry.objects.create(user=self.user, timestamp=make_time(day, 9), action_type='IN')
+            TimeEntry.objects.create(user=self.other, timestamp=make_time(day, 9), action_type='IN')
+        self.client.force_login(self.user)
+
+    def test_edit_request_form_renders_no_entry_options(self):
+        response = self.client.get('/request/edit/')
+        self.assertContains(response, 'data-lookup-url="/lookup/entries/"')
+        self.assertContains(response, '<option', count=1)
+
+        # An invalid POST re-renders only the picked entry, and other users' entries don't validate
+        mine = TimeEntry.objects.filter(user=self.user).first()
+        response = self.client.post('/request/edit/', {'original_entry': mine.id})
+        self.assertContains(response, '<option', count=1)
+        self.assertContains(response, f'value="{mine.id}" selected')
+        theirs = TimeEntry.objects.filter(user=self.other).first()
+        response = self.client.post('/request/edit/', {'original_entry': theirs.id, 'request_reason': 'x',
+                                                       'requested_timestamp': '2025-01-06 08:30'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(TimeEditRequest.objects.exists())
+
+    def test_entry_lookup_is_bounded_and_filtered_by_date_prefix(self):
+        data = self.client.get('/lookup/entries/').json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(data['more'])
+        self.assertEqual(data['results'][0]['text'], 'Tue 04 Feb 2025 09:00 - Clock In')
+
+        data = self.client.get('/lookup/entries/', {'q': '2025-01-10'}).json()
+        self.assertEqual([result['text'] for result in data['results']], ['Fri 10 Jan 2025 09:00 - Clock In'])
+        self.assertEqual(len(self.client.get('/lookup/entries/', {'q': '2025-02'}).json()['results']), 4)
+        self.assertEqual(self.client.get('/lookup/entries/', {'q': 'soon'}).json(), {'results': [], 'more': False})
+
+        mine = set(TimeEntry.objects.filter(user=self.user).values_list('id', flat=True))
+        found = {result['id'] for result in self.client.get('/lookup/entries/', {'q': '2025'}).json()['results']}
+        self.assertLessEqual(found, mine)
+
+    def test_user_lookup_is_staff_only_prefix_search(self):
+        self.assertEqual(self.client.get('/lookup/users/').status_code, 403)
+        self.client.force_login(self.staff)
+        data = self.client.get('/lookup/users/', {'q': 'wo'}).json()
+        self.assertEqual(data, {'results': [{'id': self.user.id, 'text': 'worker'}], 'more': False})
+        self.assertEqual(self.client.get('/lookup/users/', {'q': 'b'}).json()['results'][0]['text'], 'boss (STAFF)')
+
+    def test_user_pickers_stay_the_same_size_as_users_grow(self):
+        self.client.force_login(self.staff)
+        urls = [f'/reports/?user_id={self.user.id}&date_from=2025-01-06&date_to=2025-01-10',
+                f'/manageusers?user_id={self.user.id}']
+        before = [len(self.client.get(url).content) for url in urls]
+        User.objects.bulk_create([User(username=f'extra_{n}') for n in range(50)])
+        self.assertEqual([len(self.client.get(url).content) for url in urls], before)
+
+
+class PendingRequestCounterTests(TestCase):
+    def setUp(self):
+        Counter._local.clear()
+        self.staff = User.objects.create_user('boss', password='pass12345', is_staff=True)
+        self.user = User.objects.create_user('worker', password='pass12345')
+        self.entries = [TimeEntry.objects.create(user=self.user, timestamp=make_time(day, 9), action_type='IN')
+                        for day in range(4)]
+
+    def request_for(self, entry):
+        return TimeEditRequest.objects.create(original_entry=entry, requested_timestamp=entry.timestamp,
+                                              request_reason='Forgot')
+
+    def assertCounted(self):
+        stored = Counter.objects.get(name='pending_requests').value
+        self.assertEqual(stored, TimeEditRequest.objects.filter(status='PENDING').count())
+        return stored
+
+    def test_counter_follows_every_kind_of_write(self):
+        requests = [self.request_for(entry) for entry in self.entries]
+        self.assertEqual(self.assertCounted(), 4)
+
+        requests[0].status = 'REJECTED'
+        requests[0].save()
+        requests[0].save()
+        self.assertEqual(self.assertCounted(), 3)
+
+        review_edit_requests(self.staff, 'reject', TimeEditRequest.objects.filter(id=requests[1].id))
+        self.assertEqual(self.assertCounted(), 2)
+
+        self.entries[2].delete()  # Cascades to its request
+        self.assertEqual(self.assertCounted(), 1)
+        self.user.delete()
+        self.assertEqual(self.assertCounted(), 0)
+
+    def test_missing_row_is_recounted(self):
+        self.request_for(self.entries[0])
+        Counter.objects.all().delete()
+        self.request_for(self.entries[1])
+        self.assertEqual(self.assertCounted(), 2)
+
+    def test_staff_pages_read_the_counter_once(self):
+        self.request_for(self.entries[0])
+        self.client.force_login(self.staff)
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                response = self.client.get('/')
+        self.assertContains(response, '<span class="badge bg-danger">1</span>', html=True)
+        self.assertContains(response, 'You have <strong>1</strong>')
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(sum('time_tracker_counter' in query for query in sql), 1)
+        self.assertFalse(any('time_tracker_timeeditrequest' in query for query in sql))
+
+        self.client.force_login(self.user)
+        self.assertNotContains(self.client.get('/'), 'badge bg-danger')
+
+
+class AuthHotPathTests(TestCase):
+    CACHED = {'SESSION_ENGINE': 'django.contrib.sessions.backends.signed_cookies', 'USER_CACHE_SECONDS': 60}
+
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='pass12345')
+
+    def clock_queries(self, user):
+        client = self.client_class(HTTP_HOST='127.0.0.1')
+        client.force_login(user)
+        client.get('/')  # Fills the user cache, if on
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.post('/clock/', {'action': 'IN'}).status_code, 302)
+            self.assertEqual(client.post('/clock/', {'action': 'OUT'}).status_code, 302)
+        self.assertEqual(UserStatus.objects.get(user=user).state, 'OUT')
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_cached_mode_skips_session_and_user_queries(self):
+        uncached = self.clock_queries(self.user)
+        with self.settings(**self.CACHED):
+            cached = self.clock_queries(User.objects.create_user('other', password='pass12345'))
+        self.assertEqual(len(uncached) - len(cached), 4)  # A session and a user query per request
+        self.assertFalse(any('django_session' in query or 'FROM "auth_user"' in query for query in cached))
+
+    def test_staff_toggle_reaches_the_cached_user(self):
+        staff = User.objects.create_user('boss', password='pass12345', is_staff=True)
+        with self.settings(**self.CACHED):
+            self.client.force_login(self.user)
+            self.assertEqual(self.client.get('/manage/attendance/').status_code, 403)
+
+            admin_client = self.client_class(HTTP_HOST='127.0.0.1')
+            admin_client.force_login(staff)
+            admin_client.post('/manageusers', {'target_user_id': self.user.id, 'role_action': 'toggle_staff'})
+            self.assertEqual(self.client.get('/manage/attendance/').status_code, 200)
+
+    def test_a_change_saved_by_another_process_invalidates_the_cached_user(self):
+        staff = User.objects.create_user('boss', password='pass12345', is_staff=True)
+        with self.settings(USER_CACHE_SECONDS=60):
+            reader, writer = CachedModelBackend(), CachedModelBackend()
+            self.assertTrue(reader.get_user(staff.pk).is_staff)
+            self.assertTrue(writer.get_user(staff.pk).is_staff)
+
+            # Another worker's save: its local cache is not ours, only the shared stamp is
+            User.objects.filter(pk=staff.pk).update(is_staff=False, is_active=False)
+            self.assertTrue(reader.get_user(staff.pk).is_staff)
+            restamp_user(staff.pk)
+            self.assertIsNone(reader.get_user(staff.pk))  # Inactive users are refused
+            self.assertFalse(async_to_sync(writer.aget_user)(staff.pk))
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Routing against a second SQLite alias on the same test database, as a replica would be."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Added once the test database exists, so the alias points at it
+        if 'replica' not in connections.settings:
+            connections.settings['replica'] = {**connections.settings['default'], 'TEST': {'MIRROR': 'default'}}
+            cls.addClassCleanup(cls.remove_replica)
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def remove_replica(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    def setUp(self):
+        self.staff = User.objects.create_user('boss', password='pass12345', is_staff=True, is_superuser=True)
+        self.user = User.objects.create_user('worker', password='pass12345')
+        entry = TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 9), action_type='IN')
+        TimeEditRequest.objects.create(original_entry=entry, requested_timestamp=make_time(0, 8),
+                                       request_reason='Forgot')
+        self.client.force_login(self.staff)
+
+    def queries_by_alias(self, method, url, data=None):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(url, data or {})
+        self.assertIn(response.status_code, (200, 302))
+        return [query['sql'] for query in primary.captured_queries], [query['sql'] for query in replica.captured_queries]
+
+    def test_router(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(TimeEntry), 'default')
+        with reading_from_replica():
+            self.assertEqual(router.db_for_read(TimeEntry), 'replica')
+            self.assertEqual(router.db_for_write(TimeEntry), 'default')
+            self.assertEqual(TimeEntry.objects.all().db, 'replica')
+        self.assertFalse(router.allow_migrate('replica', 'time_tracker'))
+
+    def test_report_pages_read_from_the_replica(self):
+        for url in (f'/reports/?user_id={self.user.id}&date_from=2025-01-06&date_to=2025-01-10',
+                    '/manage/requests/', f'/manageusers?user_id={self.user.id}',
+                    '/admin/time_tracker/timeentry/'):
+            with self.subTest(url=url):
+                primary, replica = self.queries_by_alias('get', url)
+                # Only the session and user are loaded (by middleware) before the view runs
+                self.assertEqual(len(primary), 2)
+                self.assertTrue(any('time_tracker_timeentry' in query for query in replica))
+
+    def test_writes_and_posts_use_the_primary(self):
+        primary, replica = self.queries_by_alias(
+            'post', '/manageusers', {'target_user_id': self.user.id, 'role_action': 'toggle_staff'})
+        self.assertEqual(replica, [])
+        self.assertTrue(User.objects.get(id=self.user.id).is_staff)
+
+        primary, replica = self.queries_by_alias('get', '/')
+        self.assertEqual(replica, [])
+
+    @override_settings(DERIVED_REFRESH_MODE='deferred')
+    def test_deferred_refresh_reads_from_the_primary(self):
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(0, 17), action_type='OUT')
+        with CaptureQueriesContext(connections['replica']) as replica, reading_from_replica():
+            self.assertEqual(DirtyUserDay.refresh([self.user.id]), 1)
+        self.assertEqual(replica.captured_queries, [])
+        self.assertEqual(DailySummary.objects.get(user=self.user).work_seconds, 8 * 3600)
+
+        # Reached from a replica-read page, only the "anything dirty?" check uses the replica
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(1, 9), action_type='IN')
+        TimeEntry.objects.create(user=self.user, timestamp=make_time(1, 12), action_type='OUT')
+        primary, replica = self.queries_by_alias(
+            'get', f'/reports/?user_id={self.user.id}&date_from=2025-01-06&date_to=2025-01-10')
+        self.assertEqual(len([query for query in replica if 'time_tracker_dirtyuserday' in query]), 1)
+        self.assertFalse(DirtyUserDay.objects.exists())
+        self.assertEqual(DailySummary.objects.get(user=self.user, day=make_time(1, 0).date()).work_seconds, 3 * 3600)
@@ -1,16 +1,34 @@
 # time_tracker/urls.py
 
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# The ASGI profile serves the busiest views asynchronously
+if settings.ASYNC_CLOCK_VIEWS:
+    dashboard_view, clock_view = views.async_dashboard, views.async_clock_action
+else:
+    dashboard_view, clock_view = views.dashboard, views.clock_action
+
 urlpatterns = [
-    path('', views.dashboard, name='dashboard'),
-    path('clock/', views.clock_action, name='clock_action'),
+    path('', dashboard_view, name='dashboard'),
+    path('clock/', clock_view, name='clock_action'),
+    path('api/clock/events/', views.clock_events_api, name='clock_events_api'),
     path('reports/', views.reports_view, name='reports'),
+    path('reports/export/', views.export_timesheets, name='export_timesheets'),
+    path('reports/jobs/', views.submit_report_job, name='submit_report_job'),
+    path('jobs/<int:job_id>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
     path('register/', views.register_user, name='register'),
     path('manageusers', views.admin_user_management, name='admin_user_management'),
     path('delete/<int:entry_id>/', views.admin_delete_entry, name='admin_delete_entry'),
     path('request/edit/', views.request_time_edit, name='request_time_edit'),
+    path('lookup/entries/', views.lookup_entries, name='lookup_entries'),
+    path('lookup/users/', views.lookup_users, name='lookup_users'),
     path('manage/requests/', views.admin_review_requests, name='admin_review_requests'),
+    path('manage/requests/bulk/', views.admin_bulk_process_requests, name='admin_bulk_process_requests'),
     path('manage/requests/<int:request_id>/process/', views.admin_process_request, name='admin_process_request'),
+    path('manage/attendance/', views.attendance_board, name='attendance_board'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,60 +1,319 @@
 # time_tracker/utils.py
+import heapq
 from datetime import timedelta
-from time_tracker.models import TimeEntry
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, Q, Subquery, Sum
+from django.utils import timezone
+from time_tracker.archive import iter_archived_entries
+from time_tracker.cache import acached, cached
+from time_tracker.models import Counter, DailySummary, DirtyUserDay, TimeEditRequest, TimeEntry, UserStatus, deferred_refresh
+from time_tracker.sql_totals import sql_engine_applies, sql_period_totals
 
-def calculate_time_period(user, start_date, end_date):
+# The status a user must currently be in for each punch to be accepted
+CLOCK_TRANSITIONS = {
+    'IN': ['OUT'],
+    'OUT': ['IN', 'BREAK_START'],
+    'BREAK_START': ['IN'],
+    'BREAK_END': ['BREAK_START'],
+}
+
+def record_clock_action(user, action_type, idempotency_key=''):
     """
-    Calculates total work and break time for a given user within a date range,
-    returning durations as a float rounded to two decimal places (hours). Processing for payroll is easier this way.
+    Validates and records a clock punch atomically. The status row is claimed with a
+    conditional UPDATE (state must allow the transition), so of several concurrent
+    requests only one can win. Returns the new TimeEntry, or None if rejected.
+    A repeated idempotency_key is answered from the status row without writing.
     """
-    entries = TimeEntry.objects.filter(
-        user=user, 
-        date_only__range=(start_date, end_date)
-    ).order_by('timestamp')
+    allowed_from = CLOCK_TRANSITIONS.get(action_type)
+    if allowed_from is None:
+        return None
 
-    total_work_time = timedelta()
-    total_break_time = timedelta()
-    
-    clock_in_time = None
-    break_start_time = None
+    status, _ = UserStatus.objects.get_or_create(user=user)
+    if idempotency_key and status.idempotency_key == idempotency_key:
+        return None  # Retry of a request that already succeeded
+
+    now = timezone.now()
+    with transaction.atomic():
+        claim = UserStatus.objects.filter(user=user, state__in=allowed_from).filter(
+            # Never let a slower request record a punch earlier than the last one
+            Q(last_timestamp__isnull=True) | Q(last_timestamp__lte=now)
+        )
+        if idempotency_key:
+            claim = claim.exclude(idempotency_key=idempotency_key)
+
+        fields = UserStatus.transition_fields(action_type, now)
+        if not claim.update(idempotency_key=idempotency_key, **fields):
+            return None
+
+        entry = TimeEntry(user=user, timestamp=now, action_type=action_type)
+        entry.save(sync_status=False)
+    return entry
+
+def review_edit_requests(reviewer, action, edit_requests):
+    """
+    Accepts or rejects many pending TimeEditRequests in one transaction with
+    set-based writes: one locking read, one bulk_update of the entries, one
+    UPDATE of the requests, then a single refresh of the derived tables.
+
+    Two selected requests for the same entry are a conflict (it's unclear which
+    time wins): both are left pending and reported. Requests that are no longer
+    pending (processed by someone else meanwhile) are skipped.
+
+    Returns {'processed': [ids], 'conflicts': {entry_id: [ids]}, 'skipped': [ids]}.
+    """
+    now = timezone.now()
+    requested_ids = set(edit_requests.values_list('id', flat=True))
+
+    with transaction.atomic():
+        rows = list(TimeEditRequest.objects.select_for_update().filter(
+            id__in=requested_ids, status='PENDING'
+        ).values_list('id', 'original_entry_id', 'requested_timestamp',
+                      'original_entry__user_id', 'original_entry__date_only'))
+        skipped = sorted(requested_ids - {row[0] for row in rows})
+
+        by_entry = {}
+        for row in rows:
+            by_entry.setdefault(row[1], []).append(row)
+
+        conflicts = {}
+        if action == 'accept':
+            conflicts = {entry_id: sorted(row[0] for row in group)
+                         for entry_id, group in by_entry.items() if len(group) > 1}
+            rows = [row for row in rows if row[1] not in conflicts]
+
+            entries, user_days = [], {}
+            for _, entry_id, timestamp, user_id, old_day in rows:
+                entries.append(TimeEntry(id=entry_id, timestamp=timestamp, date_only=timestamp.date()))
+                user_days.setdefault(user_id, set()).update({old_day, timestamp.date()})
+            TimeEntry.objects.bulk_update(entries, ['timestamp', 'date_only'], batch_size=500)
+            TimeEntry.refresh_derived(user_days)
+
+        processed = sorted(row[0] for row in rows)
+        TimeEditRequest.objects.filter(id__in=processed).update(
+            status='ACCEPTED' if action == 'accept' else 'REJECTED',
+            admin_reviewer=reviewer,
+            reviewed_at=now,
+        )
+        Counter.add('pending_requests', -len(processed))
+
+    return {'processed': processed, 'conflicts': conflicts, 'skipped': skipped}
+
+def replay_steps(entries, state=None):
+    """
+    Replays time entries (already in timestamp order) through the clocking state
+    machine, yielding (entry, work_delta, break_delta, is_open) for each one:
+    how much work/break time that punch adds (as timedeltas) and whether a shift
+    or break is open after it. `state` ({'clock_in_time', 'break_start_time'})
+    seeds a shift or break opened before the first entry, and is kept up to date.
+    """
+    state = {} if state is None else state
+    clock_in_time = state.get('clock_in_time')
+    break_start_time = state.get('break_start_time')
     
     # 1. Iterate and pair entries
     for entry in entries:
+        work_delta = timedelta()
+        break_delta = timedelta()
+
         # State transitions based on the entry action_type
         
         if entry.action_type == 'IN':
             clock_in_time = entry.timestamp
             
         elif entry.action_type == 'OUT' and clock_in_time:
-            total_work_time += (entry.timestamp - clock_in_time)
+            work_delta = entry.timestamp - clock_in_time
             clock_in_time = None # Shift ended
 
         elif entry.action_type == 'BREAK_START' and clock_in_time:
             # When break starts, subtract the time worked SO FAR from the total_work_time, 
             # and pause the clock_in_time.
-            total_work_time -= (entry.timestamp - clock_in_time)
+            work_delta = -(entry.timestamp - clock_in_time)
             break_start_time = entry.timestamp
             
         elif entry.action_type == 'BREAK_END' and break_start_time:
             # When break ends, calculate break duration and add it to total_break_time.
-            total_break_time += (entry.timestamp - break_start_time)
+            break_delta = entry.timestamp - break_start_time
             break_start_time = None # Break ended
             # IMPORTANT: Re-start the clock_in_time at the end of the break to measure subsequent work
             clock_in_time = entry.timestamp 
-            
-    # --- CONVERSION TO DECIMAL HOURS ---
-    
-    # Convert timedelta to total seconds
-    work_seconds = total_work_time.total_seconds()
-    break_seconds = total_break_time.total_seconds()
 
-    # Convert to hours (dividing by 3600) and round to two decimal places
-    work_hours_decimal = round(work_seconds / 3600, 2)
-    break_hours_decimal = round(break_seconds / 3600, 2)
+        state['clock_in_time'], state['break_start_time'] = clock_in_time, break_start_time
+        yield entry, work_delta, break_delta, clock_in_time is not None or break_start_time is not None
+
+def replay_entries(entries, clock_in_time=None, break_start_time=None):
+    """
+    Sums replay_steps() over time entries (already in timestamp order) and returns
+    the work/break totals as timedeltas, the number of shifts started, whether
+    a shift or break is still open at the end and the open clock in / break start
+    times. clock_in_time and break_start_time seed a shift or break already open.
+    """
+    total_work_time = timedelta()
+    total_break_time = timedelta()
+    shift_count = 0
+    state = {'clock_in_time': clock_in_time, 'break_start_time': break_start_time}
+    is_open = clock_in_time is not None or break_start_time is not None
+
+    for entry, work_delta, break_delta, is_open in replay_steps(entries, state):
+        total_work_time += work_delta
+        total_break_time += break_delta
+        if entry.action_type == 'IN':
+            shift_count += 1
+
+    return {
+        'work_time': total_work_time,
+        'break_time': total_break_time,
+        'shift_count': shift_count,
+        'has_open_shift': is_open,
+        'clock_in_time': state['clock_in_time'],
+        'break_start_time': state['break_start_time'],
+    }
+
+def derive_shifts(entries):
+    """
+    Pairs punches (already in timestamp order) into shift intervals:
+    [{'started_at', 'ended_at', 'end_action', 'breaks': [[start, end], ...]}].
+    An IN opens a shift and the next OUT closes it. An IN while a shift is open
+    closes the old one ('IN' end action, e.g. a forgotten clock out). Breaks open
+    at BREAK_START and close at BREAK_END, or when their shift ends. Punches
+    that don't fit (OUT with no shift open, a second BREAK_START) are ignored.
+    """
+    shifts = []
+    current = None
+
+    def close(shift, timestamp, action):
+        shift['ended_at'], shift['end_action'] = timestamp, action
+        if shift['breaks'] and shift['breaks'][-1][1] is None:
+            shift['breaks'][-1][1] = timestamp
+
+    for entry in entries:
+        action, timestamp = entry.action_type, entry.timestamp
+        if action == 'IN':
+            if current:
+                close(current, timestamp, 'IN')
+            current = {'started_at': timestamp, 'ended_at': None, 'end_action': '', 'breaks': []}
+            shifts.append(current)
+        elif current is None:
+            continue
+        elif action == 'OUT':
+            close(current, timestamp, 'OUT')
+            current = None
+        elif action == 'BREAK_START' and not (current['breaks'] and current['breaks'][-1][1] is None):
+            current['breaks'].append([timestamp, None])
+        elif action == 'BREAK_END' and current['breaks'] and current['breaks'][-1][1] is None:
+            current['breaks'][-1][1] = timestamp
+
+    return shifts
+
+def to_hours(seconds):
+    """Converts seconds to hours as a float rounded to two decimal places."""
+    return round(seconds / 3600, 2)
+
+def calculate_time_period(user, start_date, end_date):
+    """
+    Calculates total work and break time for a given user within a date range,
+    returning durations as a float rounded to two decimal places (hours). Processing for payroll is easier this way.
+    """
+    entries = TimeEntry.objects.filter(
+        user=user, 
+        date_only__range=(start_date, end_date)
+    ).order_by('timestamp', 'id')
+
+    if sql_engine_applies(start_date, [user.pk]):
+        work_us, break_us = sql_period_totals(start_date, end_date, [user.pk]).get(user.pk, (0, 0))
+        work_seconds, break_seconds = work_us / 1_000_000, break_us / 1_000_000
+    else:
+        # Archived days are replayed too, but only live entries are returned
+        archived = iter_archived_entries(start_date, end_date, [user.pk])
+        totals = replay_entries(heapq.merge(entries, archived, key=lambda entry: (entry.timestamp, entry.id)))
+
+        # --- CONVERSION TO DECIMAL HOURS ---
+
+        # Convert timedelta to total seconds
+        work_seconds = totals['work_time'].total_seconds()
+        break_seconds = totals['break_time'].total_seconds()
 
     # 2. Return results
     return {
-        'work_duration': work_hours_decimal,
-        'break_duration': break_hours_decimal,
+        'work_duration': to_hours(work_seconds),
+        'break_duration': to_hours(break_seconds),
         'raw_entries': entries
-    }
\ No newline at end of file
+    }
+
+def summary_aggregates(user, start_date, end_date):
+    """
+    The DailySummary sums for get_period_totals. A replay of the range starts with
+    nothing open, so the first summarized day's carried-in time is left out. When
+    that day's carry persists into later days, carried_into() works out the rest.
+    """
+    first_day = Q(day=Subquery(DailySummary.objects.filter(
+        user=user, day__range=(start_date, end_date)).order_by('day').values('day')[:1]))
+    return {
+        'work': Sum('work_seconds'),
+        'breaks': Sum('break_seconds'),
+        'carried_work': Sum('carried_work_seconds', filter=first_day),
+        'carried_breaks': Sum('carried_break_seconds', filter=first_day),
+        'carry_persists': Count('id', filter=first_day & Q(carry_persists=True)),
+    }
+
+def summary_hours(totals):
+    return {
+        'work_duration': to_hours((totals['work'] or 0) - (totals['carried_work'] or 0)),
+        'break_duration': to_hours((totals['breaks'] or 0) - (totals['carried_breaks'] or 0)),
+    }
+
+def get_period_totals(user, start_date, end_date):
+    """
+    Returns work and break hours for a date range by summing the user's
+    DailySummary rows (at most one per day) instead of replaying raw entries.
+    A shift across midnight counts on the day it closes, except that time carried
+    in from before the range is dropped, so the result matches calculate_time_period.
+    In deferred refresh mode, stale days in the range are rebuilt first.
+    """
+    if deferred_refresh() and DirtyUserDay.objects.filter(user=user, day__range=(start_date, end_date)).exists():
+        DirtyUserDay.refresh([user.pk])
+
+    totals = DailySummary.objects.filter(
+        user=user,
+        day__range=(start_date, end_date)
+    ).aggregate(**summary_aggregates(user, start_date, end_date))
+    if totals['carry_persists']:
+        totals['carried_work'], totals['carried_breaks'] = DailySummary.carried_into(user.pk, start_date, end_date)
+
+    return summary_hours(totals)
+
+async def aget_period_totals(user, start_date, end_date):
+    """get_period_totals using the async ORM."""
+    if deferred_refresh() and await DirtyUserDay.objects.filter(user=user, day__range=(start_date, end_date)).aexists():
+        # The refresh needs a transaction, which the async ORM can't open
+        await sync_to_async(DirtyUserDay.refresh)([user.pk])
+
+    totals = await DailySummary.objects.filter(
+        user=user,
+        day__range=(start_date, end_date)
+    ).aaggregate(**summary_aggregates(user, start_date, end_date))
+    if totals['carry_persists']:
+        totals['carried_work'], totals['carried_breaks'] = await sync_to_async(DailySummary.carried_into)(
+            user.pk, start_date, end_date)
+
+    return summary_hours(totals)
+
+def get_cached_period_totals(user, start_date, end_date, version=None):
+    """
+    get_period_totals through the totals cache. The key carries the user's
+    data_version, which every entry write bumps, so a stale total is never served.
+    The version is read before the totals: if a write lands in between, the fresh
+    totals are stored under the old version, which nobody asks for again.
+    Pass version if the caller has already read the user's status row.
+    """
+    if version is None:
+        version = UserStatus.objects.filter(user=user).values_list('data_version', flat=True).first() or 0
+    key = f'period_totals:{user.pk}:{start_date}:{end_date}:{version}'
+    return cached(key, lambda: get_period_totals(user, start_date, end_date))
+
+async def aget_cached_period_totals(user, start_date, end_date, version=None):
+    """get_cached_period_totals for async views (same keys, so both share entries)."""
+    if version is None:
+        version = await UserStatus.objects.filter(user=user).values_list('data_version', flat=True).afirst() or 0
+    key = f'period_totals:{user.pk}:{start_date}:{end_date}:{version}'
+    return await acached(key, lambda: aget_period_totals(user, start_date, end_date))
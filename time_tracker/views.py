@@ -4,22 +4,45 @@ from django.shortcuts import render
 from django.shortcuts import render, redirect 
 from django.contrib.auth.decorators import login_required 
 from django.utils import timezone 
-from .models import TimeEntry, TimeEditRequest
+from .models import ArchivedDay, Counter, Job, TimeEntry, TimeEditRequest, UserStatus
 from datetime import date, timedelta
-from .utils import calculate_time_period
+from .utils import CLOCK_TRANSITIONS, aget_cached_period_totals, get_cached_period_totals, record_clock_action, review_edit_requests
 from django.contrib.auth import get_user_model
 from django.core.paginator import Paginator
+from .pagination import KeysetPaginator
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.views import LoginView
 from urllib.parse import urlencode
+from django.utils.http import quote_etag
+from django.utils.html import format_html_join
 from django.urls import reverse
 from datetime import datetime
-from .forms import AdminTimeEntryForm, UserEditRequestForm
+from .forms import AdminTimeEntryForm, UserEditRequestForm, entry_choice_label, user_choice_label
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_control
+from django.views.decorators.vary import vary_on_cookie
+from django.utils.cache import get_conditional_response
+from django.middleware.csrf import get_token
+from django.views.decorators.http import require_POST
+from django.db.models import Count, Max, Sum
+from django.conf import settings
+from .ingest import ingest_clock_events
+from .metrics import registry as metrics_registry
+from .exports import iter_csv, iter_export_rows, parquet_available, write_parquet
+from .jobs import submit_job
+from .archive import archive_horizon
+from .routers import replica_reads, statement_timeout
+from asgiref.sync import sync_to_async
+import hashlib
+import hmac
+import json
+import tempfile
 
 def custom_login(request):
     """If user is authenticated, redirect them to dashboard. Otherwise, display the login form."""
@@ -33,29 +56,68 @@ def custom_login(request):
 
 def get_user_status(user):
     """
-    Retrieves the action_type of the user's single most recent time entry 
-    and translates 'BREAK_END' into 'IN'.
+    Retrieves the user's current clock state from their UserStatus row
+    ('BREAK_END' is already stored as 'IN'). This is a single primary-key lookup.
     """
-    last_entry = TimeEntry.objects.filter(user=user).order_by('-timestamp').first()
+    state = UserStatus.objects.filter(user=user).values_list('state', flat=True).first()
 
-    if not last_entry:
+    if not state:
         return 'OUT'  # Default state if no entries exist
-    
-    # --- CRITICAL NEW LOGIC ---
-    last_action = last_entry.action_type
-    
-    if last_action == 'BREAK_END':
-        return 'IN' # User is back from break and actively working
-    
-    return last_action
+
+    return state
+
+def page_etag(request, *parts):
+    """
+    Validator for a per-user page: the given parts (data versions, dates...) plus
+    what every page depends on (the user, the query string and the CSRF secret
+    baked into its forms). None while flash messages are waiting to be shown,
+    so those pages are always rendered.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    # get_token creates the CSRF secret on a first visit, before the page is rendered
+    get_token(request)
+    key = [request.user.pk, request.user.username, request.user.is_staff,
+           request.META['CSRF_COOKIE'], request.GET.urlencode(), *parts]
+    return quote_etag(hashlib.md5(repr(key).encode(), usedforsecurity=False).hexdigest())
+
+def if_modified(request, etag):
+    """A 304 response when the request's If-None-Match matches etag, else None."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
+
+def dashboard_idempotency_key(version):
+    """
+    The clock form's idempotency key. It is tied to the data version the page
+    shows rather than random, so a page served from the browser cache (304)
+    is still valid: any accepted punch bumps the version, and a second submit
+    from the same state is the duplicate the key exists to ignore.
+    """
+    return f"v{version}"
 
 @login_required
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
 def dashboard(request):
-    user_status = get_user_status(request.user)
+    # State and data version come from the same status row (one primary-key lookup)
+    status = UserStatus.objects.filter(user=request.user).values('state', 'data_version').first()
+    user_status = status['state'] if status else 'OUT'
+    version = status['data_version'] if status else 0
     today = timezone.localdate()
+
+    pending_request_count = 0
+    if request.user.is_staff:
+        pending_request_count = Counter.cached('pending_requests')
+
+    # Polling tabs and kiosks get a 304 until a punch, a new day or a new request changes the page
+    etag = page_etag(request, user_status, version, today, pending_request_count)
+    if not_modified := if_modified(request, etag):
+        return not_modified
     
-    # Calculate totals using ALL entries for the day (Logic remains separate)
-    results = calculate_time_period(request.user, today, today) 
+    # Totals come from the pre-aggregated daily summary via the versioned cache (Logic remains separate)
+    results = get_cached_period_totals(request.user, today, today, version=version)
 
     # --- PAGINATION LOGIC START ---
     
@@ -64,75 +126,141 @@ def dashboard(request):
     all_entries_today = TimeEntry.objects.filter(
     user=request.user,
     date_only=today
-    ).order_by('-timestamp')
+    ).select_related('user')
 
-    # 2. Set up Paginator
+    # 2. Set up Paginator (keyset based, so no COUNT or OFFSET queries)
     PAGINATE_BY = 10 
-    paginator = Paginator(all_entries_today, PAGINATE_BY)
+    paginator = KeysetPaginator(all_entries_today, PAGINATE_BY, ordering=('-timestamp', '-id'))
 
-    # 3. Get the requested page number from the URL (?page=X)
-    page_number = request.GET.get('page')
-    
-    # 4. Get the specific page object (the slice of data)
-    page_obj = paginator.get_page(page_number) 
+    # 3. Get the requested page from the URL cursor (?after=X or ?before=X)
+    page_obj = paginator.get_page(request.GET.get('after'), request.GET.get('before'))
     
     # --- PAGINATION LOGIC END ---
 
-    pending_request_count = 0
-    if request.user.is_staff:
-        pending_request_count = TimeEditRequest.objects.filter(status='PENDING').count()
-
     context = {
         'current_status': user_status, 
+        'idempotency_key': dashboard_idempotency_key(version),
         'hours_today': results['work_duration'], 
         'raw_logs_today': page_obj, # <--- Passing the paginated object
         'pending_request_count': pending_request_count,
     }
-    return render(request, 'time_tracker/dashboard.html', context)
+    response = render(request, 'time_tracker/dashboard.html', context)
+    if etag:
+        response['ETag'] = etag
+    return response
 
 @login_required
 def clock_action(request):
     if request.method == 'POST':
         action_type = request.POST.get('action') 
-        user_status = get_user_status(request.user) 
-        
-        is_valid = False
-        
-            # 1. CLOCK IN: Only allowed if user is currently OUT.
-        if action_type == 'IN' and user_status == 'OUT': # <-- SIMPLIFIED: Only allow 'OUT'
-            is_valid = True
-            
-        # 2. CLOCK OUT: Allowed if user is currently IN or on a BREAK
-        elif action_type == 'OUT' and user_status in ['IN', 'BREAK_START']: # <-- REMOVE 'BREAK_END' here
-            is_valid = True
-            
-        # 3. START BREAK: Allowed only if user is IN
-        elif action_type == 'BREAK_START' and user_status == 'IN':
-            is_valid = True
-            
-        # 4. END BREAK: Allowed only if user is on a BREAK_START
-        elif action_type == 'BREAK_END' and user_status == 'BREAK_START':
-            is_valid = True
-            
-        if is_valid:
-            # This creates the new entry in the database
-            TimeEntry.objects.create(
-                user=request.user,
-                timestamp=timezone.now(),
-                action_type=action_type
-            )
+        idempotency_key = request.POST.get('idempotency_key', '')[:64]
+
+        # Validation and insert happen atomically; invalid transitions and
+        # retried submissions are simply ignored.
+        record_clock_action(request.user, action_type, idempotency_key)
 
     # Redirects user back to the dashboard
     return redirect('dashboard')
 
-User = get_user_model() 
+# --- ASYNC (ASGI) VERSIONS ---
+# Served instead of the views above when settings.ASYNC_CLOCK_VIEWS is on (the ASGI profile),
+# so a request waiting on the database doesn't hold a worker.
+
+async def aget_user_status(user):
+    """get_user_status using the async ORM."""
+    state = await UserStatus.objects.filter(user=user).values_list('state', flat=True).afirst()
+
+    if not state:
+        return 'OUT'  # Default state if no entries exist
+
+    return state
 
 @login_required
-def reports_view(request):
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+async def async_dashboard(request):
+    # Resolve the user up front so the template's {{ user }} doesn't trigger a sync lookup
+    # (this also loads the session, so page_etag's message check stays in memory)
+    request.user = await request.auser()
+
+    status = await UserStatus.objects.filter(user=request.user).values('state', 'data_version').afirst()
+    user_status = status['state'] if status else 'OUT'
+    version = status['data_version'] if status else 0
+    today = timezone.localdate()
+
+    pending_request_count = 0
+    if request.user.is_staff:
+        pending_request_count = await Counter.acached('pending_requests')
+
+    etag = page_etag(request, user_status, version, today, pending_request_count)
+    if not_modified := if_modified(request, etag):
+        return not_modified
+
+    results = await aget_cached_period_totals(request.user, today, today, version=version)
+
+    all_entries_today = TimeEntry.objects.filter(
+        user=request.user,
+        date_only=today
+    ).select_related('user')
+
+    PAGINATE_BY = 10
+    paginator = KeysetPaginator(all_entries_today, PAGINATE_BY, ordering=('-timestamp', '-id'))
+    page_obj = await paginator.aget_page(request.GET.get('after'), request.GET.get('before'))
+
+    context = {
+        'current_status': user_status,
+        'idempotency_key': dashboard_idempotency_key(version),
+        'hours_today': results['work_duration'],
+        'raw_logs_today': page_obj,
+        'pending_request_count': pending_request_count,
+    }
+    response = render(request, 'time_tracker/dashboard.html', context)
+    if etag:
+        response['ETag'] = etag
+    return response
+
+@login_required
+async def async_clock_action(request):
+    if request.method == 'POST':
+        user = await request.auser()
+        action_type = request.POST.get('action')
+        idempotency_key = request.POST.get('idempotency_key', '')[:64]
+
+        # Double submissions at shift change are common: turn away transitions that
+        # can't succeed with one async read instead of a write transaction
+        if await aget_user_status(user) in CLOCK_TRANSITIONS.get(action_type, []):
+            # The conditional UPDATE needs a transaction, which the async ORM can't open
+            await sync_to_async(record_clock_action)(user, action_type, idempotency_key)
+
+    return redirect('dashboard')
+
+User = get_user_model() 
+
+def get_report_dates(request):
+    """Reads date_from/date_to from the query string, defaulting to the last 7 days."""
     today = timezone.localdate()
     default_start_date = today - timedelta(days=7)
     date_from_str = request.GET.get('date_from')
     date_to_str = request.GET.get('date_to')
+
+    try:
+        date_from = date.fromisoformat(date_from_str) if date_from_str else default_start_date
+        date_to = date.fromisoformat(date_to_str) if date_to_str else today
+    except ValueError:
+        date_from = default_start_date
+        date_to = today
+
+    if date_to < date_from:
+        date_to = date_from
+
+    return date_from, date_to
+
+@login_required
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@replica_reads
+@statement_timeout(settings.REPORT_STATEMENT_TIMEOUT_MS)
+def reports_view(request):
     user_id_str = request.GET.get('user_id')
 
     target_user = request.user
@@ -143,25 +271,35 @@ def reports_view(request):
         except User.DoesNotExist:
             pass
 
-    try:
-        date_from = date.fromisoformat(date_from_str) if date_from_str else default_start_date
-        date_to = date.fromisoformat(date_to_str) if date_to_str else today
-    except ValueError:
-        date_from = default_start_date
-        date_to = today
+    date_from, date_to = get_report_dates(request)
 
-    if date_to < date_from:
-        date_to = date_from
+    version = UserStatus.objects.filter(user=target_user).values_list('data_version', flat=True).first() or 0
+    # Staff pages carry the pending request badge
+    pending_request_count = Counter.cached('pending_requests') if request.user.is_staff else None
+    etag = page_etag(request, user_choice_label(target_user), target_user.pk, version, date_from, date_to,
+                     pending_request_count)
+    if not_modified := if_modified(request, etag):
+        return not_modified
     
-    results = calculate_time_period(target_user, date_from, date_to)
+    # Totals are summed from daily summaries (cached per data version); raw entries are only fetched for the visible page
+    results = get_cached_period_totals(target_user, date_from, date_to, version=version)
 
-    all_report_entries = results['raw_entries'] 
+    all_report_entries = TimeEntry.objects.filter(
+        user=target_user,
+        date_only__range=(date_from, date_to)
+    ).select_related('user')
     
+    # Old ranges may reach into the archive: its entries count in the totals but aren't listed
+    archived_entry_count = 0
+    if date_from < archive_horizon():
+        archived_entry_count = ArchivedDay.objects.filter(
+            user=target_user, day__range=(date_from, date_to)
+        ).aggregate(total=Sum('entry_count'))['total'] or 0
+
     PAGINATE_BY = 10 
-    paginator = Paginator(all_report_entries, PAGINATE_BY)
+    paginator = KeysetPaginator(all_report_entries, PAGINATE_BY, ordering=('date_only', 'timestamp', 'id'))
 
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number) 
+    page_obj = paginator.get_page(request.GET.get('after'), request.GET.get('before'))
     
     query_params_dict = {
         'date_from': date_from.isoformat(),
@@ -171,19 +309,144 @@ def reports_view(request):
         query_params_dict['user_id'] = target_user.id
         
     query_params = urlencode(query_params_dict)
+    export_params = urlencode({**query_params_dict, 'user_id': target_user.id})
 
     context = {
         'date_from': date_from.isoformat(), 
         'date_to': date_to.isoformat(),
         'target_user': target_user,
         'is_admin': request.user.is_staff,
-        'users': User.objects.all().order_by('username') if request.user.is_staff else None,
+        'target_user_label': user_choice_label(target_user),
         'total_work_time': results['work_duration'],
         'total_break_time': results['break_duration'],
         'raw_entries': page_obj, 
+        'archived_entry_count': archived_entry_count,
         'query_params': query_params,
+        'export_params': export_params,
     }
-    return render(request, 'time_tracker/reports.html', context)
+    response = render(request, 'time_tracker/reports.html', context)
+    if etag:
+        response['ETag'] = etag
+    return response
+
+@login_required
+def export_timesheets(request):
+    """
+    Streams time entries and per-punch durations for a date range as CSV (or
+    Parquet with ?format=parquet). Staff may pass one or more user_id values;
+    everyone else can only export their own entries.
+    """
+    date_from, date_to = get_report_dates(request)
+    export_format = request.GET.get('format', 'csv')
+
+    user_ids = [request.user.id]
+    if request.user.is_staff:
+        user_ids = [user_id for user_id in request.GET.getlist('user_id') if user_id.isdigit()] or None
+
+    rows = iter_export_rows(date_from, date_to, user_ids)
+    filename = f"timesheets_{date_from.isoformat()}_{date_to.isoformat()}"
+
+    if export_format == 'parquet':
+        if not parquet_available():
+            return HttpResponseBadRequest("Parquet export is not available on this server.")
+        output = tempfile.TemporaryFile()
+        write_parquet(rows, output)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=f"{filename}.parquet")
+
+    response = StreamingHttpResponse(iter_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+@login_required
+@require_POST
+def submit_report_job(request):
+    """
+    Queues a timesheet export (or, for staff, a payroll report over all users)
+    for the date range in the query string, then shows the job's progress page.
+    Large ranges would otherwise outlive the request timeout.
+    """
+    kind = request.POST.get('kind')
+    date_from, date_to = get_report_dates(request)
+    params = {'date_from': date_from.isoformat(), 'date_to': date_to.isoformat()}
+
+    if kind == 'timesheet_export':
+        user_ids = [request.user.id]
+        if request.user.is_staff:
+            user_ids = [int(user_id) for user_id in request.GET.getlist('user_id') if user_id.isdigit()] or None
+        params.update(user_ids=user_ids, format=request.POST.get('format', 'csv'))
+    elif kind == 'payroll_report':
+        if not request.user.is_staff:
+            raise PermissionDenied
+    else:
+        return HttpResponseBadRequest("Unknown report job.")
+
+    job = submit_job(request.user, kind, params)
+    return redirect('job_detail', job_id=job.id)
+
+def get_visible_job(request, job_id, with_result=False):
+    """The job if the user may see it (their own, or any job for staff), else 404."""
+    jobs = Job.objects.all() if with_result else Job.objects.defer('result')
+    if not request.user.is_staff:
+        jobs = jobs.filter(owner=request.user)
+    return get_object_or_404(jobs, id=job_id)
+
+@login_required
+def job_detail(request, job_id):
+    job = get_visible_job(request, job_id)
+    return render(request, 'time_tracker/job_detail.html', {'job': job})
+
+@login_required
+def job_status(request, job_id):
+    """Polled by the job page until the job is DONE or FAILED."""
+    job = get_visible_job(request, job_id)
+    data = {'id': job.id, 'status': job.status, 'progress': job.progress, 'error': '', 'download_url': None}
+    if job.status == 'DONE':
+        data['download_url'] = reverse('job_download', args=[job.id])
+    elif job.status == 'FAILED':
+        # Tracebacks are for staff; everyone else gets a plain message
+        data['error'] = job.error if request.user.is_staff else "The job failed. Please try again or contact an administrator."
+    return JsonResponse(data)
+
+@login_required
+def job_download(request, job_id):
+    job = get_visible_job(request, job_id, with_result=True)
+    if job.status != 'DONE':
+        raise Http404("The job has no result yet.")
+    response = HttpResponse(bytes(job.result), content_type=job.content_type)
+    response['Content-Disposition'] = f'attachment; filename="{job.result_name}"'
+    return response
+
+@csrf_exempt
+@require_POST
+def clock_events_api(request):
+    """
+    Batch upload of buffered punches from clock terminals, authenticated with
+    'Authorization: Bearer <token>' against settings.CLOCK_TERMINAL_TOKENS.
+    Body: {"events": [{"user_id", "action", "timestamp", "event_id"?}, ...]}.
+    Responds with per-event results (see ingest.ingest_clock_events).
+    """
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not token or not any(hmac.compare_digest(token, known) for known in settings.CLOCK_TERMINAL_TOKENS):
+        return JsonResponse({'error': 'Invalid terminal token.'}, status=401)
+
+    # Read the stream directly: uploads are larger than DATA_UPLOAD_MAX_MEMORY_SIZE allows for request.body
+    if int(request.META.get('CONTENT_LENGTH') or 0) > settings.CLOCK_INGEST_MAX_BYTES:
+        return JsonResponse({'error': 'Upload too large.'}, status=413)
+    try:
+        events = json.loads(request.read(settings.CLOCK_INGEST_MAX_BYTES))['events']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Body must be JSON with an "events" list.'}, status=400)
+    if not isinstance(events, list):
+        return JsonResponse({'error': 'Body must be JSON with an "events" list.'}, status=400)
+    if len(events) > settings.CLOCK_INGEST_MAX_EVENTS:
+        return JsonResponse({'error': f'At most {settings.CLOCK_INGEST_MAX_EVENTS} events per request.'}, status=413)
+
+    results = ingest_clock_events(events)
+    counts = {status: 0 for status in ('accepted', 'duplicate', 'rejected')}
+    for result in results:
+        counts[result['status']] += 1
+    return JsonResponse({**counts, 'results': results})
 
 def register_user(request):
     """Handles user registration (sign-up)."""
@@ -220,6 +483,7 @@ def admin_delete_entry(request, entry_id):
     return redirect('admin_user_management')
 
 @login_required
+@replica_reads
 def admin_user_management(request):
     if not request.user.is_staff:
         raise PermissionDenied
@@ -292,18 +556,17 @@ def admin_user_management(request):
     if user_id:
         target_user = get_object_or_404(User, id=user_id)
         
-        all_user_entries = TimeEntry.objects.filter(user=target_user).order_by('-timestamp')
+        all_user_entries = TimeEntry.objects.filter(user=target_user)
         
         PAGINATE_BY = 15 
-        paginator = Paginator(all_user_entries, PAGINATE_BY)
-        page_number = request.GET.get('page')
-        user_entries = paginator.get_page(page_number) 
+        paginator = KeysetPaginator(all_user_entries, PAGINATE_BY, ordering=('-timestamp', '-id'))
+        user_entries = paginator.get_page(request.GET.get('after'), request.GET.get('before'))
         
         query_params = urlencode({'user_id': target_user.id})
         
     context = {
-        'all_users': User.objects.all().order_by('username'),
         'target_user': target_user,
+        'target_user_label': user_choice_label(target_user) if target_user else '',
         'user_entries': user_entries,
         'query_params': query_params,
         'add_form': add_form,
@@ -313,7 +576,7 @@ def admin_user_management(request):
 @login_required
 def request_time_edit(request):
     if request.method == 'POST':
-        form = UserEditRequestForm(request.POST)
+        form = UserEditRequestForm(request.POST, user=request.user)
         
         if form.is_valid():
             edit_request = form.save(commit=False)
@@ -323,21 +586,95 @@ def request_time_edit(request):
             messages.success(request, 'Time change request submitted successfully for review.')
             return redirect('dashboard')
     else:
-        form = UserEditRequestForm()
-        form.fields['original_entry'].queryset = TimeEntry.objects.filter(user=request.user).order_by('-timestamp')
+        form = UserEditRequestForm(user=request.user)
 
     context = {'form': form}
     return render(request, 'time_tracker/user_edit_request.html', context)
 
+# --- LOOKUPS (search-as-you-type pickers, see forms.LookupSelect) ---
+LOOKUP_LIMIT = 20
+
+def lookup_date_range(query):
+    """The (first, last) days matched by a YYYY, YYYY-MM or YYYY-MM-DD prefix, or None."""
+    parts = query.split('-')
+    try:
+        if len(parts) == 1:
+            return date(int(parts[0]), 1, 1), date(int(parts[0]), 12, 31)
+        if len(parts) == 2:
+            first = date(int(parts[0]), int(parts[1]), 1)
+            return first, (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        day = date(*map(int, parts))
+        return day, day
+    except (TypeError, ValueError):
+        return None
+
+def lookup_response(rows, label):
+    """At most LOOKUP_LIMIT results; `more` tells the picker to ask for a longer prefix."""
+    return JsonResponse({
+        'results': [{'id': row.pk, 'text': label(row)} for row in rows[:LOOKUP_LIMIT]],
+        'more': len(rows) > LOOKUP_LIMIT,
+    })
+
+@login_required
+def lookup_entries(request):
+    """The user's own entries, newest first, narrowed by a date prefix in ?q=."""
+    entries = TimeEntry.objects.filter(user=request.user)
+    query = request.GET.get('q', '').strip()
+    if query:
+        days = lookup_date_range(query)
+        if days is None:
+            return lookup_response([], entry_choice_label)
+        entries = entries.filter(date_only__range=days)
+    # Walks timeentry_user_day_ts_idx backwards and stops after one page
+    rows = list(entries.order_by('-date_only', '-timestamp', '-id')[:LOOKUP_LIMIT + 1])
+    return lookup_response(rows, entry_choice_label)
+
+@login_required
+def lookup_users(request):
+    """Users whose username starts with ?q= (case-sensitive, so the username index serves it)."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    users = User.objects.filter(username__startswith=request.GET.get('q', '').strip()).order_by('username')
+    rows = list(users.only('id', 'username', 'first_name', 'last_name', 'is_staff')[:LOOKUP_LIMIT + 1])
+    return lookup_response(rows, user_choice_label)
+
 MGMT_PAGINATE_BY = 15
 
+def filter_pending_requests(params):
+    """
+    Pending requests matching the review filters (username and requested date
+    range) in params, a GET or POST QueryDict. Returns (queryset, active filters).
+    """
+    pending = TimeEditRequest.objects.filter(status='PENDING')
+    filters = {key: params.get(key, '').strip() for key in ('username', 'date_from', 'date_to')}
+
+    if filters['username']:
+        pending = pending.filter(original_entry__user__username=filters['username'])
+    try:
+        # Compare against day boundaries so the partial index on requested_timestamp is usable
+        if filters['date_from']:
+            start = datetime.combine(date.fromisoformat(filters['date_from']), datetime.min.time())
+            pending = pending.filter(requested_timestamp__gte=timezone.make_aware(start))
+        if filters['date_to']:
+            end = datetime.combine(date.fromisoformat(filters['date_to']) + timedelta(days=1), datetime.min.time())
+            pending = pending.filter(requested_timestamp__lt=timezone.make_aware(end))
+    except ValueError:
+        pass
+
+    return pending, {key: value for key, value in filters.items() if value}
+
 @login_required
+@replica_reads
+@statement_timeout(settings.REPORT_STATEMENT_TIMEOUT_MS)
 def admin_review_requests(request):
     if not request.user.is_staff:
         raise PermissionDenied
         
-    # Fetch all PENDING requests
-    all_requests = TimeEditRequest.objects.filter(status='PENDING').order_by('requested_timestamp')
+    # Fetch all PENDING requests (narrowed by the filter form, if used)
+    pending, filters = filter_pending_requests(request.GET)
+    all_requests = pending.select_related(
+        'original_entry__user'
+    ).order_by('requested_timestamp', 'id')
     
     paginator = Paginator(all_requests, MGMT_PAGINATE_BY)
     page_number = request.GET.get('page')
@@ -345,6 +682,7 @@ def admin_review_requests(request):
     
     context = {
         'pending_requests': page_obj,
+        'filters': filters,
     }
     return render(request, 'time_tracker/admin_review_requests.html', context)
 
@@ -377,4 +715,118 @@ def admin_process_request(request, request_id):
             edit_request.save()
             messages.warning(request, f"Entry {edit_request.original_entry.id} rejected.")
 
-    return redirect('admin_review_requests')
\ No newline at end of file
+    return redirect('admin_review_requests')
+
+@login_required
+@require_POST
+def admin_bulk_process_requests(request):
+    """
+    Accepts or rejects the ticked requests (scope=selected) or every pending
+    request matching the review filters (scope=matching) in one transaction.
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied
+
+    action = request.POST.get('action')
+    if action not in ('accept', 'reject'):
+        return HttpResponseBadRequest("Unknown action.")
+
+    if request.POST.get('scope') == 'matching':
+        edit_requests, filters = filter_pending_requests(request.POST)
+    else:
+        ids = [value for value in request.POST.getlist('request_ids') if value.isdigit()]
+        edit_requests, filters = TimeEditRequest.objects.filter(id__in=ids), {}
+
+    result = review_edit_requests(request.user, action, edit_requests)
+
+    if result['processed']:
+        verb = 'accepted' if action == 'accept' else 'rejected'
+        messages.success(request, f"{len(result['processed'])} request(s) {verb}.")
+    for entry_id, request_ids in result['conflicts'].items():
+        messages.error(request, f"Entry {entry_id} has several selected requests "
+                                f"({', '.join(map(str, request_ids))}); choose one and try again.")
+    if result['skipped']:
+        messages.warning(request, f"{len(result['skipped'])} request(s) were already processed.")
+    if not any(result.values()):
+        messages.info(request, "No pending requests were selected.")
+
+    return redirect(f"{reverse('admin_review_requests')}?{urlencode(filters)}" if filters else 'admin_review_requests')
+
+def attendance_etag(request):
+    """
+    Changes whenever a user is added or removed or any status row changes
+    (every punch bumps its user's data_version), so unchanged boards are
+    answered with a 304 after one aggregate query. Like every page_etag, it
+    also covers the CSRF secret in the board's forms (the logout button).
+    """
+    stats = User.objects.aggregate(
+        users=Count('id'), last_user=Max('id'),
+        statuses=Count('clock_status'), versions=Sum('clock_status__data_version'),
+    )
+    pending = Counter.cached('pending_requests')  # The nav badge
+    return page_etag(request, 'attendance', stats['users'], stats['last_user'], stats['statuses'],
+                     stats['versions'], pending)
+
+ATTENDANCE_ROW = (
+    '<tr><td class="text-nowrap-col"><a href="{}?user_id={}">{}</a></td>'
+    '<td class="text-nowrap-col">{}</td>'
+    '<td class="text-nowrap-col"><span class="badge {}">{}</span></td>'
+    '<td class="text-nowrap-col">{}</td>'
+    '<td class="text-nowrap-col" data-since="{}"></td></tr>'
+)
+
+@login_required
+@cache_control(private=True, no_cache=True)
+def attendance_board(request):
+    """Every user's current clock state and last punch, from one LEFT JOIN onto the status table (staff only)."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+
+    # Open boards poll every 30s and get a 304 until someone punches
+    etag = attendance_etag(request)
+    if not_modified := if_modified(request, etag):
+        return not_modified
+
+    rows = User.objects.order_by('username').values_list(
+        'id', 'username', 'first_name', 'last_name', 'clock_status__state', 'clock_status__last_timestamp',
+    )
+    labels = dict(UserStatus.STATE_CHOICES)
+    badges = {'IN': 'bg-success', 'BREAK_START': 'bg-warning text-dark', 'OUT': 'bg-secondary'}
+    user_url = reverse('admin_user_management')
+    local_tz = timezone.get_current_timezone()
+    counts = dict.fromkeys(labels, 0)
+
+    # One format_html_join instead of a template loop: 10k users must render in well under 200ms
+    board = []
+    for user_id, username, first_name, last_name, state, last_punch in rows:
+        state = state or 'OUT'
+        counts[state] += 1
+        since, local_punch = '', ''
+        if last_punch:
+            since = int(last_punch.timestamp() * 1000)
+            local_punch = last_punch.astimezone(local_tz).strftime('%Y-%m-%d %H:%M')
+        board.append((user_url, user_id, username, f"{first_name} {last_name}".strip(),
+                      badges[state], labels[state], local_punch, since))
+
+    context = {
+        'board_rows': format_html_join('', ATTENDANCE_ROW, board),
+        'on_shift': counts['IN'],
+        'on_break': counts['BREAK_START'],
+        'clocked_out': counts['OUT'],
+        'etag': etag or '',
+    }
+    response = render(request, 'time_tracker/attendance_board.html', context)
+    if etag:
+        response['ETag'] = etag
+    return response
+
+@login_required
+def metrics_view(request):
+    """Per-view request histograms in Prometheus text format (staff only)."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+
+    return HttpResponse(
+        metrics_registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,105 @@
+# time_tracker/workload.py
+import random
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from time_tracker.models import Counter, DailySummary, Shift, TimeEditRequest, TimeEntry, UserStatus
+from time_tracker.utils import replay_entries
+
+User = get_user_model()
+
+WORKLOAD_PASSWORD = 'clockers-load-test'
+BULK_BATCH_SIZE = 5000
+
+
+def workday_punches(rng, day):
+    """One realistic weekday: IN around 07:00-09:00, usually a 30-60 minute break, OUT after ~8h."""
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time())) \
+        + timedelta(hours=7, minutes=rng.randint(0, 120), seconds=rng.randint(0, 59))
+    punches = [('IN', start)]
+    shift_minutes = rng.randint(420, 540)
+    if rng.random() < 0.85:
+        break_start = start + timedelta(minutes=rng.randint(180, 300))
+        break_end = break_start + timedelta(minutes=rng.randint(30, 60))
+        punches += [('BREAK_START', break_start), ('BREAK_END', break_end)]
+        shift_minutes += (break_end - break_start).seconds // 60
+    punches.append(('OUT', start + timedelta(minutes=shift_minutes)))
+    return punches
+
+
+def generate_workload(users=10, months=1, pending_requests=0, end_date=None, seed=0,
+                      username_prefix='loadtest_user', with_derived=True):
+    """
+    Creates `users` accounts (password WORKLOAD_PASSWORD) with `months` of valid
+    IN/BREAK/OUT weekday sequences ending the day before end_date (default today),
+    plus `pending_requests` pending TimeEditRequests on random entries. Rows are
+    bulk-inserted; with_derived fills the status, daily summary and shift tables the same
+    way TimeEntry.save() would. Returns the created users.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or timezone.localdate()
+    start_date = end_date - timedelta(days=30 * months)
+    password = make_password(WORKLOAD_PASSWORD)
+
+    with transaction.atomic():
+        created = User.objects.bulk_create(
+            [User(username=f'{username_prefix}_{n}', password=password) for n in range(users)],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        entries, summaries = [], []
+        for user in created:
+            day = start_date
+            while day < end_date:
+                if day.weekday() < 5 and rng.random() < 0.95:
+                    day_entries = [
+                        TimeEntry(user=user, timestamp=when, action_type=action_type, date_only=when.date())
+                        for action_type, when in workday_punches(rng, day)
+                    ]
+                    entries += day_entries
+                    if with_derived:
+                        summaries.append(_summary_for(user, day_entries))
+                day += timedelta(days=1)
+
+            if len(entries) >= BULK_BATCH_SIZE:
+                TimeEntry.objects.bulk_create(entries, batch_size=BULK_BATCH_SIZE)
+                entries = []
+        TimeEntry.objects.bulk_create(entries, batch_size=BULK_BATCH_SIZE)
+
+        if with_derived:
+            DailySummary.objects.bulk_create(summaries, batch_size=BULK_BATCH_SIZE)
+            for user in created:
+                UserStatus.rebuild_for(user.id)
+                Shift.rebuild_from(user.id)
+
+        if pending_requests:
+            user_ids = [user.id for user in created]
+            entry_ids = list(TimeEntry.objects.filter(user_id__in=user_ids).values_list('id', 'timestamp'))
+            requests = TimeEditRequest.objects.bulk_create([
+                TimeEditRequest(
+                    original_entry_id=entry_id,
+                    requested_timestamp=timestamp + timedelta(minutes=rng.randint(-30, 30)),
+                    request_reason='Forgot to clock at the right time.',
+                )
+                for entry_id, timestamp in rng.sample(entry_ids, min(pending_requests, len(entry_ids)))
+            ], batch_size=BULK_BATCH_SIZE)
+            Counter.add('pending_requests', len(requests))
+
+    return created
+
+
+def _summary_for(user, day_entries):
+    """The DailySummary row for one generated day (generated shifts never cross midnight)."""
+    totals = replay_entries(day_entries)
+    return DailySummary(
+        user=user,
+        day=day_entries[0].date_only,
+        work_seconds=totals['work_time'].total_seconds(),
+        break_seconds=totals['break_time'].total_seconds(),
+        shift_count=totals['shift_count'],
+        has_open_shift=totals['has_open_shift'],
+    )